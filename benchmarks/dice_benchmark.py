@@ -0,0 +1,42 @@
+import sys
+import os
+import timeit
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from parsing import ast
+from interpreting import rolling
+from interpreting.probability import dice_probabilities
+
+POOL_SIZES = (2, 4, 8, 16, 24, 32, 48, 64, 96, 128, 192, 256, 1024, 4096)
+BATCH = 10000
+
+def roll_time(dice: ast.Dice, threshold: int) -> float:
+    # seconds per roll without alias tables, with pools of threshold dice or more rolled by numpy
+    rolling.BULK_ROLL_THRESHOLD = threshold
+    rolling.ALIAS_TABLE_LIMIT = 0
+    number = max(1, 20000 // dice.number)
+    return min(timeit.repeat(dice.roll, number = number, repeat = 3)) / number
+
+def alias_time(dice: ast.Dice) -> float:
+    # seconds per roll from an alias table, once it is built
+    sample = rolling.AliasTable(dice.number, dice_probabilities(dice.number, dice.faces)).sample
+    return min(timeit.repeat(sample, number = 20000, repeat = 3)) / 20000
+
+if __name__ == '__main__':
+    faces = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    threshold, limit = rolling.BULK_ROLL_THRESHOLD, rolling.ALIAS_TABLE_LIMIT
+    crossover = None
+    print("%6s %12s %12s %12s" % ('dice', 'loop', 'numpy', 'alias'))
+    for number in POOL_SIZES:
+        dice = ast.Dice('%dd%d' % (number, faces))
+        loop, bulk = roll_time(dice, number + 1), roll_time(dice, 0)
+        if crossover is None and bulk < loop:
+            crossover = number
+        print("%6d %10.2f us %10.2f us %10.2f us" % (number, loop * 1e6, bulk * 1e6, alias_time(dice) * 1e6))
+    rolling.BULK_ROLL_THRESHOLD, rolling.ALIAS_TABLE_LIMIT = threshold, limit
+    print("numpy is faster from %s dice (BULK_ROLL_THRESHOLD = %d), pools with up to %d results use alias tables" \
+          % (crossover, threshold, limit))
+
+    dice = ast.Dice('3d%d' % faces)
+    single = min(timeit.repeat(lambda: [dice.roll() for i in range(BATCH)], number = 1, repeat = 3))
+    batch = min(timeit.repeat(lambda: dice.roll_many(BATCH), number = 1, repeat = 3))
+    print("%d rolls of %s: %.2f ms one by one, %.2f ms with roll_many" % (BATCH, dice, single * 1e3, batch * 1e3))
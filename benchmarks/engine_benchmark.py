@@ -0,0 +1,62 @@
+import io
+import sys
+import os
+import time
+from contextlib import redirect_stdout
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from interpreting.interpreter import Interpreter, ENGINES
+
+WORKLOADS = {
+    'recursion': '''
+function fib(n) {
+    if (n <= 1) {
+        return n;
+    }
+    Number fib_one;
+    Number fib_two;
+    fib_one = fib(n-1);
+    fib_two = fib(n-2);
+    return fib_one + fib_two;
+}
+?fib(22);
+''',
+    'loop': '''
+Number i;
+Number sum;
+i = 0;
+sum = 0;
+while (i < 200000) {
+    sum = sum + i * 2 - 1;
+    i = i + 1;
+}
+?sum;
+''',
+    'dice': '''
+Number i;
+Number sum;
+Dice d;
+d = 3d6;
+i = 0;
+sum = 0;
+while (i < 50000) {
+    sum = sum + ^d;
+    i = i + 1;
+}
+?sum;
+'''
+}
+
+def run(source: str, engine: str) -> float:
+    # memoization would skip most of the recursion workload
+    interpreter = Interpreter(io.StringIO(source), engine = engine, memo_size = 0)
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        interpreter.execute()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    engines = sys.argv[1:] or ENGINES
+    for name, source in WORKLOADS.items():
+        for engine in engines:
+            seconds = min(run(source, engine) for i in range(3))
+            print("%-10s %-10s %8.3f s" % (name, engine, seconds))
@@ -0,0 +1,23 @@
+import io
+import sys
+import os
+import timeit
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from lexing.lexer import Lexer
+from lexing.char_lexer import CharLexer
+from lexing.token import TokenType
+from benchmarks.scripts import generate_script
+
+def tokenize(lexer_class, source: str) -> int:
+    count = 0
+    lexer = lexer_class(io.StringIO(source))
+    while lexer.next_token().t_type != TokenType.END_OF_FILE:
+        count += 1
+    return count
+
+if __name__ == '__main__':
+    source = generate_script(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    print("Source: %d characters, %d tokens" % (len(source), tokenize(Lexer, source)))
+    for lexer_class in (CharLexer, Lexer):
+        seconds = min(timeit.repeat(lambda: tokenize(lexer_class, source), number = 1, repeat = 3))
+        print("%-10s %8.3f s  %10.0f chars/s" % (lexer_class.__name__, seconds, len(source) / seconds))
@@ -0,0 +1,25 @@
+import io
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from lexing.lexer import Lexer
+from lexing.token import TokenType
+from parsing.parser import Parser
+from benchmarks.scripts import generate_script
+
+def parse(source: str) -> tuple:
+    # tokens are lexed up front so that only the parser is timed, the parser only iterates over its lexer
+    tokens = []
+    for token in Lexer(io.StringIO(source)):
+        tokens.append(token)
+        if token.t_type == TokenType.END_OF_FILE:
+            break
+    start = time.perf_counter()
+    Parser(tokens).parse()
+    return time.perf_counter() - start, len(tokens)
+
+if __name__ == '__main__':
+    source = generate_script(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    seconds, token_count = min(parse(source) for i in range(3))
+    print("Parser  %d tokens  %8.3f s  %10.0f tokens/s" % (token_count, seconds, token_count / seconds))
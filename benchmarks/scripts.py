@@ -0,0 +1,29 @@
+# synthetic dndlang sources shared by the benchmarks
+
+FUNCTION = '''function roll_n_drop_lowest_%(name)s(dice, n) {
+    Number lowest_result;
+    Number sum;
+    Number i;
+    i = 1;
+    lowest_result = ^dice;
+    sum = 0;
+    while (i < n) {
+        if (^dice < lowest_result) {
+            sum = sum + lowest_result;
+        } else {
+            sum = sum + (2 * i - 1) / 3;
+        }
+        i = i + 1;
+    }
+    return sum;
+}
+?"Result of the very long and descriptive roll number %(i)d: ";
+?roll_n_drop_lowest_%(name)s(1d6, 4);
+'''
+
+def name_suffix(i: int) -> str:
+    # identifiers can't contain digits
+    return ''.join(chr(ord('a') + int(digit)) for digit in str(i))
+
+def generate_script(functions: int) -> str:
+    return ''.join(FUNCTION % { 'i': i, 'name': name_suffix(i) } for i in range(functions))
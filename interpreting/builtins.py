@@ -0,0 +1,145 @@
+from parsing import ast
+from interpreting import entities
+from interpreting.probability import Distribution, pool_moments, pool_results, pool_tails, tail
+
+class Builtin:
+    '''A function provided by the interpreter, linked like a FunctionDefinition of the same name.
+
+    memo is the Python function itself, so calls skip running a block like they do for cached
+    functions. Pure builtins don't make the dndlang functions calling them impure.'''
+    def __init__(self, name: str, parameters: list, function, pure: bool = True) -> None:
+        self.name = name
+        self.parameters = parameters
+        self.memo = function
+        self.pure = pure
+
+    def __repr__(self) -> str:
+        return '<builtin %s>' % self.name
+
+def to_distribution(value) -> Distribution:
+    # dice, integers and distributions have a distribution, nothing else does
+    if isinstance(value, Distribution):
+        return value
+    if isinstance(value, ast.Dice):
+        return Distribution.dice(*value.pool)
+    if type(value) is int:
+        return Distribution.constant(value)
+    raise TypeError(value)
+
+def probability(value, result) -> float:
+    # the probability of value being exactly result
+    if not isinstance(result, ast.NUMERIC_TYPES) or isinstance(result, Distribution):
+        raise TypeError(result)
+    return to_distribution(value).probability(result)
+
+def is_plain(value) -> bool:
+    return isinstance(value, ast.Dice) and not value.modified
+
+def kept_dice(dice: ast.Dice) -> int:
+    return dice.number if dice.keep is None else dice.keep
+
+# statistics of dice come from closed forms, or from the cached distribution of their pool, never from rolling
+
+def mean(value) -> float:
+    if is_plain(value):
+        return value.number * (value.faces + 1) / 2
+    if isinstance(value, ast.Dice):
+        return pool_moments(*value.pool)[0]
+    return to_distribution(value).mean()
+
+def variance(value) -> float:
+    if is_plain(value):
+        return value.number * (value.faces * value.faces - 1) / 12
+    if isinstance(value, ast.Dice):
+        return pool_moments(*value.pool)[1]
+    return to_distribution(value).variance()
+
+def minimum(value) -> int:
+    if isinstance(value, ast.Dice):
+        return kept_dice(value)
+    return to_distribution(value).minimum()
+
+def maximum(value) -> int:
+    if isinstance(value, ast.Dice):
+        return kept_dice(value) + pool_results(value.number, value.faces, value.exploding, value.keep) - 1
+    return to_distribution(value).maximum()
+
+def at_least(value, result) -> float:
+    # the probability of value being result or more
+    if not isinstance(result, ast.NUMERIC_TYPES) or isinstance(result, Distribution):
+        raise TypeError(result)
+    if isinstance(value, ast.Dice):
+        return tail(pool_tails(*value.pool), kept_dice(value), result)
+    return to_distribution(value).at_least(result)
+
+# entities live in the store of the running interpreter, so these builtins aren't pure
+
+def spawn(template) -> entities.Entity:
+    if not isinstance(template, str):
+        raise TypeError(template)
+    return entities.Entity(entities.active, entities.active.spawn(template, 1).start)
+
+def spawn_many(template, count) -> entities.Group:
+    if not isinstance(template, str) or type(count) is not int or count < 0:
+        raise TypeError(template)
+    return entities.active.spawn(template, count)
+
+def column(target, name: str):
+    # the stat of the characters of target
+    if not isinstance(target, (entities.Entity, entities.Group)) or not isinstance(name, str):
+        raise TypeError(target)
+    return target.store.column(name)[target.rows()]
+
+def stat(target, name):
+    # the stat of a character, or its total over a group
+    return int(column(target, name).sum())
+
+def set_stat(target, name, value) -> None:
+    # for every character of a group
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if type(value) is not int:
+        raise TypeError(value)
+    column(target, name)[:] = value
+
+def alive(target) -> int:
+    # how many characters have health left
+    return int((column(target, 'health') > 0).sum())
+
+def level_up(target, levels) -> None:
+    # every character of a group gains the levels, rolling its own dice
+    if not isinstance(target, (entities.Entity, entities.Group)) or type(levels) is not int or levels < 0:
+        raise TypeError(target)
+    target.store.level_up(target.rows(), levels)
+
+# templates don't change while a program runs, so their stats at a level are pure
+
+def template_stat(template, name, level, expected: bool):
+    if not isinstance(template, str) or not isinstance(name, str) or type(level) is not int:
+        raise TypeError(template)
+    return entities.active.stat_at(template, name, level, expected)
+
+def stat_at(template, name, level):
+    # the exact stat (or its distribution) of a character of the template at level
+    return template_stat(template, name, level, False)
+
+def expected_stat(template, name, level):
+    return template_stat(template, name, level, True)
+
+BUILTINS = { builtin.name: builtin for builtin in (
+    Builtin('distribution', ['value'], to_distribution),
+    Builtin('probability', ['value', 'result'], probability),
+    Builtin('mean', ['value'], mean),
+    Builtin('variance', ['value'], variance),
+    Builtin('min', ['value'], minimum),
+    Builtin('max', ['value'], maximum),
+    Builtin('at_least', ['value', 'result'], at_least),
+    Builtin('spawn', ['template'], spawn, pure = False),
+    Builtin('spawn_many', ['template', 'count'], spawn_many, pure = False),
+    Builtin('stat', ['target', 'name'], stat, pure = False),
+    Builtin('set_stat', ['target', 'name', 'value'], set_stat, pure = False),
+    Builtin('alive', ['target'], alive, pure = False),
+    Builtin('level_up', ['target', 'levels'], level_up, pure = False),
+    Builtin('stat_at', ['template', 'name', 'level'], stat_at),
+    Builtin('expected_stat', ['template', 'name', 'level'], expected_stat)
+) }
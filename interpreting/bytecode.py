@@ -0,0 +1,339 @@
+from array import array
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.builtins import BUILTINS
+
+# opcodes, every instruction is an (opcode, argument) pair of ints
+LOAD_CONST = 0              # push consts[arg]
+LOAD_LOCAL = 1              # push frame[arg]
+STORE_LOCAL = 2             # pop into frame[arg]
+DECLARE = 3                 # declare frame[arg], resetting it to None
+CHECK_NUMERIC = 4           # raise TypeError if the top of the stack isn't a number
+BINARY_ADD = 5
+BINARY_SUBTRACT = 6
+BINARY_MULTIPLY = 7
+BINARY_DIVIDE = 8
+COMPARE = 9                 # compare the two topmost values with COMPARISONS[arg]
+JUMP = 10                   # continue at arg
+POP_JUMP_IF_FALSE = 11      # pop, continue at arg if falsy
+POP_JUMP_IF_NOT_NONE = 12   # pop, continue at arg if not None
+ROLL = 13                   # replace the dice on top of the stack with its roll
+CALL = 14                   # call functions[arg], arguments are on the stack
+POP_TOP = 15
+PRINT = 16                  # pop and print
+RETURN_VALUE = 17           # pop, return it if it isn't None
+RETURN_NONE = 18
+RAISE_NAME_ERROR = 19       # raise NameError(consts[arg])
+RAISE_ARGUMENT_ERROR = 20   # raise ArgumentError(arg)
+TAIL_CALL = 21              # call functions[arg] in place of the caller, unless the result is cached
+CALL_BUILTIN = 22           # call the builtin consts[arg], arguments are on the stack
+ATTACK = 23                 # pop the defender and the attacker, resolve the attack
+
+OPCODE_NAMES = {
+    value: name for name, value in globals().copy().items() if name.isupper() and isinstance(value, int)
+}
+# opcodes whose argument is a jump target
+JUMPS = frozenset(( JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_NOT_NONE ))
+
+COMPARISONS = (
+    TokenType.LESS_THAN,
+    TokenType.MORE_THAN,
+    TokenType.LESS_OR_EQUAL,
+    TokenType.MORE_OR_EQUAL,
+    TokenType.EQUALS
+)
+COMPARISON_SYMBOLS = ('<', '>', '<=', '>=', '==')
+
+BINARY_OPERATIONS = {
+    TokenType.PLUS: BINARY_ADD,
+    TokenType.MINUS: BINARY_SUBTRACT,
+    TokenType.ASTERISK: BINARY_MULTIPLY,
+    TokenType.SLASH: BINARY_DIVIDE
+}
+
+class CodeObject:
+    '''Compiled instruction stream of a function or of a single top level instruction'''
+    __slots__ = ('name', 'code', 'consts', 'names', 'parameter_count')
+    def __init__(self, name: str, names: list, parameter_count: int = 0) -> None:
+        self.name = name
+        # opcodes and arguments, interleaved
+        self.code = array('l')
+        self.consts = []
+        # local variable names by slot, shared by every top level code object
+        self.names = names
+        self.parameter_count = parameter_count
+
+    @property
+    def local_count(self) -> int:
+        return len(self.names)
+
+class BytecodeCompiler:
+    '''Lowers the program into code objects for the VirtualMachine.
+
+    Variables are resolved to frame slots: each function has its own frame, all top level instructions
+    share the global frame. The program has to be resolved, declarations can't fail anymore.'''
+    def __init__(self, program: ast.Program) -> None:
+        self.program = program
+        self.function_indices = {}
+        self.functions = []
+        self.global_names = []
+
+    def compile(self) -> list:
+        # returns a code object for every top level instruction, functions end up in self.functions
+        definitions = []
+        for function in self.program.functions:
+            self.function_indices[function.name] = len(self.functions)
+            names = [parameter.name for parameter in function.parameters]
+            self.functions.append(CodeObject(function.name, names, len(function.parameters)))
+            definitions.append(function)
+        for function, code in zip(definitions, self.functions):
+            FunctionCompiler(self, code).compile_function(function)
+
+        result = []
+        for instruction in self.program.instructions:
+            code = CodeObject('<line %s>' % instruction.line_no, self.global_names)
+            FunctionCompiler(self, code).compile_top_level(instruction)
+            result.append(code)
+        return result
+
+class FunctionCompiler:
+    def __init__(self, compiler: BytecodeCompiler, code: CodeObject) -> None:
+        self.compiler = compiler
+        self.code = code
+        # where a return jumps to when returned values are discarded, None inside a function body
+        self.discard_target = None
+        # returns ending the function whatever they return, their calls can be tail calls
+        self.tail_returns = set()
+        self.instruction_compilers = {
+            ast.Declaration: self.compile_declaration,
+            ast.Assignment: self.compile_assignment,
+            ast.AttackMove: self.compile_attack_move,
+            ast.While: self.compile_while,
+            ast.If: self.compile_if,
+            ast.Log: self.compile_log,
+            ast.Return: self.compile_return,
+            ast.FunctionCall: self.compile_function_call_instruction
+        }
+        self.assignable_compilers = {
+            ast.Expression: self.compile_expression,
+            ast.Number: self.compile_literal,
+            ast.String: self.compile_literal,
+            ast.Dice: self.compile_dice,
+            ast.Variable: self.compile_variable,
+            ast.DiceRoll: self.compile_dice_roll,
+            ast.FunctionCall: self.compile_function_call
+        }
+
+    def emit(self, opcode: int, argument: int = 0) -> int:
+        # returns the position of the instruction, for patching jumps
+        position = len(self.code.code)
+        self.code.code.append(opcode)
+        self.code.code.append(argument)
+        return position
+
+    def patch(self, position: int, target: int = None) -> None:
+        self.code.code[position + 1] = len(self.code.code) if target is None else target
+
+    def constant(self, value) -> int:
+        for index, const in enumerate(self.code.consts):
+            if const is value:
+                return index
+        self.code.consts.append(value)
+        return len(self.code.consts) - 1
+
+    def slot(self, name: str) -> int:
+        if name not in self.code.names:
+            self.code.names.append(name)
+        return self.code.names.index(name)
+
+    def compile_function(self, function: ast.FunctionDefinition) -> None:
+        self.tail_returns = set(tail_returns(function.block.instructions))
+        for instruction in function.block.instructions:
+            self.compile_instruction(instruction)
+        self.emit(RETURN_NONE)
+
+    def compile_top_level(self, instruction: ast.Instruction) -> None:
+        # values returned by top level instructions are discarded
+        self.compile_discarding(instruction)
+        self.emit(RETURN_NONE)
+
+    def compile_discarding(self, instruction: ast.Instruction) -> None:
+        # a non None value returned inside the instruction ends it
+        outer_target = self.discard_target
+        self.discard_target = []
+        self.compile_instruction(instruction)
+        for position in self.discard_target:
+            self.patch(position)
+        self.discard_target = outer_target
+
+    def compile_instruction(self, instruction: ast.Instruction) -> None:
+        compiler = self.instruction_compilers.get(type(instruction))
+        if compiler is None:
+            raise NotImplementedError("The vm engine can't run " + type(instruction).__name__)
+        compiler(instruction)
+
+    def compile_assignable(self, assignable: ast.Assignable) -> None:
+        if assignable is None:
+            self.emit(LOAD_CONST, self.constant(None))
+            return
+        compiler = self.assignable_compilers.get(type(assignable))
+        if compiler is None:
+            raise NotImplementedError("The vm engine can't evaluate " + type(assignable).__name__)
+        compiler(assignable)
+
+    def compile_declaration(self, declaration: ast.Declaration) -> None:
+        self.emit(DECLARE, self.slot(declaration.var.name))
+
+    def compile_assignment(self, assignment: ast.Assignment) -> None:
+        self.compile_assignable(assignment.rhs)
+        self.emit(STORE_LOCAL, self.slot(assignment.lhs.name))
+
+    def compile_attack_move(self, attack_move: ast.AttackMove) -> None:
+        self.compile_assignable(attack_move.attacker)
+        self.compile_assignable(attack_move.defender)
+        self.emit(ATTACK)
+
+    def compile_while(self, instruction: ast.While) -> None:
+        start = len(self.code.code)
+        self.compile_condition(instruction.condition)
+        exit_jump = self.emit(POP_JUMP_IF_FALSE)
+        # values returned inside a loop are discarded, like While.execute does
+        for i in instruction.block.instructions:
+            self.compile_discarding(i)
+        self.emit(JUMP, start)
+        self.patch(exit_jump)
+
+    def compile_if(self, instruction: ast.If) -> None:
+        self.compile_condition(instruction.condition)
+        else_jump = self.emit(POP_JUMP_IF_FALSE)
+        for i in instruction.if_block.instructions:
+            self.compile_instruction(i)
+        if instruction.else_block is None:
+            self.patch(else_jump)
+        else:
+            end_jump = self.emit(JUMP)
+            self.patch(else_jump)
+            for i in instruction.else_block.instructions:
+                self.compile_instruction(i)
+            self.patch(end_jump)
+
+    def compile_condition(self, condition: ast.Condition) -> None:
+        if isinstance(condition, ast.ConstantCondition):
+            self.emit(LOAD_CONST, self.constant(condition.value))
+            return
+        self.compile_assignable(condition.first_operand)
+        self.compile_assignable(condition.second_operand)
+        self.emit(COMPARE, COMPARISONS.index(condition.operator))
+
+    def compile_log(self, instruction: ast.Log) -> None:
+        self.compile_assignable(instruction.value)
+        self.emit(PRINT)
+
+    def compile_return(self, instruction: ast.Return) -> None:
+        if instruction in self.tail_returns and isinstance(instruction.value, ast.FunctionCall):
+            # the return only runs if the result was cached
+            self.compile_function_call(instruction.value, TAIL_CALL)
+        else:
+            self.compile_assignable(instruction.value)
+        if self.discard_target is None:
+            self.emit(RETURN_VALUE)
+        else:
+            self.discard_target.append(self.emit(POP_JUMP_IF_NOT_NONE))
+
+    def compile_literal(self, literal: ast.Literal) -> None:
+        self.emit(LOAD_CONST, self.constant(literal.value))
+
+    def compile_dice(self, dice: ast.Dice) -> None:
+        self.emit(LOAD_CONST, self.constant(dice))
+
+    def compile_variable(self, variable: ast.Variable) -> None:
+        self.emit(LOAD_LOCAL, self.slot(variable.name))
+
+    def compile_dice_roll(self, dice_roll: ast.DiceRoll) -> None:
+        self.compile_assignable(dice_roll.operand)
+        self.emit(ROLL)
+
+    def is_numeric(self, assignable: ast.Assignable) -> bool:
+        # True if the assignable always evaluates to a number, so it doesn't need CHECK_NUMERIC
+        while type(assignable) is ast.Expression and len(assignable.operators) == 0:
+            assignable = assignable.operands[0]
+        return isinstance(assignable, (ast.Number, ast.DiceRoll)) or type(assignable) is ast.Expression
+
+    def compile_expression(self, expression: ast.Expression) -> None:
+        if len(expression.operators) == 0:
+            self.compile_assignable(expression.operands[0])
+            return
+        self.compile_checked_operand(expression.operands[0])
+        for operator, operand in zip(expression.operators, expression.operands[1:]):
+            self.compile_checked_operand(operand)
+            self.emit(BINARY_OPERATIONS[operator])
+
+    def compile_checked_operand(self, operand: ast.Assignable) -> None:
+        self.compile_assignable(operand)
+        if not self.is_numeric(operand):
+            self.emit(CHECK_NUMERIC)
+
+    def compile_function_call(self, call: ast.FunctionCall, opcode: int = CALL) -> None:
+        # the called function is looked up now, every definition is known before anything runs
+        if call.name not in self.compiler.function_indices and call.name in BUILTINS:
+            self.compile_builtin_call(call, BUILTINS[call.name])
+            return
+        if call.name not in self.compiler.function_indices:
+            # function not defined
+            self.emit(RAISE_NAME_ERROR, self.constant(call.name))
+            return
+        index = self.compiler.function_indices[call.name]
+        function = self.compiler.functions[index]
+        if len(call.arguments) != function.parameter_count:
+            # argument count doesn't match
+            self.emit(RAISE_ARGUMENT_ERROR, abs(len(call.arguments) - function.parameter_count))
+            return
+        for argument in call.arguments:
+            self.compile_assignable(argument)
+        self.emit(opcode, index)
+
+    def compile_builtin_call(self, call: ast.FunctionCall, builtin) -> None:
+        if len(call.arguments) != len(builtin.parameters):
+            # argument count doesn't match
+            self.emit(RAISE_ARGUMENT_ERROR, abs(len(call.arguments) - len(builtin.parameters)))
+            return
+        for argument in call.arguments:
+            self.compile_assignable(argument)
+        self.emit(CALL_BUILTIN, self.constant(builtin))
+
+    def compile_function_call_instruction(self, call: ast.FunctionCall) -> None:
+        self.compile_function_call(call)
+        self.emit(POP_TOP)
+
+def tail_returns(instructions: list):
+    # the returns in tail position: last in the function body or last in an if in tail position.
+    # a call returning None anywhere else lets the function go on, it can't replace the caller's frame
+    if not instructions:
+        return
+    last = instructions[-1]
+    if isinstance(last, ast.Return):
+        yield last
+    elif isinstance(last, ast.If):
+        yield from tail_returns(last.if_block.instructions)
+        if last.else_block is not None:
+            yield from tail_returns(last.else_block.instructions)
+
+def disassemble(code: CodeObject, functions: list = ()) -> str:
+    lines = ["%s (locals: %d, parameters: %d)" % (code.name, code.local_count, code.parameter_count)]
+    targets = { code.code[i + 1] for i in range(0, len(code.code), 2) if code.code[i] in JUMPS }
+    for position in range(0, len(code.code), 2):
+        opcode, argument = code.code[position], code.code[position + 1]
+        if opcode in (LOAD_CONST, RAISE_NAME_ERROR, CALL_BUILTIN):
+            detail = "%d (%s)" % (argument, repr(code.consts[argument]) if not isinstance(code.consts[argument], ast.Dice) else code.consts[argument])
+        elif opcode in (LOAD_LOCAL, STORE_LOCAL, DECLARE):
+            detail = "%d (%s)" % (argument, code.names[argument])
+        elif opcode == COMPARE:
+            detail = "%d (%s)" % (argument, COMPARISON_SYMBOLS[argument])
+        elif opcode in (CALL, TAIL_CALL) and argument < len(functions):
+            detail = "%d (%s)" % (argument, functions[argument].name)
+        elif opcode in JUMPS or opcode in (CALL, TAIL_CALL, RAISE_ARGUMENT_ERROR):
+            detail = str(argument)
+        else:
+            detail = ''
+        lines.append("%s %5d %-22s %s" % ('>>' if position in targets else '  ', position, OPCODE_NAMES[opcode], detail))
+    return '\n'.join(line.rstrip() for line in lines)
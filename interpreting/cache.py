@@ -0,0 +1,99 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+from parsing import ast
+
+# bump whenever the ast classes or their meaning change, old cache files are ignored afterwards
+INTERPRETER_VERSION = '0.4'
+CACHE_FORMAT_VERSION = 1
+CACHE_MAGIC = b'DNDLANG-AST'
+CACHE_DIRECTORY = '__dndcache__'
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+class ProgramCache:
+    '''On-disk cache of parsed programs, the .pyc of dndlang scripts'''
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @staticmethod
+    def for_script(script_path: str) -> 'ProgramCache':
+        # FILE.adv -> __dndcache__/FILE.adv.dndlang-VERSION.ast, next to the script
+        directory, name = os.path.split(os.path.abspath(script_path))
+        return ProgramCache(os.path.join(directory, CACHE_DIRECTORY, "%s.dndlang-%s.ast" % (name, INTERPRETER_VERSION)))
+
+    def header(self, source: str) -> dict:
+        return {
+            'magic': CACHE_MAGIC,
+            'format': CACHE_FORMAT_VERSION,
+            'version': INTERPRETER_VERSION,
+            'source_hash': source_hash(source)
+        }
+
+    def code_path(self, optimized: bool = False) -> str:
+        # the transpiled program, only valid for the Python version which compiled it
+        return "%s.%s%s.pyc" % (os.path.splitext(self.path)[0], sys.implementation.cache_tag, '.opt-1' if optimized else '')
+
+    def code_header(self, source: str) -> dict:
+        header = self.header(source)
+        header['python_magic'] = importlib.util.MAGIC_NUMBER
+        return header
+
+    def load(self, source: str) -> ast.Program:
+        # returns None if there is no valid cache entry for this source
+        try:
+            with open(self.path, 'rb') as file:
+                # the header is a separate pickle, the program is only unpickled if it matches
+                if pickle.load(file) != self.header(source):
+                    return None
+                program = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError, ValueError):
+            # missing, stale or corrupted cache file
+            return None
+        if not isinstance(program, ast.Program):
+            return None
+        return program
+
+    def store(self, source: str, program: ast.Program) -> bool:
+        # returns False if the program couldn't be cached, which is never an error
+        try:
+            self.write(self.path, pickle.dumps(self.header(source), pickle.HIGHEST_PROTOCOL) \
+                                  + pickle.dumps(program, pickle.HIGHEST_PROTOCOL))
+        except (OSError, pickle.PicklingError, RecursionError):
+            return False
+        return True
+
+    def load_code(self, source: str, optimized: bool = False):
+        # returns the cached code object of the transpiled program, None if there is none for this source
+        try:
+            with open(self.code_path(optimized), 'rb') as file:
+                if pickle.load(file) != self.code_header(source):
+                    return None
+                return marshal.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError, ValueError):
+            return None
+
+    def store_code(self, source: str, code, optimized: bool = False) -> bool:
+        try:
+            self.write(self.code_path(optimized), pickle.dumps(self.code_header(source), pickle.HIGHEST_PROTOCOL) + marshal.dumps(code))
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def write(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok = True)
+        # written to a temporary file first, so a reader never sees a partially written cache file
+        descriptor, temporary_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
@@ -0,0 +1,288 @@
+import operator
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.scope import Scope, Frame, UNDECLARED
+from interpreting.error_handling import UndeclaredVariableError
+from interpreting.memoization import Memoizer
+from interpreting.builtins import BUILTINS
+
+ARITHMETIC_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.ASTERISK: operator.mul,
+    TokenType.SLASH: operator.truediv
+}
+
+COMPARISON_OPERATORS = {
+    TokenType.LESS_THAN: operator.lt,
+    TokenType.MORE_THAN: operator.gt,
+    TokenType.LESS_OR_EQUAL: operator.le,
+    TokenType.MORE_OR_EQUAL: operator.ge,
+    TokenType.EQUALS: operator.eq
+}
+
+class ClosureCompiler:
+    '''Turns the program into nested closures, every dispatch on node or operator type happens once, at compile time.
+
+    Instructions compile to run(scope), returning the returned value or None, and assignables compile
+    to evaluate(scope), behaving exactly like Node.execute and Node.evaluate do.'''
+    def __init__(self, program: ast.Program, memoizer: Memoizer = None):
+        self.program = program
+        self.memoizer = memoizer
+        # function name -> [frame size, compiled block, cached call], the blocks are filled in once every function has its entry
+        self.functions = {}
+        self.instruction_compilers = {
+            ast.Declaration: self.compile_declaration,
+            ast.Assignment: self.compile_assignment,
+            ast.While: self.compile_while,
+            ast.If: self.compile_if,
+            ast.Log: self.compile_log,
+            ast.Return: self.compile_return,
+            ast.FunctionCall: self.compile_function_call_instruction
+        }
+        self.assignable_compilers = {
+            ast.Expression: self.compile_expression,
+            ast.Number: self.compile_constant,
+            ast.String: self.compile_constant,
+            ast.Dice: self.compile_dice,
+            ast.Variable: self.compile_variable,
+            ast.DiceRoll: self.compile_dice_roll,
+            ast.FunctionCall: self.compile_function_call
+        }
+
+    def compile(self) -> list:
+        # returns the compiled top level instructions
+        for function in self.program.functions:
+            self.functions[function.name] = [function.frame_size, None, None]
+        for function in self.program.functions:
+            self.functions[function.name][1] = self.compile_block(function.block.instructions)
+            if self.memoizer is not None:
+                self.functions[function.name][2] = self.memoizer.wrap(function.name, self.compile_call(function.name))
+        return [self.compile_instruction(instruction) for instruction in self.program.instructions]
+
+    def compile_instruction(self, instruction: ast.Instruction):
+        compiler = self.instruction_compilers.get(type(instruction))
+        if compiler is None:
+            # nothing to gain for the remaining nodes, they keep running on the tree
+            return instruction.execute
+        return compiler(instruction)
+
+    def compile_assignable(self, assignable: ast.Assignable):
+        compiler = self.assignable_compilers.get(type(assignable))
+        if compiler is None:
+            return assignable.evaluate
+        return compiler(assignable)
+
+    def compile_block(self, instructions: list):
+        compiled = tuple(self.compile_instruction(instruction) for instruction in instructions)
+        def run(scope: Scope):
+            for instruction in compiled:
+                result = instruction(scope)
+                if result is not None:
+                    return result
+        return run
+
+    def compile_declaration(self, declaration: ast.Declaration):
+        slot = declaration.var.slot
+        def run(scope: Scope):
+            scope.slots[slot] = None
+        return run
+
+    def compile_assignment(self, assignment: ast.Assignment):
+        slot = assignment.lhs.slot
+        name = assignment.lhs.name
+        rhs = self.compile_assignable(assignment.rhs)
+        def run(scope: Scope):
+            value = rhs(scope)
+            if scope.slots[slot] is UNDECLARED:
+                raise UndeclaredVariableError(name)
+            scope.slots[slot] = value
+        return run
+
+    def compile_while(self, instruction: ast.While):
+        condition = self.compile_condition(instruction.condition)
+        block = tuple(self.compile_instruction(i) for i in instruction.block.instructions)
+        def run(scope: Scope):
+            # values returned inside a loop are discarded, like While.execute does
+            while condition(scope):
+                for i in block:
+                    i(scope)
+        return run
+
+    def compile_if(self, instruction: ast.If):
+        condition = self.compile_condition(instruction.condition)
+        if_block = self.compile_block(instruction.if_block.instructions)
+        if instruction.else_block is None:
+            def run(scope: Scope):
+                if condition(scope):
+                    return if_block(scope)
+        else:
+            else_block = self.compile_block(instruction.else_block.instructions)
+            def run(scope: Scope):
+                if condition(scope):
+                    return if_block(scope)
+                return else_block(scope)
+        return run
+
+    def compile_condition(self, condition: ast.Condition):
+        if isinstance(condition, ast.ConstantCondition):
+            value = condition.value
+            return lambda scope: value
+        compare = COMPARISON_OPERATORS[condition.operator]
+        first_operand = self.compile_assignable(condition.first_operand)
+        second_node = self.unwrap(condition.second_operand)
+        if isinstance(second_node, ast.Number):
+            # comparing against a number literal, by far the most common loop condition
+            constant = second_node.value
+            first_slot = self.variable_slot(condition.first_operand)
+            if first_slot is not None:
+                name = self.unwrap(condition.first_operand).name
+                def evaluate(scope: Scope) -> bool:
+                    value = scope.slots[first_slot]
+                    if value is UNDECLARED:
+                        raise UndeclaredVariableError(name)
+                    return compare(value, constant)
+            else:
+                def evaluate(scope: Scope) -> bool:
+                    return compare(first_operand(scope), constant)
+            return evaluate
+        second_operand = self.compile_assignable(condition.second_operand)
+        def evaluate(scope: Scope) -> bool:
+            return compare(first_operand(scope), second_operand(scope))
+        return evaluate
+
+    def unwrap(self, assignable: ast.Assignable) -> ast.Assignable:
+        # the parser wraps every operand into single operand expressions
+        while type(assignable) is ast.Expression and len(assignable.operators) == 0:
+            assignable = assignable.operands[0]
+        return assignable
+
+    def variable_slot(self, assignable: ast.Assignable) -> int:
+        # returns the slot if the assignable is a plain variable read, None otherwise
+        assignable = self.unwrap(assignable)
+        return assignable.slot if type(assignable) is ast.Variable else None
+
+    def compile_log(self, instruction: ast.Log):
+        value = self.compile_assignable(instruction.value)
+        def run(scope: Scope):
+            print(value(scope))
+        return run
+
+    def compile_return(self, instruction: ast.Return):
+        return self.compile_assignable(instruction.value)
+
+    def compile_constant(self, literal: ast.Literal):
+        value = literal.value
+        def evaluate(scope: Scope):
+            return value
+        return evaluate
+
+    def compile_dice(self, dice: ast.Dice):
+        def evaluate(scope: Scope):
+            return dice
+        return evaluate
+
+    def compile_variable(self, variable: ast.Variable):
+        slot = variable.slot
+        name = variable.name
+        def evaluate(scope: Scope):
+            value = scope.slots[slot]
+            if value is UNDECLARED:
+                raise UndeclaredVariableError(name)
+            return value
+        return evaluate
+
+    def compile_dice_roll(self, dice_roll: ast.DiceRoll):
+        if isinstance(dice_roll.operand, ast.Dice):
+            roll = dice_roll.operand.roll
+            def evaluate(scope: Scope):
+                return roll()
+        elif isinstance(dice_roll.operand, ast.Variable):
+            dice = self.compile_variable(dice_roll.operand)
+            def evaluate(scope: Scope):
+                return dice(scope).roll()
+        else:
+            return dice_roll.evaluate
+        return evaluate
+
+    def compile_expression(self, expression: ast.Expression):
+        numeric = ast.NUMERIC_TYPES
+        if len(expression.operators) == 0:
+            if expression.operands[0] is None:
+                return lambda scope: None
+            return self.compile_assignable(expression.operands[0])
+
+        operand_nodes = expression.operands
+        operands = [self.compile_assignable(operand) for operand in operand_nodes]
+        operators = [ARITHMETIC_OPERATORS[operator] for operator in expression.operators]
+        if len(operators) == 1:
+            first, second = operands
+            first_node, second_node = operand_nodes
+            apply = operators[0]
+            constant = self.unwrap(second_node)
+            if isinstance(constant, ast.Number):
+                # number literals don't need the type check
+                constant = constant.value
+                def evaluate(scope: Scope):
+                    a = first(scope)
+                    if not isinstance(a, numeric): raise TypeError(first_node)
+                    return apply(a, constant)
+                return evaluate
+            def evaluate(scope: Scope):
+                a = first(scope)
+                if not isinstance(a, numeric): raise TypeError(first_node)
+                b = second(scope)
+                if not isinstance(b, numeric): raise TypeError(second_node)
+                return apply(a, b)
+            return evaluate
+
+        first = operands[0]
+        first_node = operand_nodes[0]
+        rest = tuple(zip(operators, operands[1:], operand_nodes[1:]))
+        def evaluate(scope: Scope):
+            value = first(scope)
+            if not isinstance(value, numeric): raise TypeError(first_node)
+            for apply, operand, node in rest:
+                next_value = operand(scope)
+                if not isinstance(next_value, numeric): raise TypeError(node)
+                value = apply(value, next_value)
+            return value
+        return evaluate
+
+    def compile_function_call(self, call: ast.FunctionCall):
+        # the linker made sure the function exists and takes these arguments
+        arguments = tuple(self.compile_assignable(argument) for argument in call.arguments)
+        if call.name not in self.functions:
+            builtin = BUILTINS[call.name].memo
+            def evaluate(scope: Scope):
+                return builtin(*[argument(scope) for argument in arguments])
+            return evaluate
+        function = self.functions[call.name]
+        if self.memoizer is not None and call.name in self.memoizer.pure:
+            def evaluate(scope: Scope):
+                return function[2](*[argument(scope) for argument in arguments])
+            return evaluate
+        def evaluate(scope: Scope):
+            frame_size, block, memo = function
+            # parameters take the first slots of the frame
+            function_scope = Frame(frame_size)
+            slots = function_scope.slots
+            for i, argument in enumerate(arguments):
+                slots[i] = argument(scope)
+            return block(function_scope)
+        return evaluate
+
+    def compile_call(self, name: str):
+        # the function called with argument values, what the memoizer caches
+        frame_size, block, memo = self.functions[name]
+        def call(*arguments):
+            function_scope = Frame(frame_size)
+            function_scope.slots[:len(arguments)] = arguments
+            return block(function_scope)
+        return call
+
+    def compile_function_call_instruction(self, call: ast.FunctionCall):
+        evaluate = self.compile_function_call(call)
+        def run(scope: Scope):
+            evaluate(scope)
+        return run
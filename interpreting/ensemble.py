@@ -0,0 +1,324 @@
+from collections import Counter
+import numpy
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.closure_compiler import ARITHMETIC_OPERATORS, COMPARISON_OPERATORS
+from interpreting.builtins import BUILTINS
+from interpreting import entities
+from interpreting.scope import UNDECLARED
+from interpreting.error_handling import UndeclaredVariableError
+
+NUMBERS = (int, float, numpy.integer, numpy.floating)
+FLOATS = (float, numpy.floating)
+INTEGERS = (int, numpy.integer)
+INT64_MAX = int(numpy.iinfo(numpy.int64).max)
+
+def lane_values(value, lanes: int) -> numpy.ndarray:
+    # the value of every lane, as an array
+    if isinstance(value, numpy.ndarray):
+        return value
+    values = numpy.empty(lanes, dtype = object)
+    values.fill(value)
+    return values
+
+def is_numeric(value) -> bool:
+    if isinstance(value, numpy.ndarray):
+        # object arrays hold integers too large for int64
+        return value.dtype.kind in 'iuf' or (value.dtype == object and all(isinstance(v, NUMBERS) for v in value))
+    return isinstance(value, ast.NUMERIC_TYPES)
+
+def is_integral(value) -> bool:
+    if isinstance(value, numpy.ndarray):
+        return value.dtype.kind in 'iu'
+    return isinstance(value, INTEGERS)
+
+def largest(value) -> int:
+    # the largest absolute value of an integer or of the lanes of an integer array
+    if isinstance(value, numpy.ndarray):
+        return max(abs(int(value.min())), abs(int(value.max())))
+    return abs(int(value))
+
+def python_values(value):
+    # the lanes as Python numbers, which are never too large
+    if isinstance(value, numpy.ndarray):
+        if value.dtype != object:
+            return value.astype(object)
+        return numpy.array([v.item() if isinstance(v, numpy.generic) else v for v in value], dtype = object)
+    return value.item() if isinstance(value, numpy.generic) else value
+
+def fits_int64(values: numpy.ndarray) -> bool:
+    return all(isinstance(value, INTEGERS) and -INT64_MAX - 1 <= value <= INT64_MAX for value in values)
+
+def simplify(values: numpy.ndarray):
+    # object arrays become a single value if every lane has the same one, or a numeric array if they all are numbers
+    first = values[0]
+    if all(value is first or (type(value) is type(first) and value == first) for value in values):
+        return first
+    if all(isinstance(value, NUMBERS) for value in values):
+        if any(isinstance(value, FLOATS) for value in values):
+            return values.astype(float)
+        # integers too large for int64 stay Python ints
+        if fits_int64(values):
+            return values.astype(numpy.int64)
+    return values
+
+class LaneFrame:
+    '''Variables of a call (or of the top level) in every lane, inactive holds the lanes not making the call'''
+    __slots__ = ('slots', 'inactive')
+    def __init__(self, size: int, inactive: numpy.ndarray) -> None:
+        self.slots = [UNDECLARED] * size
+        self.inactive = inactive
+
+class Ensemble:
+    '''Runs a resolved and linked program for many trials at once, lanes of them.
+
+    Every value is either the same for all lanes (a plain value) or a numpy array with one value per lane,
+    arithmetic and comparisons work elementwise. Instructions run for a mask of active lanes: if and while
+    narrow it with their condition, returns take lanes out of the rest of the block, and assignments only
+    change the active lanes. Dice rolls roll every lane independently. The output of ? is recorded with
+    the lanes printing it, it can be printed per lane or summarized. Every lane spawns its characters into
+    a store of its own, forked from store when the lane first calls a builtin which isn't pure.'''
+    def __init__(self, program: ast.Program, lanes: int, store: entities.EntityStore = None) -> None:
+        self.program = program
+        self.lanes = lanes
+        self.store = entities.EntityStore() if store is None else store
+        self.stores = [None] * lanes
+        self.frame = LaneFrame(program.frame_size, numpy.zeros(lanes, dtype = bool))
+        # (active lanes, value) for every executed ?
+        self.output = []
+        # the InterpreterError that stopped the run, printed after the output
+        self.error = None
+        self.all_lanes = numpy.ones(lanes, dtype = bool)
+        self.no_lanes = numpy.zeros(lanes, dtype = bool)
+        self.all_lanes.setflags(write = False)
+        self.no_lanes.setflags(write = False)
+
+    def run(self, instruction: ast.Instruction) -> None:
+        # runs a top level instruction, values returned by it are discarded
+        self.execute(instruction, self.frame, self.all_lanes)
+
+    def assign(self, frame: LaneFrame, slot: int, mask: numpy.ndarray, value) -> None:
+        # the lanes not making the call never read the variable, they can take any value
+        frame.slots[slot] = self.select(mask | frame.inactive, value, frame.slots[slot])
+
+    def select(self, mask: numpy.ndarray, value, other):
+        # value in the lanes of the mask, other in the rest
+        if mask.all():
+            return value
+        if is_numeric(value) and is_numeric(other):
+            return numpy.where(mask, value, other)
+        values = lane_values(other, self.lanes).astype(object)
+        values[mask] = value[mask] if isinstance(value, numpy.ndarray) else value
+        return simplify(values)
+
+    def execute_block(self, instructions: list, frame: LaneFrame, mask: numpy.ndarray):
+        # returns the lanes which returned a value (None if no lane did) and their values
+        returned = None
+        result = None
+        for instruction in instructions:
+            returning = self.execute(instruction, frame, mask)
+            if returning is not None:
+                lanes, value = returning
+                # the result only matters in the returned lanes
+                if returned is None:
+                    returned, result = lanes, value
+                else:
+                    returned, result = returned | lanes, self.select(lanes, value, result)
+                mask = mask & ~lanes
+                if not mask.any():
+                    break
+        return returned, result
+
+    def execute(self, instruction: ast.Instruction, frame: LaneFrame, mask: numpy.ndarray):
+        # returns None, or the lanes which returned a value and their values, like execute returns the value
+        if isinstance(instruction, ast.Assignment):
+            value = self.evaluate(instruction.rhs, frame, mask)
+            self.check_declared(instruction.lhs, frame, mask)
+            self.assign(frame, instruction.lhs.slot, mask, value)
+        elif isinstance(instruction, ast.Declaration):
+            # executed again (in a loop) it resets the variable
+            self.assign(frame, instruction.var.slot, mask, None)
+        elif isinstance(instruction, ast.Return):
+            value = self.evaluate(instruction.value, frame, mask)
+            if value is None:
+                return None
+            if isinstance(value, numpy.ndarray) and value.dtype == object:
+                lanes = mask & (value != None)
+                return (lanes, value) if lanes.any() else None
+            return mask, value
+        elif isinstance(instruction, ast.If):
+            condition = self.condition(instruction.condition, frame, mask)
+            returned, value = None, None
+            if_mask = mask & condition
+            if if_mask.any():
+                returned, value = self.execute_block(instruction.if_block.instructions, frame, if_mask)
+            else_mask = mask & ~condition
+            if instruction.else_block is not None and else_mask.any():
+                else_returned, else_value = self.execute_block(instruction.else_block.instructions, frame, else_mask)
+                if returned is None:
+                    returned, value = else_returned, else_value
+                elif else_returned is not None:
+                    returned, value = returned | else_returned, self.select(else_returned, else_value, value)
+            return None if returned is None else (returned, value)
+        elif isinstance(instruction, ast.While):
+            # values returned inside a loop are discarded, like While.execute does
+            while True:
+                mask = mask & self.condition(instruction.condition, frame, mask)
+                if not mask.any():
+                    break
+                for i in instruction.block.instructions:
+                    self.execute(i, frame, mask)
+        elif isinstance(instruction, ast.Log):
+            self.output.append((mask, self.evaluate(instruction.value, frame, mask)))
+        elif isinstance(instruction, ast.FunctionCall):
+            self.evaluate(instruction, frame, mask)
+        elif isinstance(instruction, ast.AttackMove):
+            # every lane attacks with the characters of its own store, and only the lanes running the attack do
+            attackers = lane_values(self.evaluate(instruction.attacker, frame, mask), self.lanes)
+            defenders = lane_values(self.evaluate(instruction.defender, frame, mask), self.lanes)
+            for lane in numpy.flatnonzero(mask):
+                entities.attack(attackers[lane], defenders[lane])
+        return None
+
+    def condition(self, condition: ast.Condition, frame: LaneFrame, mask: numpy.ndarray) -> numpy.ndarray:
+        if isinstance(condition, ast.ConstantCondition):
+            result = condition.value
+        else:
+            first = self.evaluate(condition.first_operand, frame, mask)
+            second = self.evaluate(condition.second_operand, frame, mask)
+            result = COMPARISON_OPERATORS[condition.operator](first, second)
+        if isinstance(result, numpy.ndarray):
+            return result.astype(bool, copy = False)
+        # the same in every lane
+        return self.all_lanes if result else self.no_lanes
+
+    def check_declared(self, variable: ast.Variable, frame: LaneFrame, mask: numpy.ndarray) -> None:
+        # lanes which didn't run the declaration of the variable hold UNDECLARED, it's an error in the active ones
+        value = frame.slots[variable.slot]
+        if value is UNDECLARED or (isinstance(value, numpy.ndarray) and value.dtype == object
+                                   and any(v is UNDECLARED for v in value[mask])):
+            raise UndeclaredVariableError(variable.name)
+
+    def evaluate(self, assignable: ast.Assignable, frame: LaneFrame, mask: numpy.ndarray):
+        if isinstance(assignable, ast.Variable):
+            self.check_declared(assignable, frame, mask)
+            return frame.slots[assignable.slot]
+        if isinstance(assignable, ast.DiceRoll):
+            return self.roll(self.evaluate(assignable.operand, frame, mask))
+        if isinstance(assignable, ast.Expression):
+            value = self.evaluate(assignable.operands[0], frame, mask)
+            if not assignable.operators:
+                return value
+            if not is_numeric(value): raise TypeError(assignable.operands[0])
+            for operator, operand in zip(assignable.operators, assignable.operands[1:]):
+                next_value = self.evaluate(operand, frame, mask)
+                if not is_numeric(next_value): raise TypeError(operand)
+                value = self.arithmetic(operator, value, next_value, mask)
+            return value
+        if isinstance(assignable, ast.FunctionCall):
+            return self.call(assignable, [self.evaluate(argument, frame, mask) for argument in assignable.arguments], mask)
+        # literals
+        return assignable.evaluate(None)
+
+    def arithmetic(self, operator: TokenType, first, second, mask: numpy.ndarray):
+        # gives what single runs give: integers don't wrap around, they become Python ints in an object array
+        # when int64 could overflow, and dividing by 0 is an error in the lanes running the division only
+        if operator == TokenType.SLASH:
+            if isinstance(second, numpy.ndarray):
+                zero = second == 0
+                if (zero & mask).any():
+                    raise ZeroDivisionError("division by zero")
+                if zero.any():
+                    second = numpy.where(zero, 1, second)
+            elif second == 0:
+                raise ZeroDivisionError("division by zero")
+        arrays = [value for value in (first, second) if isinstance(value, numpy.ndarray)]
+        if not arrays:
+            return ARITHMETIC_OPERATORS[operator](first, second)
+        if any(array.dtype == object for array in arrays) or (is_integral(first) and is_integral(second) and self.may_overflow(operator, first, second)):
+            return ARITHMETIC_OPERATORS[operator](python_values(first), python_values(second))
+        return ARITHMETIC_OPERATORS[operator](first, second)
+
+    @staticmethod
+    def may_overflow(operator: TokenType, first, second) -> bool:
+        a, b = largest(first), largest(second)
+        if operator == TokenType.ASTERISK:
+            return a * b > INT64_MAX
+        if operator == TokenType.SLASH:
+            return max(a, b) > INT64_MAX
+        return a + b > INT64_MAX
+
+    def roll(self, dice):
+        if isinstance(dice, ast.Dice):
+            return dice.roll_many(self.lanes)
+        if not isinstance(dice, numpy.ndarray) or not all(isinstance(value, ast.Dice) for value in dice):
+            raise TypeError(dice)
+        # lanes holding different dice, every kind rolled for its lanes
+        rolls = numpy.empty(self.lanes, dtype = numpy.int64)
+        for kind in set(dice):
+            lanes = dice == kind
+            rolls[lanes] = kind.roll_many(int(lanes.sum()))
+        return rolls
+
+    def call(self, call: ast.FunctionCall, arguments: list, mask: numpy.ndarray):
+        if not mask.any():
+            return None
+        definition = call.definition
+        if definition.name in BUILTINS and definition is BUILTINS[definition.name]:
+            if definition.pure and not any(isinstance(argument, numpy.ndarray) for argument in arguments):
+                return definition.memo(*arguments)
+            # builtins which aren't pure spawn or change characters, every lane calls them in its own store
+            values = numpy.empty(self.lanes, dtype = object)
+            # the arguments of a lane are Python values, like in a single run
+            lanes = [python_values(lane_values(argument, self.lanes)) for argument in arguments]
+            active = numpy.flatnonzero(mask)
+            previous = entities.active
+            try:
+                for lane in active:
+                    if not definition.pure:
+                        entities.use(self.lane_store(lane))
+                    values[lane] = definition.memo(*[argument[lane] for argument in lanes])
+            finally:
+                entities.use(previous)
+            # inactive lanes get a value of an active one, so they can't make the result look mixed
+            values[~mask] = values[active[0]]
+            return simplify(values)
+        frame = LaneFrame(definition.frame_size, ~mask)
+        frame.slots[:len(arguments)] = arguments
+        returned, value = self.execute_block(definition.block.instructions, frame, mask)
+        if returned is None:
+            return None
+        # lanes which didn't return anything get None
+        return self.select(returned | ~mask, value, None)
+
+    def lane_store(self, lane: int) -> entities.EntityStore:
+        if self.stores[lane] is None:
+            self.stores[lane] = self.store.fork()
+        return self.stores[lane]
+
+    def lane_output(self, lane: int) -> str:
+        # what a single run would have printed
+        output = ''.join("%s\n" % (value[lane] if isinstance(value, numpy.ndarray) else value)
+                         for mask, value in self.output if mask[lane])
+        return output if self.error is None else output + "%s\n" % self.error
+
+    def summary(self) -> str:
+        # a line for every executed ?, with what it printed in the lanes running it, and the error stopping the run
+        lines = []
+        for mask, value in self.output:
+            count = int(mask.sum())
+            lanes = '' if count == self.lanes else " (%d lanes)" % count
+            if isinstance(value, numpy.ndarray):
+                value = simplify(value[mask]) if value.dtype == object else value[mask]
+                if isinstance(value, numpy.ndarray) and value.dtype != object and value.min() == value.max():
+                    value = value[0]
+            if not isinstance(value, numpy.ndarray):
+                lines.append("%s%s" % (value, lanes))
+            elif value.dtype != object:
+                lines.append("mean %.6g, sd %.6g, min %s, max %s%s" % (value.mean(), value.std(), value.min(), value.max(), lanes))
+            else:
+                counts = Counter(str(v) for v in value)
+                lines.append(', '.join("%s x%d" % item for item in sorted(counts.items())) + lanes)
+        if self.error is not None:
+            lines.append(str(self.error))
+        return '\n'.join(lines)
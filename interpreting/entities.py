@@ -0,0 +1,218 @@
+import copy
+import numpy
+from parsing import ast
+from interpreting.error_handling import MultipleNameError
+from interpreting.progression import Growth
+
+# stats of every spawned character, a column each
+STATS = ('health', 'attack', 'defence', 'level', 'exp', 'reqexp')
+# stats of characters whose template leaves them out, the rest start at 0
+DEFAULT_STATS = { 'level': 1 }
+# equipped items add these to the stats of the character
+ITEM_STATS = ('health', 'attack', 'defence')
+# rows the columns have at first, they double whenever they are full
+INITIAL_CAPACITY = 64
+
+class Entity:
+    '''A spawned character: the row holding its stats in the columns of the store'''
+    __slots__ = ('store', 'index')
+    def __init__(self, store: 'EntityStore', index: int) -> None:
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Entity) and other.store is self.store and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.store), self.index))
+
+    def rows(self) -> slice:
+        return slice(self.index, self.index + 1)
+
+    def __str__(self) -> str:
+        return "%s#%d" % (self.store.template_name(self.index), self.index)
+
+class Group:
+    '''Characters spawned together, the rows start .. stop - 1 of the store'''
+    __slots__ = ('store', 'start', 'stop')
+    def __init__(self, store: 'EntityStore', start: int, stop: int) -> None:
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Group) and other.store is self.store and (other.start, other.stop) == (self.start, self.stop)
+
+    def __hash__(self) -> int:
+        return hash((id(self.store), self.start, self.stop))
+
+    def rows(self) -> slice:
+        return slice(self.start, self.stop)
+
+    def __str__(self) -> str:
+        if self.start == self.stop:
+            return "0 x nobody"
+        return "%d x %s" % (self.stop - self.start, self.store.template_name(self.start))
+
+class EntityStore:
+    '''The characters spawned from the templates of a program, stored by columns instead of by entity.
+
+    Every stat is a numpy array with a row per spawned character, and the template column tells which
+    template it came from; Entity and Group are just row numbers, so a script can spawn hundreds of
+    thousands of characters without an object per character. The stats a template starts with (its own
+    ones plus those of its equipped items) are computed once, in base, and the growth of its stats with
+    every level in growth.'''
+    def __init__(self, templates: list = ()) -> None:
+        # line of the template being loaded, for error messages
+        self.line_no = 0
+        self.load(templates)
+
+    def load(self, templates: list) -> None:
+        items = {}
+        characters = []
+        seen = set()
+        for template in templates:
+            self.line_no = template.line_no
+            if template.name in seen:
+                raise MultipleNameError(template.name)
+            seen.add(template.name)
+            if isinstance(template, ast.Item):
+                items[template.name] = template
+            else:
+                characters.append(template)
+        # template name -> its row in base
+        self.templates = {}
+        self.names = []
+        self.base = numpy.zeros((len(characters), len(STATS)), dtype = numpy.int64)
+        # what the equipped items add, levels don't grow it
+        self.bonus = numpy.zeros((len(characters), len(STATS)), dtype = numpy.int64)
+        # stat -> Growth of the stats with a growth rule, for every template; the level itself just goes up
+        self.growth = []
+        for row, character in enumerate(characters):
+            self.line_no = character.line_no
+            self.templates[character.name] = row
+            self.names.append(character.name)
+            growth = {}
+            for column, stat in enumerate(STATS):
+                attribute = getattr(character, stat, None)
+                self.base[row, column] = DEFAULT_STATS.get(stat, 0) if attribute is None else attribute.value
+                if attribute is not None and attribute.increase_type is not None and stat != 'level':
+                    growth[stat] = Growth(attribute.increase_type, attribute.increase_amount)
+            self.growth.append(growth)
+            for name, amount in getattr(character, 'equipped', []):
+                if name not in items:
+                    raise NameError(name)
+                for stat in ITEM_STATS:
+                    value = getattr(items[name], stat, None)
+                    if value is not None:
+                        self.bonus[row, STATS.index(stat)] += value.value * amount
+        self.base += self.bonus
+        self.clear()
+
+    def fork(self) -> 'EntityStore':
+        # a store of the same templates without any characters, for another run
+        store = copy.copy(self)
+        store.clear()
+        return store
+
+    def clear(self) -> None:
+        self.size = 0
+        self.columns = { stat: numpy.zeros(INITIAL_CAPACITY, dtype = numpy.int64) for stat in STATS }
+        self.template = numpy.zeros(INITIAL_CAPACITY, dtype = numpy.int32)
+
+    def reserve(self, size: int) -> None:
+        capacity = len(self.template)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for stat, column in self.columns.items():
+            self.columns[stat] = numpy.resize(column, capacity)
+        self.template = numpy.resize(self.template, capacity)
+
+    def spawn(self, name: str, count: int) -> Group:
+        # count new characters of the template, with its starting stats
+        if name not in self.templates:
+            raise NameError(name)
+        row = self.templates[name]
+        start, stop = self.size, self.size + count
+        self.reserve(stop)
+        for column, stat in enumerate(STATS):
+            self.columns[stat][start:stop] = self.base[row, column]
+        self.template[start:stop] = row
+        self.size = stop
+        return Group(self, start, stop)
+
+    def column(self, stat: str) -> numpy.ndarray:
+        # the stat of every spawned character
+        if stat not in self.columns:
+            raise NameError(stat)
+        return self.columns[stat]
+
+    def attack(self, attackers: slice, defenders: slice) -> None:
+        # every living attacker hits a defender for its attack minus the defender's defence, the smaller side
+        # wraps around when the sides aren't the same size. The hits land at once, from the stats before them,
+        # health doesn't go below 0
+        attacking = attackers.stop - attackers.start
+        defending = defenders.stop - defenders.start
+        if attacking == 0 or defending == 0:
+            return
+        health, attack, defence = self.columns['health'], self.columns['attack'], self.columns['defence']
+        if attacking == defending:
+            damage = numpy.maximum(attack[attackers] - defence[defenders], 0) * (health[attackers] > 0)
+            health[defenders] = numpy.maximum(health[defenders] - damage, 0)
+            return
+        pairs = numpy.arange(max(attacking, defending))
+        attacker_rows = attackers.start + pairs % attacking
+        defender_indices = pairs % defending
+        damage = numpy.maximum(attack[attacker_rows] - defence[defenders.start + defender_indices], 0) * (health[attacker_rows] > 0)
+        # the hits of every defender summed
+        total = numpy.bincount(defender_indices, weights = damage, minlength = defending).astype(numpy.int64)
+        health[defenders] = numpy.maximum(health[defenders] - total, 0)
+
+    def level_up(self, rows: slice, levels: int) -> None:
+        # the characters of rows (all of a template) gain levels at once, their stats grow from what they are now
+        if rows.start == rows.stop or levels == 0:
+            return
+        row = self.template[rows.start]
+        for stat, growth in self.growth[row].items():
+            column = self.columns[stat]
+            bonus = self.bonus[row, STATS.index(stat)]
+            column[rows] = growth.apply(column[rows] - bonus, levels) + bonus
+        self.columns['level'][rows] += levels
+
+    def stat_at(self, name: str, stat: str, level: int, expected: bool = False):
+        # the stat of a character of the template spawned and raised to level: an int, or its Distribution
+        # (its mean if expected) when dice are rolled every level
+        if name not in self.templates:
+            raise NameError(name)
+        if stat not in STATS:
+            raise NameError(stat)
+        row = self.templates[name]
+        column = STATS.index(stat)
+        levels = level - int(self.base[row, STATS.index('level')])
+        if levels < 0:
+            raise TypeError(level)
+        if stat == 'level':
+            return level
+        growth = self.growth[row].get(stat)
+        value = int(self.base[row, column] - self.bonus[row, column])
+        bonus = int(self.bonus[row, column])
+        if growth is None:
+            return value + bonus
+        return (growth.expected(value, levels) if expected else growth.at(value, levels)) + bonus
+
+    def template_name(self, index: int) -> str:
+        return self.names[self.template[index]]
+
+active = None
+
+def attack(attacker, defender) -> None:
+    # attacker >> defender, characters or groups of them
+    if not isinstance(attacker, (Entity, Group)) or not isinstance(defender, (Entity, Group)):
+        raise TypeError(attacker)
+    attacker.store.attack(attacker.rows(), defender.rows())
+
+def use(store: EntityStore) -> None:
+    global active
+    active = store
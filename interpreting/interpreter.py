@@ -1,49 +1,200 @@
-from io import TextIOWrapper
+from io import TextIOWrapper, StringIO
 from lexing.lexer import Lexer
 from parsing.parser import Parser
 from interpreting.scope import Scope
+from interpreting.cache import ProgramCache
+from interpreting.resolver import Resolver
+from interpreting.linker import Linker
+from interpreting.optimizer import Optimizer
+from interpreting.closure_compiler import ClosureCompiler
+from interpreting.vm import VirtualMachine, DEFAULT_MAX_DEPTH
+from interpreting import transpiler
+from interpreting.quickening import Quickener
+from interpreting.memoization import Memoizer, DEFAULT_MEMO_SIZE
+from interpreting.ensemble import Ensemble
+from interpreting import rolling, entities
 from interpreting.error_handling import InterpreterError, ArgumentError, MultipleNameError, UndeclaredVariableError
 
+# execution engines: walking the tree (as is or with self-specializing nodes), running the program compiled
+# to closures, to bytecode or to Python
+ENGINES = ('tree', 'adaptive', 'closure', 'vm', 'python')
+
 class Interpreter:
-    def __init__(self, io: TextIOWrapper):
-        self.lexer = Lexer(io)
-        self.parser = Parser(self.lexer)
+    def __init__(self, io: TextIOWrapper, cache: ProgramCache = None, engine: str = 'tree', optimize: bool = False, \
+                 memo_size: int = DEFAULT_MEMO_SIZE, max_depth: int = DEFAULT_MAX_DEPTH, rng: str = 'stdlib', seed: int = None):
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: " + engine)
+        self.engine = engine
+        # the dice roll with this generator while the interpreter runs, unseeded stdlib rolls with the random module
+        self.rng_kind = rng
+        self.seed = seed
+        self.rng = rolling.make_rng(rng, seed)
+        # only the vm engine limits the call depth itself, the others are limited by Python's recursion limit
+        self.max_depth = max_depth
+        self.memo_size = memo_size
+        self.optimizer = None
+        self.lexer = None
+        self.parser = None
         self.parsing_error = False
-        self.ast = self.parser.parse()
+        self.cache = cache
+        if cache is None:
+            self.ast = self.parse(io)
+        else:
+            self.source = source = io.read()
+            # a warm start skips lexing and parsing completely
+            self.ast = cache.load(source)
+            if self.ast is None:
+                self.ast = self.parse(StringIO(source))
+                cache.store(source, self.ast)
         if self.ast == -1:
             self.parsing_error = True
             return
-        self.scope = Scope()
+        if not self.resolve():
+            self.parsing_error = True
+            return
+        self.scope = Scope(self.ast.frame_size)
         self.load_function_definitions()
+        if not self.load_templates():
+            self.parsing_error = True
+            return
+        if not self.link():
+            self.parsing_error = True
+            return
+        if optimize:
+            self.optimizer = Optimizer(self.ast)
+            self.optimizer.optimize()
+        # results of pure functions are cached, memo_size 0 turns it off
+        self.memoizer = Memoizer(self.ast, memo_size)
+        self.runners = self.compile()
+
+    def __getstate__(self):
+        # pickled for worker processes: the prepared syntax tree goes, what was compiled from it is compiled again
+        state = dict(self.__dict__)
+        for name in ('lexer', 'parser', 'cache', 'resolver', 'scope', 'memoizer', 'runners', 'vm', 'rng'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cache = None
+        self.rng = rolling.make_rng(self.rng_kind, self.seed)
+        if self.parsing_error:
+            return
+        self.scope = Scope(self.ast.frame_size)
+        self.load_function_definitions()
+        self.memoizer = Memoizer(self.ast, self.memo_size)
+        self.runners = self.compile()
+
+    def parse(self, io: TextIOWrapper):
+        self.lexer = Lexer(io)
+        self.parser = Parser(self.lexer)
+        return self.parser.parse()
+
+    def resolve(self) -> bool:
+        # variables get their frame slots, declaration errors are reported before anything runs
+        self.resolver = Resolver(self.ast)
+        try:
+            self.resolver.resolve()
+        except (MultipleNameError, UndeclaredVariableError) as e:
+            self.report(e, self.resolver.line_no)
+            return False
+        return True
+
+    def load_templates(self) -> bool:
+        # the characters spawned from the templates live in the entity store, template errors are reported before anything runs
+        self.entities = entities.EntityStore()
+        try:
+            self.entities.load(self.ast.templates)
+        except (NameError, MultipleNameError) as e:
+            self.report(e, self.entities.line_no)
+            return False
+        return True
+
+    def link(self) -> bool:
+        # every call site gets its definition, call errors are reported before anything runs
+        linker = Linker(self.scope.definitions, self.resolver.call_sites)
+        try:
+            linker.link()
+        except (NameError, ArgumentError) as e:
+            self.report(e, linker.line_no)
+            return False
+        return True
+
+    def compile(self) -> list:
+        # returns a runner for every top level instruction, called with the global scope
+        if self.engine == 'closure':
+            return ClosureCompiler(self.ast, self.memoizer).compile()
+        if self.engine == 'vm':
+            self.vm = VirtualMachine(self.ast, self.memoizer, self.max_depth)
+            return self.vm.runners()
+        if self.engine == 'python':
+            return transpiler.load(self.transpile(), self.memoizer)
+        if self.engine == 'adaptive':
+            Quickener(self.ast).quicken()
+        for function in self.ast.functions:
+            function.memo = self.memoizer.wrap(function.name, function.call)
+        return [instruction.execute for instruction in self.ast.instructions]
+
+    def transpile(self):
+        # the code object is cached next to the parsed program, like a .pyc next to a module
+        optimized = self.optimizer is not None
+        code = None if self.cache is None else self.cache.load_code(self.source, optimized)
+        if code is None:
+            code = transpiler.Transpiler(self.ast).compile()
+            if self.cache is not None:
+                self.cache.store_code(self.source, code, optimized)
+        return code
 
     def execute(self):
         if self.parsing_error:
             return -1
-        for instruction in self.ast.instructions:
+        rolling.use(self.rng)
+        # every run starts without characters
+        self.entities.clear()
+        entities.use(self.entities)
+        for instruction, run in zip(self.ast.instructions, self.runners):
             try:
-                instruction.execute(self.scope)
-
-            except TypeError:
-                print(InterpreterError(e_type = "TypeError", msg = "Attempted arithmetic operation on unsupported type", line_no = instruction.line_no))
-                return -1
-            except RecursionError:
-                print(InterpreterError(e_type = "RecursionError", msg = "Recursion limit exceeded", line_no = instruction.line_no))
-                return -1
-            except ArgumentError as e:
-                print(InterpreterError(e_type = "ArgumentError", msg = "Function call missing " + str(e.missing_argument_count) \
-                                     + " argument" + ('s' if e.missing_argument_count > 1 else ''), line_no = instruction.line_no))
-                return -1
-            except NameError as e:
-                print(InterpreterError(e_type = "NameError", msg = "Name '" + e.args[0] + "' is not defined", line_no = instruction.line_no))
-                return -1
-            except MultipleNameError as e:
-                print(InterpreterError(e_type = "MultipleNameError", msg = "Name '" + e.args[0] + "' is already defined", line_no = instruction.line_no))
-                return -1
-            except UndeclaredVariableError as e:
-                print(InterpreterError(e_type = "UndeclaredVariableError", msg = "Variable '" + e.args[0] + "' is not declared", line_no = instruction.line_no))
+                run(self.scope)
+            except (TypeError, RecursionError, ArgumentError, NameError, MultipleNameError, UndeclaredVariableError) as e:
+                self.report(e, instruction.line_no)
                 return -1
         return 0
 
+    def execute_ensemble(self, lanes: int):
+        # runs the program for lanes trials at once, returns the Ensemble with their output or -1,
+        # after an error it has the output up to it and the error, which isn't printed right away
+        if self.parsing_error:
+            return -1
+        rolling.use(self.rng)
+        self.entities.clear()
+        entities.use(self.entities)
+        ensemble = Ensemble(self.ast, lanes, self.entities)
+        for instruction in self.ast.instructions:
+            try:
+                ensemble.run(instruction)
+            except (TypeError, RecursionError, ArgumentError, NameError, MultipleNameError, UndeclaredVariableError) as e:
+                ensemble.error = self.error(e, instruction.line_no)
+                break
+        return ensemble
+
+    def report(self, e: Exception, line_no: int):
+        print(self.error(e, line_no))
+
+    def error(self, e: Exception, line_no: int) -> InterpreterError:
+        if isinstance(e, TypeError):
+            return InterpreterError(e_type = "TypeError", msg = "Attempted arithmetic operation on unsupported type", line_no = line_no)
+        elif isinstance(e, RecursionError):
+            return InterpreterError(e_type = "RecursionError", msg = "Recursion limit exceeded", line_no = line_no)
+        elif isinstance(e, ArgumentError):
+            return InterpreterError(e_type = "ArgumentError", msg = "Function call missing " + str(e.missing_argument_count) \
+                                  + " argument" + ('s' if e.missing_argument_count > 1 else ''), line_no = line_no)
+        elif isinstance(e, NameError):
+            return InterpreterError(e_type = "NameError", msg = "Name '" + e.args[0] + "' is not defined", line_no = line_no)
+        elif isinstance(e, MultipleNameError):
+            return InterpreterError(e_type = "MultipleNameError", msg = "Name '" + e.args[0] + "' is already defined", line_no = line_no)
+        elif isinstance(e, UndeclaredVariableError):
+            return InterpreterError(e_type = "UndeclaredVariableError", msg = "Variable '" + e.args[0] + "' is not declared", line_no = line_no)
+
     def load_function_definitions(self):
         for function in self.ast.functions:
             self.scope.add_definition(function)
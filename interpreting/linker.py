@@ -0,0 +1,30 @@
+from parsing import ast
+from interpreting.error_handling import ArgumentError
+from interpreting.builtins import BUILTINS
+
+class Linker:
+    '''Binds every call site to the definition it calls, once, before anything runs.
+
+    Undefined functions and calls with the wrong number of arguments are reported here,
+    calls don't look up or check anything when executed. Functions of the program hide builtins.'''
+    def __init__(self, definitions: dict, call_sites: list) -> None:
+        self.definitions = definitions
+        # (FunctionCall, line_no) pairs, collected by the resolver
+        self.call_sites = call_sites
+        # line of the call site being linked, for error reporting
+        self.line_no = 0
+
+    def link(self) -> None:
+        for call, line_no in self.call_sites:
+            self.line_no = line_no
+            self.link_call(call)
+
+    def link_call(self, call: ast.FunctionCall) -> None:
+        definition = self.definitions.get(call.name, BUILTINS.get(call.name))
+        if definition is None:
+            # function not defined
+            raise NameError(call.name)
+        if len(call.arguments) != len(definition.parameters):
+            # argument count doesn't match
+            raise ArgumentError(abs(len(call.arguments) - len(definition.parameters)))
+        call.definition = definition
@@ -0,0 +1,98 @@
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from parsing import ast
+from interpreting.builtins import BUILTINS
+
+# results kept per function, unless configured otherwise
+DEFAULT_MEMO_SIZE = 1024
+
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+# returned by LRUCache.get when the arguments aren't cached
+MISSING = object()
+
+def pure_functions(program: ast.Program) -> set:
+    '''Names of the functions without side effects: no output, no dice rolls, no attacks, and calling only pure functions.'''
+    calls = {}
+    pure = set()
+    defined = { function.name for function in program.functions }
+    pure_builtins = { name for name, builtin in BUILTINS.items() if builtin.pure and name not in defined }
+    for function in program.functions:
+        nodes = list(ast.walk(function.block))
+        if not any(isinstance(node, (ast.Log, ast.DiceRoll, ast.AttackMove)) for node in nodes):
+            pure.add(function.name)
+            calls[function.name] = { node.name for node in nodes if isinstance(node, ast.FunctionCall) }
+    # a function calling an impure one is impure too, recursion doesn't make anything impure
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not calls[name] <= pure | pure_builtins:
+                pure.remove(name)
+                changed = True
+    return pure
+
+class LRUCache:
+    '''Bounded cache for engines that can't wrap a function call in lru_cache, looked up and filled separately.
+
+    Counts hits and misses the way lru_cache does, so the statistics are the same with every engine.'''
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(arguments) -> tuple:
+        # typed, like the lru_cache of the other engines
+        return tuple(arguments) + tuple(type(argument) for argument in arguments)
+
+    def get(self, key: tuple):
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last = False)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.size, len(self.entries))
+
+class Memoizer:
+    '''Caches the results of pure functions by their arguments, in an LRU cache per function.
+
+    Every engine passes its own way of running a function to wrap, the cached version replaces it, or looks
+    the results up in the LRUCache returned by cache.'''
+    def __init__(self, program: ast.Program, size: int = DEFAULT_MEMO_SIZE) -> None:
+        self.size = size
+        self.pure = pure_functions(program) if size > 0 else set()
+        # function name -> cached function
+        self.caches = {}
+
+    def wrap(self, name: str, function):
+        # returns the cached function, None if the function can't be cached
+        if name not in self.pure:
+            return None
+        # typed, 1 and 1.0 are different arguments, they print differently
+        self.caches[name] = lru_cache(maxsize = self.size, typed = True)(function)
+        return self.caches[name]
+
+    def cache(self, name: str) -> LRUCache:
+        # for engines running calls themselves, None if the function can't be cached
+        if name not in self.pure:
+            return None
+        self.caches[name] = LRUCache(self.size)
+        return self.caches[name]
+
+    def statistics(self) -> str:
+        lines = []
+        for name, cache in sorted(self.caches.items()):
+            info = cache.cache_info()
+            lines.append("%s: %d hits, %d misses, %d cached" % (name, info.hits, info.misses, info.currsize))
+        return '\n'.join(lines)
@@ -0,0 +1,102 @@
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.closure_compiler import ARITHMETIC_OPERATORS, COMPARISON_OPERATORS
+
+def count_nodes(node) -> int:
+    return sum(1 for _ in ast.walk(node))
+
+class Transformer:
+    '''Walks every instruction of a program, replacing expressions and conditions with what
+    rewrite_expression and rewrite_condition return for them, children first.'''
+    def __init__(self, program: ast.Program) -> None:
+        self.program = program
+
+    def transform(self) -> ast.Program:
+        for function in self.program.functions:
+            self.transform_block(function.block.instructions)
+        self.transform_block(self.program.instructions)
+        return self.program
+
+    def rewrite_expression(self, expression: ast.Expression) -> ast.Assignable:
+        return expression
+
+    def rewrite_condition(self, condition: ast.Condition) -> ast.Condition:
+        return condition
+
+    def transform_block(self, instructions: list) -> None:
+        for instruction in instructions:
+            self.transform_instruction(instruction)
+
+    def transform_instruction(self, instruction: ast.Instruction) -> None:
+        if isinstance(instruction, ast.Assignment):
+            instruction.rhs = self.transform_assignable(instruction.rhs)
+        elif isinstance(instruction, ast.While):
+            instruction.condition = self.transform_condition(instruction.condition)
+            self.transform_block(instruction.block.instructions)
+        elif isinstance(instruction, ast.If):
+            instruction.condition = self.transform_condition(instruction.condition)
+            self.transform_block(instruction.if_block.instructions)
+            if instruction.else_block is not None:
+                self.transform_block(instruction.else_block.instructions)
+        elif isinstance(instruction, (ast.Log, ast.Return)):
+            instruction.value = self.transform_assignable(instruction.value)
+        elif isinstance(instruction, ast.FunctionCall):
+            self.transform_assignable(instruction)
+
+    def transform_condition(self, condition: ast.Condition) -> ast.Condition:
+        if isinstance(condition, ast.ConstantCondition):
+            return condition
+        condition.first_operand = self.transform_assignable(condition.first_operand)
+        condition.second_operand = self.transform_assignable(condition.second_operand)
+        return self.rewrite_condition(condition)
+
+    def transform_assignable(self, assignable: ast.Assignable) -> ast.Assignable:
+        if type(assignable) is ast.Expression:
+            assignable.operands = [self.transform_assignable(operand) for operand in assignable.operands]
+            return self.rewrite_expression(assignable)
+        if isinstance(assignable, ast.FunctionCall):
+            assignable.arguments = [self.transform_assignable(argument) for argument in assignable.arguments]
+        return assignable
+
+class Optimizer(Transformer):
+    '''Simplifies the syntax tree of a resolved and linked program, in place.
+
+    Single operand expression wrappers are replaced by their operand, arithmetic on number literals
+    is folded into a literal (left to right, so only a leading run of literals folds) and conditions
+    comparing two literals become ConstantConditions.'''
+    def __init__(self, program: ast.Program) -> None:
+        super(Optimizer, self).__init__(program)
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    def optimize(self) -> ast.Program:
+        self.nodes_before = count_nodes(self.program)
+        self.transform()
+        self.nodes_after = count_nodes(self.program)
+        return self.program
+
+    def report(self) -> str:
+        return "Optimizer: %d nodes before, %d after" % (self.nodes_before, self.nodes_after)
+
+    def rewrite_condition(self, condition: ast.Condition) -> ast.Condition:
+        first, second = condition.first_operand, condition.second_operand
+        # numbers compare with numbers and strings with strings, anything else is left to fail at runtime
+        if (isinstance(first, ast.Number) and isinstance(second, ast.Number)) \
+                or (isinstance(first, ast.String) and isinstance(second, ast.String)):
+            return ast.ConstantCondition(COMPARISON_OPERATORS[condition.operator](first.value, second.value))
+        return condition
+
+    def rewrite_expression(self, expression: ast.Expression) -> ast.Assignable:
+        operands = list(expression.operands)
+        operators = list(expression.operators)
+        while operators and isinstance(operands[0], ast.Number) and isinstance(operands[1], ast.Number):
+            if operators[0] == TokenType.SLASH and operands[1].value == 0:
+                # division by zero stays a runtime error
+                break
+            value = ARITHMETIC_OPERATORS[operators.pop(0)](operands[0].value, operands[1].value)
+            operands[0:2] = [ast.Number(value)]
+        if not operators and operands[0] is not None:
+            return operands[0]
+        expression.operands = operands
+        expression.operators = operators
+        return expression
@@ -0,0 +1,235 @@
+from functools import lru_cache
+from math import lgamma, log, exp, ceil
+import numpy
+
+# shorter arrays are convolved directly, longer ones through the FFT
+FFT_THRESHOLD = 512
+# an exploding die is rolled again at most this many times, so its distribution is finite
+EXPLOSION_LIMIT = 20
+
+def convolve(first, second):
+    # the distribution of the sum of two independent variables
+    if min(len(first), len(second)) < FFT_THRESHOLD:
+        return numpy.convolve(first, second)
+    size = len(first) + len(second) - 1
+    length = 1 << (size - 1).bit_length()
+    result = numpy.fft.irfft(numpy.fft.rfft(first, length) * numpy.fft.rfft(second, length), length)[:size]
+    # rounding leaves tiny negative values where the probability is 0
+    return numpy.clip(result, 0, None)
+
+def power(die, number: int):
+    # the distribution of the sum of number dice, by squaring the distribution of a single one
+    result = numpy.ones(1)
+    while number:
+        if number & 1:
+            result = convolve(result, die)
+        number >>= 1
+        if number:
+            die = convolve(die, die)
+    return result
+
+@lru_cache(maxsize = 256)
+def dice_probabilities(number: int, faces: int):
+    # probabilities of number .. number * faces
+    result = power(numpy.full(faces, 1 / faces), number)
+    # shared by every distribution of these dice
+    result.setflags(write = False)
+    return result
+
+def die_probabilities(faces: int, exploding: bool = False):
+    # probabilities of 1 .. the highest result of a single die
+    if not exploding:
+        return numpy.full(faces, 1 / faces)
+    # a die showing its highest face adds another roll: faces * t + r after t explosions, the last roll can't
+    # show the highest face unless it's the last one allowed
+    result = numpy.zeros(faces * (EXPLOSION_LIMIT + 1))
+    for explosions in range(EXPLOSION_LIMIT + 1):
+        last = faces if explosions == EXPLOSION_LIMIT else faces - 1
+        result[faces * explosions:faces * explosions + last] = float(faces) ** -(explosions + 1)
+    return result
+
+def binomial(trials: int, p: float):
+    # probabilities of 0 .. trials successes, in logarithms so large pools don't overflow
+    if p >= 1:
+        result = numpy.zeros(trials + 1)
+        result[trials] = 1.0
+        return result
+    if p <= 0:
+        result = numpy.zeros(trials + 1)
+        result[0] = 1.0
+        return result
+    return numpy.array([exp(lgamma(trials + 1) - lgamma(k + 1) - lgamma(trials - k + 1) + k * log(p) + (trials - k) * log(1 - p))
+                        for k in range(trials + 1)])
+
+def kept_probabilities(die, number: int, keep: int, highest: bool):
+    # the distribution of the sum of the keep highest (or lowest) of number dice, in steps of 1 from keep times
+    # the lowest result. The values are visited from the best down, counting the dice placed so far: how
+    # many of the rest show the current value is binomial, given they show at most (at least) it
+    size = keep * (len(die) - 1) + 1
+    # placed dice -> distribution of the kept sum, until keep dice are placed
+    states = [numpy.zeros(size) for _ in range(keep)]
+    done = numpy.zeros(size)
+    if keep == 0:
+        done[0] = 1.0
+        return done
+    states[0][0] = 1.0
+    remaining = 1.0
+    values = range(len(die) - 1, -1, -1) if highest else range(len(die))
+    last = values[-1]
+    for value in values:
+        p = die[value]
+        if p == 0:
+            continue
+        # rounding must not leave dice without a value
+        q = 1.0 if value == last else min(1.0, p / remaining)
+        remaining -= p
+        placed = [numpy.zeros(size) for _ in range(keep)]
+        for j, state in enumerate(states):
+            if not state.any():
+                continue
+            weights = binomial(number - j, q)
+            for count, weight in enumerate(weights):
+                if weight == 0:
+                    continue
+                shift = value * min(count, keep - j)
+                target = done if j + count >= keep else placed[j + count]
+                target[shift:] += weight * state[:size - shift]
+        states = placed
+    return done
+
+def pool_results(number: int, faces: int, exploding: bool = False, keep: int = None) -> int:
+    # how many different results the pool can have
+    highest = faces * (EXPLOSION_LIMIT + 1) if exploding else faces
+    return (number if keep is None else keep) * (highest - 1) + 1
+
+@lru_cache(maxsize = 256)
+def pool_probabilities(number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True):
+    # probabilities of the results of a pool, from the number of dice it sums (all of them unless keep is given)
+    if not exploding and keep is None:
+        return dice_probabilities(number, faces)
+    die = die_probabilities(faces, exploding)
+    if keep is None:
+        result = power(die, number)
+    else:
+        result = kept_probabilities(die, number, keep, highest)
+    result.setflags(write = False)
+    return result
+
+@lru_cache(maxsize = 256)
+def repeated_probabilities(times: int, number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True):
+    # probabilities of the sum of times rolls of a pool, from times its lowest result
+    if not exploding and keep is None:
+        return dice_probabilities(times * number, faces)
+    result = power(pool_probabilities(number, faces, exploding, keep, highest), times)
+    result.setflags(write = False)
+    return result
+
+@lru_cache(maxsize = 256)
+def pool_tails(number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True):
+    # tails[i] is the probability of a result at least the lowest one + i
+    tails = numpy.cumsum(pool_probabilities(number, faces, exploding, keep, highest)[::-1])[::-1]
+    tails.setflags(write = False)
+    return tails
+
+@lru_cache(maxsize = 256)
+def pool_moments(number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True) -> tuple:
+    # mean and variance of a pool
+    distribution = Distribution.dice(number, faces, exploding, keep, highest)
+    return distribution.mean(), distribution.variance()
+
+def tail(tails, offset: int, value) -> float:
+    index = ceil(value) - offset
+    if index <= 0:
+        return 1.0
+    if index >= len(tails):
+        return 0.0
+    # rounding can push the sum of all probabilities over 1
+    return min(1.0, float(tails[index]))
+
+class Distribution:
+    '''Exact probability mass function of an integer valued random variable: probabilities[i] is the
+    probability of offset + i.
+
+    Arithmetic works like on numbers: adding distributions convolves them (the variables are independent),
+    adding or multiplying by an integer moves or stretches the distribution.'''
+    __slots__ = ('offset', 'probabilities')
+    def __init__(self, offset: int, probabilities) -> None:
+        self.offset = offset
+        self.probabilities = probabilities
+
+    @staticmethod
+    def constant(value: int) -> 'Distribution':
+        return Distribution(value, numpy.ones(1))
+
+    @staticmethod
+    def dice(number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True) -> 'Distribution':
+        return Distribution(number if keep is None else keep, pool_probabilities(number, faces, exploding, keep, highest))
+
+    def probability(self, value) -> float:
+        if isinstance(value, float):
+            if not value.is_integer():
+                return 0.0
+            value = int(value)
+        index = value - self.offset
+        if index < 0 or index >= len(self.probabilities):
+            return 0.0
+        return float(self.probabilities[index])
+
+    def mean(self) -> float:
+        return self.offset + float(numpy.dot(numpy.arange(len(self.probabilities)), self.probabilities))
+
+    def variance(self) -> float:
+        # around the offset, the indices are smaller than the values
+        indices = numpy.arange(len(self.probabilities))
+        mean = float(numpy.dot(indices, self.probabilities))
+        return max(0.0, float(numpy.dot(indices * indices, self.probabilities)) - mean * mean)
+
+    def minimum(self) -> int:
+        return self.offset + int(numpy.flatnonzero(self.probabilities)[0])
+
+    def maximum(self) -> int:
+        return self.offset + int(numpy.flatnonzero(self.probabilities)[-1])
+
+    def at_least(self, value) -> float:
+        return tail(numpy.cumsum(self.probabilities[::-1])[::-1], self.offset, value)
+
+    def items(self) -> list:
+        # (value, probability) pairs of the possible values
+        return [(self.offset + i, float(p)) for i, p in enumerate(self.probabilities) if p > 0]
+
+    def __add__(self, other):
+        if type(other) is int:
+            return Distribution(self.offset + other, self.probabilities)
+        if isinstance(other, Distribution):
+            return Distribution(self.offset + other.offset, convolve(self.probabilities, other.probabilities))
+        return NotImplemented
+    __radd__ = __add__
+
+    def __neg__(self) -> 'Distribution':
+        return Distribution(-(self.offset + len(self.probabilities) - 1), self.probabilities[::-1])
+
+    def __sub__(self, other):
+        if type(other) is int or isinstance(other, Distribution):
+            return self + -other
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if type(other) is int:
+            return -self + other
+        return NotImplemented
+
+    def __mul__(self, other):
+        if type(other) is not int:
+            # the product of two variables isn't supported, neither are fractional values
+            return NotImplemented
+        if other == 0:
+            return Distribution.constant(0)
+        if other < 0:
+            return -self * -other
+        probabilities = numpy.zeros((len(self.probabilities) - 1) * other + 1)
+        probabilities[::other] = self.probabilities
+        return Distribution(self.offset * other, probabilities)
+    __rmul__ = __mul__
+
+    def __str__(self) -> str:
+        return '{' + ', '.join("%d: %.6g" % (value, probability) for value, probability in self.items()) + '}'
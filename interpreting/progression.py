@@ -0,0 +1,68 @@
+from functools import lru_cache
+import numpy
+from parsing import ast
+from lexing.token import TokenType
+from interpreting import rolling
+from interpreting.probability import Distribution, pool_moments, pool_results, repeated_probabilities
+
+# tables sampling the sum of a roll per level of modified dice, the plain ones use the alias tables of rolling
+LEVEL_TABLE_CACHE_SIZE = 64
+
+@lru_cache(maxsize = LEVEL_TABLE_CACHE_SIZE)
+def level_table(levels: int, pool: tuple) -> rolling.AliasTable:
+    # None if there are too many possible sums for a table
+    number, faces, exploding, keep, highest = pool
+    if levels * (pool_results(number, faces, exploding, keep) - 1) + 1 > rolling.ALIAS_TABLE_LIMIT:
+        return None
+    return rolling.AliasTable(levels * (number if keep is None else keep), repeated_probabilities(levels, *pool))
+
+def roll_levels(dice: 'ast.Dice', levels: int, count: int) -> numpy.ndarray:
+    # count independent sums of a roll of the dice per level
+    if not dice.modified:
+        # levels rolls of NdF are a single roll of (levels * N)dF
+        return rolling.roll_many(levels * dice.number, dice.faces, count)
+    table = level_table(levels, dice.pool)
+    if table is not None:
+        return table.sample_many(count)
+    return rolling.roll_many(*dice.pool[:2], count * levels, *dice.pool[2:]).reshape(count, levels).sum(axis = 1)
+
+class Growth:
+    '''How a stat of a character template changes every level, from the increase_type and increase_amount
+    of its CharacterAttribute: += or *= a number or a dice roll.
+
+    Gaining any number of levels at once costs the same as gaining one: numbers grow by closed forms, and
+    dice added every level are the sum of a roll per level, drawn at once from its cached distribution.'''
+    __slots__ = ('multiplies', 'amount')
+    def __init__(self, increase_type: TokenType, increase_amount: str) -> None:
+        self.multiplies = increase_type == TokenType.MULTIPLIES_BY
+        self.amount = ast.Dice(increase_amount) if 'd' in increase_amount else int(increase_amount)
+
+    def at(self, value: int, levels: int):
+        # the stat after levels, an int or the Distribution of it
+        if levels == 0:
+            return value
+        if isinstance(self.amount, int):
+            return value * self.amount ** levels if self.multiplies else value + self.amount * levels
+        if self.multiplies:
+            # the product of rolls isn't a supported distribution
+            raise TypeError(self.amount)
+        dice = self.amount
+        return Distribution(value + levels * (dice.number if dice.keep is None else dice.keep), repeated_probabilities(levels, *dice.pool))
+
+    def expected(self, value: int, levels: int):
+        if isinstance(self.amount, int) or levels == 0:
+            return self.at(value, levels)
+        # the rolls of every level are independent
+        mean = pool_moments(*self.amount.pool)[0]
+        return value * mean ** levels if self.multiplies else value + mean * levels
+
+    def apply(self, values: numpy.ndarray, levels: int) -> numpy.ndarray:
+        # the stats of characters gaining levels, every character rolls on its own
+        if levels == 0:
+            return values
+        if isinstance(self.amount, int):
+            return values * self.amount ** levels if self.multiplies else values + self.amount * levels
+        if self.multiplies:
+            rolls = rolling.roll_many(*self.amount.pool[:2], len(values) * levels, *self.amount.pool[2:])
+            return values * rolls.reshape(len(values), levels).prod(axis = 1)
+        return values + roll_levels(self.amount, levels, len(values))
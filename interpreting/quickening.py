@@ -0,0 +1,162 @@
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.closure_compiler import ARITHMETIC_OPERATORS
+from interpreting.optimizer import Transformer
+
+# generic evaluations an expression observes before specializing
+WARMUP = 8
+# generic evaluations after a guard failed, before trying again
+BACKOFF = 64
+
+class AdaptiveExpression(ast.Expression):
+    '''Evaluates generically while recording the operand types, then rewrites itself (by changing its class)
+    into a fast path for int or float operands, or into GenericExpression if the types differ.
+
+    Everything the evaluation needs is kept in slots, so the instances stay fast after changing class.'''
+    __slots__ = ('first', 'rest', 'counter')
+    def __init__(self, expression: ast.Expression):
+        super(AdaptiveExpression, self).__init__()
+        self.operands = expression.operands
+        self.operators = expression.operators
+        self.first = expression.operands[0]
+        # (operator function, operand) pairs
+        self.rest = tuple(zip([ARITHMETIC_OPERATORS[operator] for operator in expression.operators], expression.operands[1:]))
+        self.counter = WARMUP
+
+    def evaluate(self, scope):
+        numeric = ast.NUMERIC_TYPES
+        value = self.first.evaluate(scope)
+        if not isinstance(value, numeric): raise TypeError(self.first)
+        kind = type(value)
+        for apply, operand in self.rest:
+            next_value = operand.evaluate(scope)
+            if not isinstance(next_value, numeric): raise TypeError(operand)
+            if type(next_value) is not kind:
+                kind = None
+            value = apply(value, next_value)
+        self.counter -= 1
+        if self.counter == 0:
+            self.__class__ = SPECIALIZATIONS.get((kind, len(self.rest) == 1), GenericExpression)
+        return value
+
+    def deoptimize(self, scope, value, pending, index: int):
+        # a guard failed on operand index, evaluated to pending; value is the result of the operands before it
+        self.__class__ = AdaptiveExpression
+        self.counter = BACKOFF
+        if not isinstance(pending, ast.NUMERIC_TYPES): raise TypeError(self.operands[index])
+        value = pending if index == 0 else self.rest[index - 1][0](value, pending)
+        for apply, operand in self.rest[index:]:
+            next_value = operand.evaluate(scope)
+            if not isinstance(next_value, ast.NUMERIC_TYPES): raise TypeError(operand)
+            value = apply(value, next_value)
+        return value
+
+class GenericExpression(AdaptiveExpression):
+    # operands of mixed types, checked like Expression.evaluate does
+    __slots__ = ()
+    def evaluate(self, scope):
+        numeric = ast.NUMERIC_TYPES
+        value = self.first.evaluate(scope)
+        if not isinstance(value, numeric): raise TypeError(self.first)
+        for apply, operand in self.rest:
+            next_value = operand.evaluate(scope)
+            if not isinstance(next_value, numeric): raise TypeError(operand)
+            value = apply(value, next_value)
+        return value
+
+class SpecializedExpression(AdaptiveExpression):
+    # kind, the only operand type the fast path accepts
+    __slots__ = ()
+    def evaluate(self, scope):
+        kind = self.kind
+        value = self.first.evaluate(scope)
+        if type(value) is not kind:
+            return self.deoptimize(scope, None, value, 0)
+        index = 1
+        for apply, operand in self.rest:
+            next_value = operand.evaluate(scope)
+            if type(next_value) is not kind:
+                return self.deoptimize(scope, value, next_value, index)
+            value = apply(value, next_value)
+            index += 1
+        return value
+class IntExpression(SpecializedExpression):
+    __slots__ = ()
+    kind = int
+class FloatExpression(SpecializedExpression):
+    __slots__ = ()
+    kind = float
+
+class SpecializedBinaryExpression(AdaptiveExpression):
+    # the same for the most common case, exactly two operands
+    __slots__ = ()
+    def evaluate(self, scope):
+        kind = self.kind
+        value = self.first.evaluate(scope)
+        if type(value) is not kind:
+            return self.deoptimize(scope, None, value, 0)
+        apply, second = self.rest[0]
+        next_value = second.evaluate(scope)
+        if type(next_value) is not kind:
+            return self.deoptimize(scope, value, next_value, 1)
+        return apply(value, next_value)
+class IntBinaryExpression(SpecializedBinaryExpression):
+    __slots__ = ()
+    kind = int
+class FloatBinaryExpression(SpecializedBinaryExpression):
+    __slots__ = ()
+    kind = float
+
+# (operand type, two operands) -> specialization
+SPECIALIZATIONS = {
+    (int, False): IntExpression,
+    (float, False): FloatExpression,
+    (int, True): IntBinaryExpression,
+    (float, True): FloatBinaryExpression
+}
+
+class LessThanCondition(ast.Condition):
+    def evaluate(self, scope) -> bool:
+        return self.first_operand.evaluate(scope) < self.second_operand.evaluate(scope)
+class MoreThanCondition(ast.Condition):
+    def evaluate(self, scope) -> bool:
+        return self.first_operand.evaluate(scope) > self.second_operand.evaluate(scope)
+class LessOrEqualCondition(ast.Condition):
+    def evaluate(self, scope) -> bool:
+        return self.first_operand.evaluate(scope) <= self.second_operand.evaluate(scope)
+class MoreOrEqualCondition(ast.Condition):
+    def evaluate(self, scope) -> bool:
+        return self.first_operand.evaluate(scope) >= self.second_operand.evaluate(scope)
+class EqualsCondition(ast.Condition):
+    def evaluate(self, scope) -> bool:
+        return self.first_operand.evaluate(scope) == self.second_operand.evaluate(scope)
+
+CONDITIONS = {
+    TokenType.LESS_THAN: LessThanCondition,
+    TokenType.MORE_THAN: MoreThanCondition,
+    TokenType.LESS_OR_EQUAL: LessOrEqualCondition,
+    TokenType.MORE_OR_EQUAL: MoreOrEqualCondition,
+    TokenType.EQUALS: EqualsCondition
+}
+
+class Quickener(Transformer):
+    '''Replaces arithmetic expressions with AdaptiveExpressions and conditions with a class per operator.
+
+    Comparisons don't get a type guard, Python's own comparison already dispatches on the types,
+    only the dispatch on the operator is saved.'''
+    def quicken(self) -> ast.Program:
+        return self.transform()
+
+    def rewrite_expression(self, expression: ast.Expression) -> ast.Assignable:
+        if not expression.operators:
+            return expression
+        return AdaptiveExpression(expression)
+
+    def rewrite_condition(self, condition: ast.Condition) -> ast.Condition:
+        if type(condition) is not ast.Condition:
+            return condition
+        result = CONDITIONS[condition.operator]()
+        result.first_operand = condition.first_operand
+        result.operator = condition.operator
+        result.second_operand = condition.second_operand
+        return result
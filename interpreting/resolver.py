@@ -0,0 +1,84 @@
+from parsing import ast
+from interpreting.error_handling import MultipleNameError, UndeclaredVariableError
+
+class Resolver:
+    '''Gives every variable of a function (or of the top level) a fixed slot in its frame, before anything runs.
+
+    Functions and the top level have a flat namespace each: a name can be declared only once, parameters
+    included, and a variable can be used once it's declared earlier in the program, in any block.
+    Variables get their slot, functions and the program the size of their frame. Call sites are
+    collected for the Linker.'''
+    def __init__(self, program: ast.Program) -> None:
+        self.program = program
+        # (FunctionCall, line_no) pairs
+        self.call_sites = []
+        # line of the instruction being resolved, for error reporting
+        self.line_no = 0
+
+    def resolve(self) -> ast.Program:
+        for function in self.program.functions:
+            self.line_no = function.line_no
+            slots = {}
+            for parameter in function.parameters:
+                self.declare(parameter, slots)
+            self.resolve_block(function.block.instructions, slots, set(slots))
+            function.frame_size = len(slots)
+        slots = {}
+        self.resolve_block(self.program.instructions, slots, set())
+        self.program.frame_size = len(slots)
+        return self.program
+
+    def declare(self, variable: ast.Variable, slots: dict) -> None:
+        if variable.name in slots:
+            # variable already declared
+            raise MultipleNameError(variable.name)
+        variable.slot = slots[variable.name] = len(slots)
+
+    def resolve_block(self, instructions: list, slots: dict, visible: set) -> None:
+        # declarations inside the block stay visible after it, the namespace is flat
+        for instruction in instructions:
+            self.line_no = instruction.line_no
+            self.resolve_instruction(instruction, slots, visible)
+
+    def resolve_instruction(self, instruction: ast.Instruction, slots: dict, visible: set) -> None:
+        if isinstance(instruction, ast.Declaration):
+            self.declare(instruction.var, slots)
+            visible.add(instruction.var.name)
+        elif isinstance(instruction, ast.Assignment):
+            self.resolve_assignable(instruction.rhs, slots, visible)
+            self.resolve_assignable(instruction.lhs, slots, visible)
+        elif isinstance(instruction, ast.While):
+            self.resolve_condition(instruction.condition, slots, visible)
+            self.resolve_block(instruction.block.instructions, slots, visible)
+        elif isinstance(instruction, ast.If):
+            self.resolve_condition(instruction.condition, slots, visible)
+            self.resolve_block(instruction.if_block.instructions, slots, visible)
+            if instruction.else_block is not None:
+                self.resolve_block(instruction.else_block.instructions, slots, visible)
+        elif isinstance(instruction, (ast.Log, ast.Return)):
+            self.resolve_assignable(instruction.value, slots, visible)
+        elif isinstance(instruction, ast.FunctionCall):
+            self.resolve_assignable(instruction, slots, visible)
+        elif isinstance(instruction, ast.AttackMove):
+            self.resolve_assignable(instruction.attacker, slots, visible)
+            self.resolve_assignable(instruction.defender, slots, visible)
+
+    def resolve_condition(self, condition: ast.Condition, slots: dict, visible: set) -> None:
+        self.resolve_assignable(condition.first_operand, slots, visible)
+        self.resolve_assignable(condition.second_operand, slots, visible)
+
+    def resolve_assignable(self, assignable: ast.Assignable, slots: dict, visible: set) -> None:
+        if isinstance(assignable, ast.Variable):
+            if assignable.name not in visible:
+                # undeclared variable
+                raise UndeclaredVariableError(assignable.name)
+            assignable.slot = slots[assignable.name]
+        elif isinstance(assignable, ast.DiceRoll):
+            self.resolve_assignable(assignable.operand, slots, visible)
+        elif isinstance(assignable, ast.Expression):
+            for operand in assignable.operands:
+                self.resolve_assignable(operand, slots, visible)
+        elif isinstance(assignable, ast.FunctionCall):
+            self.call_sites.append((assignable, self.line_no))
+            for argument in assignable.arguments:
+                self.resolve_assignable(argument, slots, visible)
@@ -0,0 +1,252 @@
+import random
+from collections import OrderedDict
+import numpy
+from interpreting.probability import EXPLOSION_LIMIT, pool_probabilities, pool_results
+
+# pools of at least this many dice are rolled by numpy in one call, smaller ones die by die,
+# see benchmarks/dice_benchmark.py for where the crossover is
+BULK_ROLL_THRESHOLD = 128
+# faces drawn at once by roll_many, bounding the memory it uses
+CHUNK_SIZE = 1 << 20
+# pools with at most this many possible results are sampled from an alias table, larger ones are rolled
+ALIAS_TABLE_LIMIT = 1 << 14
+# possible results of all the cached alias tables together
+ALIAS_CACHE_SIZE = 1 << 18
+
+# faces prefetched at once by the numpy backend, per kind of die
+PREFETCH_SIZE = 1 << 12
+# backends of the random number generator, the first is the default
+RNGS = ('stdlib', 'numpy')
+
+shared_generator = numpy.random.Generator(numpy.random.PCG64())
+
+class RNG:
+    '''Where the dice get their random numbers from, every Interpreter has its own.
+
+    roll gives the sum of a small pool, random a float in [0, 1) for sampling alias tables and generator a
+    numpy Generator for rolling large pools and many pools at once.'''
+    def seed(self, seed: int) -> None:
+        raise NotImplementedError
+
+    def roll(self, number: int, faces: int) -> int:
+        raise NotImplementedError
+
+    def random(self) -> float:
+        raise NotImplementedError
+
+    def generator(self) -> numpy.random.Generator:
+        raise NotImplementedError
+
+class StdlibRNG(RNG):
+    '''Rolls with a random.Random, or with the random module itself when it isn't seeded, so random.seed
+    decides the rolls like it always has. Faces are drawn the way randint draws them, without its checks.'''
+    def __init__(self, seed: int = None) -> None:
+        self.source = random if seed is None else random.Random(seed)
+
+    def seed(self, seed: int) -> None:
+        self.source.seed(seed)
+
+    def roll(self, number: int, faces: int) -> int:
+        getrandbits = self.source.getrandbits
+        bits = faces.bit_length()
+        result = number
+        for _ in range(number):
+            face = getrandbits(bits)
+            while face >= faces:
+                face = getrandbits(bits)
+            result += face
+        return result
+
+    def random(self) -> float:
+        return self.source.random()
+
+    def generator(self) -> numpy.random.Generator:
+        # the shared generator is reseeded every time, so seeding the source makes the numpy rolls reproducible too
+        shared_generator.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': { 'state': self.source.getrandbits(128), 'inc': 1 },
+            'has_uint32': 0,
+            'uinteger': 0
+        }
+        return shared_generator
+
+class NumpyRNG(RNG):
+    '''Rolls with a numpy Generator of its own. Faces are drawn in blocks of PREFETCH_SIZE for every kind of
+    die and handed out from the end of the list, so a roll costs a list pop instead of a call into numpy.'''
+    def __init__(self, seed: int = None) -> None:
+        self.seed(seed)
+
+    def seed(self, seed: int) -> None:
+        self.numpy_generator = numpy.random.Generator(numpy.random.PCG64(seed))
+        # faces -> prefetched faces of that die
+        self.faces = {}
+        self.floats = []
+
+    def roll(self, number: int, faces: int) -> int:
+        buffer = self.faces.get(faces)
+        if buffer is None or len(buffer) < number:
+            buffer = self.prefetch(faces, number)
+        if number == 1:
+            return buffer.pop()
+        result = sum(buffer[-number:])
+        del buffer[-number:]
+        return result
+
+    def prefetch(self, faces: int, number: int) -> list:
+        # the faces left over are used first
+        block = self.numpy_generator.integers(1, faces + 1, max(PREFETCH_SIZE, number)).tolist()
+        buffer = self.faces[faces] = block + self.faces.get(faces, [])
+        return buffer
+
+    def random(self) -> float:
+        if not self.floats:
+            self.floats = self.numpy_generator.random(PREFETCH_SIZE).tolist()
+        return self.floats.pop()
+
+    def generator(self) -> numpy.random.Generator:
+        return self.numpy_generator
+
+def make_rng(kind: str = 'stdlib', seed: int = None) -> RNG:
+    if kind == 'stdlib':
+        return StdlibRNG(seed)
+    if kind == 'numpy':
+        return NumpyRNG(seed)
+    raise ValueError("Unknown random number generator: " + kind)
+
+# the generator the dice roll with, set by the interpreter running
+active = StdlibRNG()
+
+def use(rng: RNG) -> None:
+    global active
+    active = rng
+
+def generator() -> numpy.random.Generator:
+    return active.generator()
+
+class AliasTable:
+    '''Walker's alias method for sampling the sum of a dice pool with a single uniform draw.
+
+    The draw picks a column, and its fraction decides between the column's own result and its alias.
+    Built with Vose's algorithm from the exact distribution, so sampling is exactly as likely to give
+    each result as rolling every die.'''
+    __slots__ = ('offset', 'size', 'thresholds', 'aliases', 'threshold_array', 'alias_array')
+    def __init__(self, offset: int, probabilities) -> None:
+        self.offset = offset
+        self.size = size = len(probabilities)
+        scaled = [float(p) * size for p in probabilities]
+        self.thresholds = [1.0] * size
+        self.aliases = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.thresholds[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left over is 1 up to rounding errors, the column keeps its own result
+        self.threshold_array = numpy.array(self.thresholds)
+        self.alias_array = numpy.array(self.aliases)
+
+    def sample(self) -> int:
+        u = active.random() * self.size
+        column = int(u)
+        if column == self.size:
+            # rounding up of the largest random values
+            column -= 1
+        if u - column < self.thresholds[column]:
+            return self.offset + column
+        return self.offset + self.aliases[column]
+
+    def sample_many(self, count: int):
+        u = generator().random(count) * self.size
+        columns = numpy.minimum(u.astype(numpy.int64), self.size - 1)
+        return self.offset + numpy.where(u - columns < self.threshold_array[columns], columns, self.alias_array[columns])
+
+class AliasTables:
+    '''Alias tables by (number, faces), least recently used evicted first when they have more than size
+    possible results together.
+
+    Whether a pool is sampled from a table depends only on its size, never on what is cached, so a seeded
+    run rolls the same whatever ran before it.'''
+    def __init__(self, size: int = ALIAS_CACHE_SIZE) -> None:
+        self.size = size
+        self.tables = OrderedDict()
+        # possible results of the cached tables
+        self.results = 0
+
+    def table(self, number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True) -> AliasTable:
+        # None if the pool is too large for a table
+        key = (number, faces, exploding, keep, highest)
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            return table
+        if pool_results(number, faces, exploding, keep) > min(ALIAS_TABLE_LIMIT, self.size):
+            return None
+        table = self.tables[key] = AliasTable(number if keep is None else keep, pool_probabilities(*key))
+        self.results += table.size
+        while self.results > self.size:
+            evicted = self.tables.popitem(last = False)[1]
+            self.results -= evicted.size
+        return table
+
+alias_tables = AliasTables()
+
+def explode(rng: numpy.random.Generator, rolls, faces: int):
+    # every die showing its highest face is rolled again and the roll added, at most EXPLOSION_LIMIT times
+    exploding = rolls == faces
+    for _ in range(EXPLOSION_LIMIT):
+        if not exploding.any():
+            break
+        extra = rng.integers(1, faces + 1, int(exploding.sum()))
+        rolls[exploding] += extra
+        exploding[exploding] = extra == faces
+    return rolls
+
+def select(rolls, keep: int, highest: bool):
+    # sums of the keep highest (or lowest) faces of every row, partitioning the rows instead of sorting them
+    number = rolls.shape[1]
+    if keep is None:
+        return rolls.sum(axis = 1)
+    if keep == 0:
+        return numpy.zeros(len(rolls), dtype = numpy.int64)
+    if highest:
+        return numpy.partition(rolls, number - keep, axis = 1)[:, number - keep:].sum(axis = 1)
+    return numpy.partition(rolls, keep - 1, axis = 1)[:, :keep].sum(axis = 1)
+
+def roll_rows(rng: numpy.random.Generator, rows: int, number: int, faces: int, exploding: bool, keep: int, highest: bool):
+    rolls = rng.integers(1, faces + 1, (rows, number))
+    if exploding:
+        explode(rng, rolls, faces)
+    return select(rolls, keep, highest)
+
+def roll_sum(rng: numpy.random.Generator, number: int, faces: int) -> int:
+    # the sum of a plain pool from raw 64 bit words modulo faces, skipping what integers and select cost per call,
+    # the words past the last whole multiple of faces are drawn again so every face stays equally likely
+    words = rng.bit_generator.random_raw(number)
+    excess = (1 << 64) % faces
+    if excess:
+        limit = numpy.uint64((1 << 64) - excess)
+        while words.max() >= limit:
+            redrawn = words >= limit
+            words[redrawn] = rng.bit_generator.random_raw(int(redrawn.sum()))
+    return number + sum((words % numpy.uint64(faces)).tolist())
+
+def roll(number: int, faces: int, exploding: bool = False, keep: int = None, highest: bool = True) -> int:
+    if not exploding and keep is None:
+        return roll_sum(generator(), number, faces)
+    return int(roll_rows(generator(), 1, number, faces, exploding, keep, highest)[0])
+
+def roll_many(number: int, faces: int, count: int, exploding: bool = False, keep: int = None, highest: bool = True):
+    # count independent rolls of the pool, as an array
+    table = alias_tables.table(number, faces, exploding, keep, highest)
+    if table is not None:
+        return table.sample_many(count)
+    rolls = numpy.empty(count, dtype = numpy.int64)
+    rng = generator()
+    rows = max(1, CHUNK_SIZE // max(number, 1))
+    for start in range(0, count, rows):
+        end = min(count, start + rows)
+        rolls[start:end] = roll_rows(rng, end - start, number, faces, exploding, keep, highest)
+    return rolls
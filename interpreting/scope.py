@@ -1,28 +1,23 @@
-from interpreting.error_handling import MultipleNameError, UndeclaredVariableError
+from interpreting.error_handling import MultipleNameError
 
-class Scope:
-    def __init__(self) -> None:
-        self.variables = {}
-        self.definitions = {}
+class Undeclared:
+    '''Value of a frame slot whose variable wasn't declared (yet)'''
+    def __repr__(self) -> str:
+        return '<undeclared>'
+UNDECLARED = Undeclared()
 
-    def add_variable(self, name: str) -> None:
-        if name not in self.variables:
-            self.variables[name] = None
-        else:
-            # variable already declared
-            raise MultipleNameError(name)
-    def set_variable_value(self, name: str, value) -> None:
-        if name in self.variables:
-            self.variables[name] = value
-        else:
-            # undeclared variable
-            raise UndeclaredVariableError(name)
-    def get_variable_value(self, name: str):
-        if name in self.variables:
-            return self.variables[name]
-        else:
-            # undeclared variable
-            raise UndeclaredVariableError(name)
+class Frame:
+    '''Local variables of one function call, in the slots the resolver gave them, UNDECLARED until their
+    declaration runs'''
+    __slots__ = ('slots', )
+    def __init__(self, size: int = 0) -> None:
+        self.slots = [UNDECLARED] * size
+
+class Scope(Frame):
+    '''The top level frame, also holding the function definitions'''
+    def __init__(self, size: int = 0) -> None:
+        super(Scope, self).__init__(size)
+        self.definitions = {}
 
     def add_definition(self, function) -> None:
         if function.name not in self.definitions:
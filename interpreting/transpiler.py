@@ -0,0 +1,348 @@
+import ast as python_ast
+from parsing import ast
+from lexing.token import TokenType
+from interpreting.error_handling import ArgumentError, UndeclaredVariableError
+from interpreting.scope import UNDECLARED
+from interpreting.memoization import Memoizer
+from interpreting.builtins import BUILTINS
+from interpreting import entities
+
+ARITHMETIC_SYMBOLS = {
+    TokenType.PLUS: '+',
+    TokenType.MINUS: '-',
+    TokenType.ASTERISK: '*',
+    TokenType.SLASH: '/'
+}
+
+COMPARISON_SYMBOLS = {
+    TokenType.LESS_THAN: '<',
+    TokenType.MORE_THAN: '>',
+    TokenType.LESS_OR_EQUAL: '<=',
+    TokenType.MORE_OR_EQUAL: '>=',
+    TokenType.EQUALS: '=='
+}
+
+def raise_error(error: Exception):
+    # raises from inside an expression
+    raise error
+
+def type_error(value):
+    raise TypeError(value)
+
+def undeclared(name: str):
+    raise UndeclaredVariableError(name)
+
+def assign(current, name: str, value):
+    # the value of an assignment, if the declaration of the variable ran
+    if current is UNDECLARED:
+        raise UndeclaredVariableError(name)
+    return value
+
+def runtime_namespace() -> dict:
+    # what the generated code expects to find in its globals, builtins are b_<name>
+    namespace = { 'b_' + name: builtin.memo for name, builtin in BUILTINS.items() }
+    namespace.update({
+        '__builtins__': __builtins__,
+        '_print': print,
+        '_NUMERIC': ast.NUMERIC_TYPES,
+        '_Dice': ast.Dice,
+        '_attack': entities.attack,
+        '_raise': raise_error,
+        '_type_error': type_error,
+        '_UNDECLARED': UNDECLARED,
+        '_undeclared': undeclared,
+        '_assign': assign,
+        '_ONCE': (None, ),
+        'NameError': NameError,
+        'ArgumentError': ArgumentError
+    })
+    return namespace
+
+def load(code, memoizer: Memoizer = None) -> list:
+    # runs the module code, returns a runner for every top level instruction
+    namespace = runtime_namespace()
+    exec(code, namespace)
+    if memoizer is not None:
+        # calls look the function up in the module globals, replacing it there caches every call
+        for name in list(namespace):
+            if name.startswith('f_') and name[2:] in memoizer.pure:
+                namespace[name] = memoizer.wrap(name[2:], namespace[name])
+    return [lambda scope, instruction = instruction: instruction() for instruction in namespace['_instructions']]
+
+class Transpiler:
+    '''Translates the program into a Python module, run by CPython without any per node dispatch.
+
+    Every function becomes a Python function with dndlang variables as its locals, every top level
+    instruction a function using module globals, and ? a call of the output sink. The program has to be
+    resolved. Variables are _UNDECLARED until their declaration runs, only uses the declaration may not
+    have run before are checked: those after a declaration in the same or an enclosing block aren't.
+    Python line numbers of the compiled code are the dndlang line numbers.'''
+    def __init__(self, program: ast.Program) -> None:
+        self.program = program
+        self.functions = { function.name: function for function in program.functions }
+        self.lines = []
+        # dndlang line number of every generated line
+        self.line_map = []
+        self.constants = []
+        # names surely declared where code is being generated
+        self.declared = set()
+        self.instruction_generators = {
+            ast.Declaration: self.generate_declaration,
+            ast.Assignment: self.generate_assignment,
+            ast.AttackMove: self.generate_attack_move,
+            ast.While: self.generate_while,
+            ast.If: self.generate_if,
+            ast.Log: self.generate_log,
+            ast.Return: self.generate_return,
+            ast.FunctionCall: self.generate_function_call_instruction
+        }
+        self.assignable_generators = {
+            ast.Expression: self.generate_expression,
+            ast.Number: self.generate_literal,
+            ast.String: self.generate_literal,
+            ast.Dice: self.generate_dice,
+            ast.Variable: self.generate_variable,
+            ast.DiceRoll: self.generate_dice_roll,
+            ast.FunctionCall: self.generate_function_call
+        }
+
+    def compile(self, filename: str = '<dndlang>'):
+        source = self.generate()
+        tree = python_ast.parse(source, filename)
+        for node in python_ast.walk(tree):
+            if hasattr(node, 'lineno'):
+                node.lineno = self.line_map[node.lineno - 1]
+                node.end_lineno = self.line_map[node.end_lineno - 1]
+        return compile(tree, filename, 'exec')
+
+    def generate(self) -> str:
+        self.lines = []
+        self.line_map = []
+        self.constants = []
+        self.line_no = 1
+
+        for function in self.program.functions:
+            self.generate_function(function)
+
+        # top level instructions run in order, declarations at their top stay declared for the next ones
+        self.declared = set()
+        instruction_names = []
+        for index, instruction in enumerate(self.program.instructions):
+            name = '_instruction_%d' % index
+            instruction_names.append(name)
+            self.line_no = instruction.line_no
+            self.emit(0, 'def %s():' % name)
+            names = self.declared_names([instruction])
+            if names:
+                self.emit(1, 'global ' + ', '.join('v_' + variable for variable in names))
+            # returned values are discarded, a non None return ends the instruction
+            self.discard = 'return'
+            self.generate_instruction(instruction, 1)
+
+        header = []
+        for index, constant in enumerate(self.constants):
+            header.append('_c%d = _Dice(%r)' % (index, str(constant)))
+        for name in self.declared_names(self.program.instructions):
+            header.append('v_%s = _UNDECLARED' % name)
+        first_line = self.program.instructions[0].line_no if self.program.instructions else 1
+        self.lines[0:0] = header
+        self.line_map[0:0] = [first_line] * len(header)
+        self.emit(0, '_instructions = (%s)' % ''.join(name + ', ' for name in instruction_names))
+        return '\n'.join(self.lines) + '\n'
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append('    ' * indent + line)
+        self.line_map.append(self.line_no)
+
+    def declared_names(self, instructions: list) -> list:
+        # names of variables declared or assigned in the instructions, in order
+        result = []
+        for instruction in instructions:
+            if isinstance(instruction, ast.Declaration):
+                names = [instruction.var.name]
+            elif isinstance(instruction, ast.Assignment):
+                names = [instruction.lhs.name]
+            elif isinstance(instruction, ast.While):
+                names = self.declared_names(instruction.block.instructions)
+            elif isinstance(instruction, ast.If):
+                names = self.declared_names(instruction.if_block.instructions) \
+                        + (self.declared_names(instruction.else_block.instructions) if instruction.else_block is not None else [])
+            else:
+                names = []
+            for name in names:
+                if name not in result:
+                    result.append(name)
+        return result
+
+    def contains_return(self, instruction: ast.Instruction) -> bool:
+        # True if the instruction has a return which ends it early, nested loops discard their own returns
+        if isinstance(instruction, ast.If):
+            blocks = [instruction.if_block] + ([instruction.else_block] if instruction.else_block is not None else [])
+            return any(isinstance(i, ast.Return) or self.contains_return(i) for block in blocks for i in block.instructions)
+        return False
+
+    def generate_function(self, function: ast.FunctionDefinition) -> None:
+        self.line_no = function.line_no
+        self.emit(0, 'def f_%s(%s):' % (function.name, ', '.join('v_' + parameter.name for parameter in function.parameters)))
+        self.discard = None
+        parameters = [parameter.name for parameter in function.parameters]
+        names = [name for name in self.declared_names(function.block.instructions) if name not in parameters]
+        if names:
+            self.emit(1, ' = '.join('v_' + name for name in names) + ' = _UNDECLARED')
+        self.declared = set(parameters)
+        self.generate_block(function.block.instructions, 1)
+
+    def generate_block(self, instructions: list, indent: int) -> None:
+        # declarations inside the block may not run, they aren't sure after it
+        declared = set(self.declared)
+        if not instructions:
+            self.emit(indent, 'pass')
+        for instruction in instructions:
+            self.generate_instruction(instruction, indent)
+        self.declared = declared
+
+    def generate_instruction(self, instruction: ast.Instruction, indent: int) -> None:
+        generator = self.instruction_generators.get(type(instruction))
+        if generator is None:
+            raise NotImplementedError("The python engine can't run " + type(instruction).__name__)
+        self.line_no = instruction.line_no
+        generator(instruction, indent)
+
+    def generate_assignable(self, assignable: ast.Assignable) -> str:
+        if assignable is None:
+            return 'None'
+        generator = self.assignable_generators.get(type(assignable))
+        if generator is None:
+            raise NotImplementedError("The python engine can't evaluate " + type(assignable).__name__)
+        return generator(assignable)
+
+    def generate_declaration(self, declaration: ast.Declaration, indent: int) -> None:
+        self.emit(indent, 'v_%s = None' % declaration.var.name)
+        self.declared.add(declaration.var.name)
+
+    def generate_assignment(self, assignment: ast.Assignment, indent: int) -> None:
+        name = assignment.lhs.name
+        value = self.generate_assignable(assignment.rhs)
+        if name in self.declared:
+            self.emit(indent, 'v_%s = %s' % (name, value))
+        else:
+            self.emit(indent, 'v_%s = _assign(v_%s, %r, %s)' % (name, name, name, value))
+
+    def generate_attack_move(self, attack_move: ast.AttackMove, indent: int) -> None:
+        self.emit(indent, '_attack(%s, %s)' % (self.generate_assignable(attack_move.attacker), self.generate_assignable(attack_move.defender)))
+
+    def generate_while(self, instruction: ast.While, indent: int) -> None:
+        self.emit(indent, 'while %s:' % self.generate_condition(instruction.condition))
+        outer_discard = self.discard
+        declared = set(self.declared)
+        if not instruction.block.instructions:
+            self.emit(indent + 1, 'pass')
+        for i in instruction.block.instructions:
+            # values returned inside a loop are discarded, a non None return only ends the instruction
+            if self.contains_return(i):
+                self.emit(indent + 1, 'for _ in _ONCE:')
+                self.discard = 'break'
+                self.generate_instruction(i, indent + 2)
+            else:
+                self.discard = 'pass'
+                self.generate_instruction(i, indent + 1)
+        self.discard = outer_discard
+        self.declared = declared
+
+    def generate_if(self, instruction: ast.If, indent: int) -> None:
+        self.emit(indent, 'if %s:' % self.generate_condition(instruction.condition))
+        self.generate_block(instruction.if_block.instructions, indent + 1)
+        if instruction.else_block is not None:
+            self.emit(indent, 'else:')
+            self.generate_block(instruction.else_block.instructions, indent + 1)
+
+    def generate_condition(self, condition: ast.Condition) -> str:
+        if isinstance(condition, ast.ConstantCondition):
+            return repr(condition.value)
+        return '%s %s %s' % (self.generate_assignable(condition.first_operand), COMPARISON_SYMBOLS[condition.operator], \
+                             self.generate_assignable(condition.second_operand))
+
+    def generate_log(self, instruction: ast.Log, indent: int) -> None:
+        self.emit(indent, '_print(%s)' % self.generate_assignable(instruction.value))
+
+    def generate_return(self, instruction: ast.Return, indent: int) -> None:
+        value = self.generate_assignable(instruction.value)
+        if self.discard is None:
+            if self.is_never_none(instruction.value):
+                self.emit(indent, 'return ' + value)
+            else:
+                # returning None doesn't end the function
+                self.emit(indent, 'if (_value := %s) is not None: return _value' % value)
+        elif self.discard == 'pass':
+            # a return directly inside a loop body ends nothing
+            self.emit(indent, value)
+        elif self.is_never_none(instruction.value):
+            if not isinstance(self.unwrap(instruction.value), ast.Literal):
+                self.emit(indent, value)
+            self.emit(indent, self.discard)
+        else:
+            self.emit(indent, 'if (%s) is not None: %s' % (value, self.discard))
+
+    def is_never_none(self, assignable: ast.Assignable) -> bool:
+        assignable = self.unwrap(assignable)
+        return isinstance(assignable, (ast.Literal, ast.DiceRoll)) or type(assignable) is ast.Expression
+
+    def is_numeric(self, assignable: ast.Assignable) -> bool:
+        # True if the assignable always evaluates to a number, so it doesn't need a type check
+        assignable = self.unwrap(assignable)
+        return isinstance(assignable, (ast.Number, ast.DiceRoll)) or type(assignable) is ast.Expression
+
+    def unwrap(self, assignable: ast.Assignable) -> ast.Assignable:
+        # the parser wraps every operand into single operand expressions
+        while type(assignable) is ast.Expression and len(assignable.operators) == 0:
+            assignable = assignable.operands[0]
+        return assignable
+
+    def generate_literal(self, literal: ast.Literal) -> str:
+        return repr(literal.value)
+
+    def generate_dice(self, dice: ast.Dice) -> str:
+        self.constants.append(dice)
+        return '_c%d' % (len(self.constants) - 1)
+
+    def generate_variable(self, variable: ast.Variable) -> str:
+        if variable.name in self.declared:
+            return 'v_' + variable.name
+        return '(v_%s if v_%s is not _UNDECLARED else _undeclared(%r))' % (variable.name, variable.name, variable.name)
+
+    def generate_dice_roll(self, dice_roll: ast.DiceRoll) -> str:
+        return '%s.roll()' % self.generate_assignable(dice_roll.operand)
+
+    def generate_expression(self, expression: ast.Expression) -> str:
+        if len(expression.operators) == 0:
+            return self.generate_assignable(expression.operands[0])
+        result = self.generate_checked_operand(expression.operands[0])
+        for operator, operand in zip(expression.operators, expression.operands[1:]):
+            result = '(%s %s %s)' % (result, ARITHMETIC_SYMBOLS[operator], self.generate_checked_operand(operand))
+        return result
+
+    def generate_checked_operand(self, operand: ast.Assignable) -> str:
+        value = self.generate_assignable(operand)
+        if self.is_numeric(operand):
+            return value
+        return '(_operand if isinstance(_operand := %s, _NUMERIC) else _type_error(_operand))' % value
+
+    def generate_function_call(self, call: ast.FunctionCall) -> str:
+        # the called function is looked up now, every definition is known before anything runs
+        if call.name not in self.functions and call.name in BUILTINS:
+            parameter_count = len(BUILTINS[call.name].parameters)
+            if len(call.arguments) != parameter_count:
+                # argument count doesn't match
+                return '_raise(ArgumentError(%d))' % abs(len(call.arguments) - parameter_count)
+            return 'b_%s(%s)' % (call.name, ', '.join(self.generate_assignable(argument) for argument in call.arguments))
+        if call.name not in self.functions:
+            # function not defined
+            return '_raise(NameError(%r))' % call.name
+        parameter_count = len(self.functions[call.name].parameters)
+        if len(call.arguments) != parameter_count:
+            # argument count doesn't match
+            return '_raise(ArgumentError(%d))' % abs(len(call.arguments) - parameter_count)
+        return 'f_%s(%s)' % (call.name, ', '.join(self.generate_assignable(argument) for argument in call.arguments))
+
+    def generate_function_call_instruction(self, call: ast.FunctionCall, indent: int) -> None:
+        self.emit(indent, self.generate_function_call(call))
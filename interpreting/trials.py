@@ -0,0 +1,78 @@
+import io
+import pickle
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import numpy
+
+# batches per worker, smaller batches balance the load better
+BATCHES_PER_WORKER = 4
+
+# set in every worker process by start_worker
+worker_interpreter = None
+worker_seed = 0
+
+def trial_seed(seed: int, trial: int) -> int:
+    # every trial gets its own stream, spawned from the seed, so the results don't depend on which worker runs it
+    state = numpy.random.SeedSequence(seed, spawn_key = (trial, )).generate_state(4)
+    return int.from_bytes(state.tobytes(), 'little')
+
+def start_worker(program: bytes, seed: int) -> None:
+    global worker_interpreter, worker_seed
+    worker_interpreter = pickle.loads(program)
+    worker_seed = seed
+
+def run_batch(trials: range) -> list:
+    # histograms of the printed lines, by their position in the output
+    histograms = []
+    for trial in trials:
+        worker_interpreter.rng.seed(trial_seed(worker_seed, trial))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            worker_interpreter.execute()
+        for position, line in enumerate(output.getvalue().splitlines()):
+            if position == len(histograms):
+                histograms.append(Counter())
+            histograms[position][line] += 1
+    return histograms
+
+def merge(histograms: list, batch: list) -> None:
+    for position, histogram in enumerate(batch):
+        if position == len(histograms):
+            histograms.append(Counter())
+        histograms[position].update(histogram)
+
+def run_trials(interpreter, trials: int, workers: int, seed: int) -> list:
+    '''Runs the prepared program of the interpreter trials times, in workers processes.
+
+    The program is pickled once and sent to every worker, which compiles it again for its engine. Returns
+    a Counter of the lines printed at every position of the output, over all trials.'''
+    program = pickle.dumps(interpreter)
+    size = max(1, -(-trials // (workers * BATCHES_PER_WORKER)))
+    batches = [range(start, min(trials, start + size)) for start in range(0, trials, size)]
+    histograms = []
+    if workers <= 1:
+        start_worker(program, seed)
+        for batch in batches:
+            merge(histograms, run_batch(batch))
+        return histograms
+    with ProcessPoolExecutor(workers, initializer = start_worker, initargs = (program, seed)) as executor:
+        for batch in executor.map(run_batch, batches):
+            merge(histograms, batch)
+    return histograms
+
+def value_order(value: str):
+    # numbers by their value, before anything else
+    try:
+        return (0, float(value), value)
+    except ValueError:
+        return (1, 0, value)
+
+def format_histograms(histograms: list, trials: int) -> str:
+    lines = []
+    for position, histogram in enumerate(histograms):
+        count = sum(histogram.values())
+        lines.append("output %d (%d trials):" % (position + 1, count))
+        for value in sorted(histogram, key = value_order):
+            lines.append("  %s: %d (%.2f%%)" % (value, histogram[value], 100 * histogram[value] / trials))
+    return '\n'.join(lines)
@@ -0,0 +1,165 @@
+from parsing import ast
+from interpreting.bytecode import BytecodeCompiler, CodeObject, disassemble, COMPARISONS, \
+    LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, DECLARE, CHECK_NUMERIC, BINARY_ADD, BINARY_SUBTRACT, BINARY_MULTIPLY, BINARY_DIVIDE, \
+    COMPARE, JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_NOT_NONE, ROLL, CALL, POP_TOP, PRINT, RETURN_VALUE, RETURN_NONE, \
+    RAISE_NAME_ERROR, RAISE_ARGUMENT_ERROR, TAIL_CALL, CALL_BUILTIN, ATTACK
+from interpreting.closure_compiler import COMPARISON_OPERATORS
+from interpreting.error_handling import ArgumentError, UndeclaredVariableError
+from interpreting.memoization import Memoizer, MISSING
+from interpreting.entities import attack
+from interpreting.scope import UNDECLARED
+
+# dndlang calls in progress, unless configured otherwise
+DEFAULT_MAX_DEPTH = 100000
+
+class VirtualMachine:
+    '''Stack based virtual machine running the output of the BytecodeCompiler.
+
+    dndlang calls don't nest Python calls: the frames of the callers wait on a stack of their own, limited
+    to max_depth calls, so deep recursion doesn't depend on Python's recursion limit. A tail call replaces
+    the frame of its caller, it doesn't count towards the limit.'''
+    def __init__(self, program: ast.Program, memoizer: Memoizer = None, max_depth: int = DEFAULT_MAX_DEPTH) -> None:
+        compiler = BytecodeCompiler(program)
+        self.instructions = compiler.compile()
+        self.functions = compiler.functions
+        self.max_depth = max_depth
+        # result caches of the pure functions, by function index
+        self.memos = [None if memoizer is None else memoizer.cache(function.name) for function in self.functions]
+        self.global_frame = [UNDECLARED] * len(compiler.global_names)
+        self.comparisons = tuple(COMPARISON_OPERATORS[operator] for operator in COMPARISONS)
+
+    def runners(self) -> list:
+        # one runner per top level instruction, the interpreter's scope isn't used
+        return [lambda scope, code = code: self.execute(code, self.global_frame) for code in self.instructions]
+
+    def disassemble(self) -> str:
+        return '\n\n'.join(disassemble(code, self.functions) for code in self.functions + self.instructions)
+
+    def execute(self, code_object: CodeObject, frame: list):
+        code = code_object.code
+        consts = code_object.consts
+        numeric = ast.NUMERIC_TYPES
+        memos = self.memos
+        functions = self.functions
+        max_depth = self.max_depth
+        stack = []
+        # suspended callers: (code object, pc, frame, (cache, key) pairs to store the result in)
+        calls = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            opcode = code[pc]
+            argument = code[pc + 1]
+            pc += 2
+            # most frequent opcodes first
+            if opcode == LOAD_LOCAL:
+                value = frame[argument]
+                if value is UNDECLARED:
+                    # undeclared variable
+                    raise UndeclaredVariableError(code_object.names[argument])
+                push(value)
+            elif opcode == LOAD_CONST:
+                push(consts[argument])
+            elif opcode == CHECK_NUMERIC:
+                if not isinstance(stack[-1], numeric):
+                    raise TypeError(stack[-1])
+            elif opcode == STORE_LOCAL:
+                if frame[argument] is UNDECLARED:
+                    # undeclared variable
+                    raise UndeclaredVariableError(code_object.names[argument])
+                frame[argument] = pop()
+            elif opcode == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = argument
+            elif opcode == COMPARE:
+                second = pop()
+                stack[-1] = self.comparisons[argument](stack[-1], second)
+            elif opcode == BINARY_ADD:
+                second = pop()
+                stack[-1] = stack[-1] + second
+            elif opcode == BINARY_SUBTRACT:
+                second = pop()
+                stack[-1] = stack[-1] - second
+            elif opcode == BINARY_MULTIPLY:
+                second = pop()
+                stack[-1] = stack[-1] * second
+            elif opcode == BINARY_DIVIDE:
+                second = pop()
+                stack[-1] = stack[-1] / second
+            elif opcode == JUMP:
+                pc = argument
+            elif opcode == CALL or opcode == TAIL_CALL:
+                function = functions[argument]
+                count = function.parameter_count
+                arguments = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                memo = memos[argument]
+                if memo is not None:
+                    key = memo.key(arguments)
+                    value = memo.get(key)
+                    if value is not MISSING:
+                        # a cached tail call is followed by a RETURN_VALUE
+                        push(value)
+                        continue
+                if opcode == CALL:
+                    if len(calls) >= max_depth:
+                        raise RecursionError("maximum call depth %d exceeded" % max_depth)
+                    calls.append((code_object, pc, frame, None if memo is None else [(memo, key)]))
+                elif memo is not None:
+                    # the caller's result will be the callee's, both are cached when it returns
+                    caller, caller_pc, caller_frame, stores = calls[-1]
+                    if stores is None:
+                        calls[-1] = (caller, caller_pc, caller_frame, [(memo, key)])
+                    else:
+                        stores.append((memo, key))
+                code_object = function
+                code = function.code
+                consts = function.consts
+                frame = [UNDECLARED] * function.local_count
+                frame[:count] = arguments
+                pc = 0
+            elif opcode == RETURN_VALUE or opcode == RETURN_NONE:
+                value = None
+                if opcode == RETURN_VALUE:
+                    value = pop()
+                    if value is None:
+                        continue
+                if not calls:
+                    return value
+                code_object, pc, frame, stores = calls.pop()
+                code = code_object.code
+                consts = code_object.consts
+                if stores is not None:
+                    # innermost call first, like nested lru_caches
+                    for memo, key in reversed(stores):
+                        memo.put(key, value)
+                push(value)
+            elif opcode == CALL_BUILTIN:
+                builtin = consts[argument]
+                count = len(builtin.parameters)
+                arguments = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(builtin.memo(*arguments))
+            elif opcode == ROLL:
+                stack[-1] = stack[-1].roll()
+            elif opcode == DECLARE:
+                frame[argument] = None
+            elif opcode == POP_JUMP_IF_NOT_NONE:
+                if pop() is not None:
+                    pc = argument
+            elif opcode == PRINT:
+                print(pop())
+            elif opcode == POP_TOP:
+                pop()
+            elif opcode == ATTACK:
+                defender = pop()
+                attack(pop(), defender)
+            elif opcode == RAISE_NAME_ERROR:
+                # function not defined
+                raise NameError(consts[argument])
+            elif opcode == RAISE_ARGUMENT_ERROR:
+                # argument count doesn't match
+                raise ArgumentError(argument)
+            else:
+                raise ValueError("Unknown opcode: " + str(opcode))
@@ -0,0 +1,161 @@
+from . import reader, token, dicts, error_handling
+import sys
+from io import TextIOWrapper
+
+class CharLexer:
+    '''Character-by-character lexer, kept as the reference implementation for Lexer'''
+    def __init__(self, io: TextIOWrapper) -> None:
+        self.reader = reader.Reader(io)
+
+    def next_token(self) -> token.Token:
+        try:
+            c = self.next_non_whitespace_char()
+            line_no, char_no = self.reader.position.line_no, self.reader.position.char_no
+            # end of file
+            if c == '':
+                result = token.Token(t_type = token.TokenType.END_OF_FILE)
+            elif c.isalpha() or c == '_':
+                result = self.get_keyword_or_identifier(c)
+            elif c.isdecimal():
+                result = self.get_number_or_dice_literal(c)
+            elif c == '"':
+                result = self.get_string_literal()
+            else:
+                result = self.get_special_character(c)
+            return result._replace(line_no = line_no, char_no = char_no, \
+                                   end_line_no = self.reader.position.line_no, end_char_no = self.reader.position.char_no)
+        except error_handling.LexerError as e:
+            print(e)
+            sys.exit()
+
+    def end(self):
+        while c := self.next_non_whitespace_char() != '':
+            pass
+
+    def next_non_whitespace_char(self) -> str:
+        c = self.reader.next_char()
+        while c.isspace():
+            c = self.reader.next_char()
+        return c
+
+    def get_keyword_or_identifier(self, c: str) -> token.Token:
+        string = c
+        pc = self.reader.peek()
+        while pc.isalpha() or pc == '_':
+            string += self.reader.next_char()
+            pc = self.reader.peek()
+        if string in dicts.KEYWORDS:
+            # keyword
+            return token.Token(t_type = dicts.KEYWORDS[string])
+        else:
+            # identifier
+            return token.Token(t_value = sys.intern(string), t_type = token.TokenType.IDENTIFIER)
+
+    def get_number_or_dice_literal(self, c: str) -> token.Token:
+        first_decimal = c
+        pc = self.reader.peek()
+        while pc.isdecimal():
+            first_decimal += self.reader.next_char()
+            pc = self.reader.peek()
+        if pc == 'd' or pc == 'D':
+            self.reader.next_char()
+            pc = self.reader.peek()
+            if pc.isdecimal():
+                second_decimal = self.reader.next_char()
+                pc = self.reader.peek()
+                while pc.isdecimal():
+                    second_decimal += self.reader.next_char()
+                    pc = self.reader.peek()
+                return token.Token(t_value = first_decimal + 'd' + second_decimal + self.get_dice_modifiers(), t_type = token.TokenType.DICE_LITERAL)
+            else:
+                raise error_handling.DiceLiteralError("DiceLiteralError: Dice literal without the amount of faces, line " \
+                                                        + str(self.reader.position.line_no) + ", char " + str(self.reader.position.char_no))
+        else:
+            return token.Token(t_value = first_decimal, t_type = token.TokenType.NUMBER_LITERAL)
+
+    def get_dice_modifiers(self) -> str:
+        # ! for exploding dice, then kh, kl, dh or dl and how many dice are kept or dropped
+        modifiers = ''
+        pc = self.reader.peek()
+        if pc == '!':
+            modifiers += self.reader.next_char()
+            pc = self.reader.peek()
+        if pc in ('k', 'K', 'd', 'D'):
+            modifiers += self.reader.next_char().lower()
+            pc = self.reader.peek()
+            if pc not in ('h', 'H', 'l', 'L'):
+                raise error_handling.DiceLiteralError("DiceLiteralError: Dice literal keeping or dropping dice without h or l, line " \
+                                                        + str(self.reader.position.line_no) + ", char " + str(self.reader.position.char_no))
+            modifiers += self.reader.next_char().lower()
+            pc = self.reader.peek()
+            while pc.isdecimal():
+                modifiers += self.reader.next_char()
+                pc = self.reader.peek()
+        return modifiers
+
+    def get_string_literal(self) -> token.Token:
+        string_line_no, string_char_no = self.reader.position.line_no, self.reader.position.char_no
+        string_value = ''
+        pc = self.reader.peek()
+        while pc != '"' and pc != '':
+            string_value += self.reader.next_char()
+            pc = self.reader.peek()
+        if pc == '"':
+            self.reader.next_char()
+            return token.Token(t_value = string_value, t_type = token.TokenType.STRING_LITERAL)
+        else:
+            raise error_handling.StringLiteralError("StringLiteralError: String opening without closing, line " \
+                                                    + str(string_line_no) + ", char " + str(string_char_no))
+
+    def get_special_character(self, c: str) -> token.Token:
+        if c == '+':
+            if self.reader.peek() == '=':
+                # +=
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.INCREASES_BY)
+            else:
+                # +
+                return token.Token(t_type = token.TokenType.PLUS)
+        elif c == '*':
+            if self.reader.peek() == '=':
+                # *=
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.MULTIPLIES_BY)
+            else:
+                # *
+                return token.Token(t_type = token.TokenType.ASTERISK)
+        elif c == '>':
+            if self.reader.peek() == '>':
+                # >>
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.ATTACK_MOVE)
+                
+            elif self.reader.peek() == '=':
+                # >=
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.MORE_OR_EQUAL)
+            else:
+                # >
+                return token.Token(t_type = token.TokenType.MORE_THAN)
+        elif c == '<':
+            if self.reader.peek() == '=':
+                # <=
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.LESS_OR_EQUAL)
+            else:
+                # <
+                return token.Token(t_type = token.TokenType.LESS_THAN)
+        elif c == '=':
+            if self.reader.peek() == '=':
+                # ==
+                self.reader.next_char()
+                return token.Token(t_type = token.TokenType.EQUALS)
+            else:
+                # =
+                return token.Token(t_type = token.TokenType.ASSIGN)
+        else:
+            # other single special character
+            if c in dicts.SINGLE_SPECIAL_CHARACTERS:
+                return token.Token(t_type = dicts.SINGLE_SPECIAL_CHARACTERS[c])
+            else:
+                return token.Token(t_value = c, t_type = token.TokenType.UNKNOWN)
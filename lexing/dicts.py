@@ -42,3 +42,19 @@ SINGLE_SPECIAL_CHARACTERS = {
     '^': TokenType.CARET,
     '?': TokenType.QUESTION_MARK
 }
+
+DOUBLE_SPECIAL_CHARACTERS = {
+    '+=': TokenType.INCREASES_BY,
+    '*=': TokenType.MULTIPLIES_BY,
+    '>>': TokenType.ATTACK_MOVE,
+    '>=': TokenType.MORE_OR_EQUAL,
+    '<=': TokenType.LESS_OR_EQUAL,
+    '==': TokenType.EQUALS
+}
+
+SPECIAL_CHARACTERS = {
+    **SINGLE_SPECIAL_CHARACTERS,
+    '<': TokenType.LESS_THAN,
+    '>': TokenType.MORE_THAN,
+    **DOUBLE_SPECIAL_CHARACTERS
+}
@@ -1,141 +1,121 @@
 from . import reader, token, dicts, error_handling
+from .token_buffer import TokenBuffer
+import re
 import sys
-from copy import deepcopy
 from io import TextIOWrapper
 
+# leading whitespace is skipped by the same match as the token following it
+# every alternative is a named group, match.lastgroup tells which kind of token was scanned
+TOKEN_PATTERN = re.compile(r'''
+    \s*
+    (?:
+          (?P<word>[^\W\d]+)
+        | (?P<number>(?P<amount>\d+)(?:[dD](?P<faces>\d*)(?P<modifiers>!?(?:[kKdD](?P<side>[hHlL]?)\d*)?))?)
+        | (?P<string>"(?P<string_value>[^"]*)(?P<string_end>"?))
+        | (?P<special>\+=|\*=|>>|>=|<=|==|\S)
+    )
+''', re.VERBOSE)
+
 class Lexer:
-    def __init__(self, io: TextIOWrapper) -> None:
+    def __init__(self, io: TextIOWrapper, buffer_tokens: bool = False) -> None:
         self.reader = reader.Reader(io)
+        if buffer_tokens:
+            # lex everything up front into compact arrays, for very large inputs
+            self.token_buffer = TokenBuffer(self.tokens())
+            self.token_stream = iter(self.token_buffer)
+        else:
+            self.token_buffer = None
+            self.token_stream = self.tokens()
+
+    def __iter__(self):
+        return self.token_stream
 
     def next_token(self) -> token.Token:
-        try:
-            c = self.next_non_whitespace_char()
-            # end of file
-            if c == '':
-                return token.Token(token_type = token.TokenType.END_OF_FILE)
-            elif c.isalpha() or c == '_':
-                return self.get_keyword_or_identifier(c)
-            elif c.isdecimal():
-                return self.get_number_or_dice_literal(c)
-            elif c == '"':
-                return self.get_string_literal()
-            else:
-                return self.get_special_character(c)
-        except error_handling.LexerError as e:
-            print(e)
-            sys.exit()
+        return next(self.token_stream)
 
     def end(self):
-        while c := self.next_non_whitespace_char() != '':
+        while self.next_token().t_type != token.TokenType.END_OF_FILE:
             pass
 
-    def next_non_whitespace_char(self) -> str:
-        c = self.reader.next_char()
-        while c.isspace():
-            c = self.reader.next_char()
-        return c
-
-    def get_keyword_or_identifier(self, c: str) -> token.Token:
-        string = c
-        pc = self.reader.peek()
-        while pc.isalpha() or pc == '_':
-            string += self.reader.next_char()
-            pc = self.reader.peek()
-        if string in dicts.KEYWORDS:
-            # keyword
-            return token.Token(token_type = dicts.KEYWORDS[string])
-        else:
-            # identifier
-            return token.Token(token_value = string, token_type = token.TokenType.IDENTIFIER)
+    def tokens(self):
+        # scans the whole source in one pass, yielding tokens lazily
+        try:
+            text = self.reader.read_rest()
+            position = self.reader.position
+            line_no = position.line_no
+            # offset of the first character in the current line
+            line_start = -position.char_no
+            match = TOKEN_PATTERN.match
+            keywords = dicts.KEYWORDS
+            special_characters = dicts.SPECIAL_CHARACTERS
+            intern = sys.intern
+            Token = token.Token
+            IDENTIFIER = token.TokenType.IDENTIFIER
+            offset = 0
+            while (m := match(text, offset)) is not None:
+                kind = m.lastgroup
+                start = m.start(kind)
+                # skipped whitespace and string literals are the only places with line breaks
+                if start != offset and text.find('\n', offset, start) != -1:
+                    line_no += text.count('\n', offset, start)
+                    line_start = text.rfind('\n', offset, start) + 1
+                offset = m.end()
+                char_no = start - line_start + 1
 
-    def get_number_or_dice_literal(self, c: str) -> token.Token:
-        first_decimal = c
-        pc = self.reader.peek()
-        while pc.isdecimal():
-            first_decimal += self.reader.next_char()
-            pc = self.reader.peek()
-        if pc == 'd' or pc == 'D':
-            self.reader.next_char()
-            pc = self.reader.peek()
-            if pc.isdecimal():
-                second_decimal = self.reader.next_char()
-                pc = self.reader.peek()
-                while pc.isdecimal():
-                    second_decimal += self.reader.next_char()
-                    pc = self.reader.peek()
-                return token.Token(token_value = first_decimal + 'd' + second_decimal, token_type = token.TokenType.DICE_LITERAL)
-            else:
-                raise error_handling.DiceLiteralError("DiceLiteralError: Dice literal without the amount of faces, line " \
-                                                        + str(self.reader.position.line_no) + ", char " + str(self.reader.position.char_no))
-        else:
-            return token.Token(token_value = first_decimal, token_type = token.TokenType.NUMBER_LITERAL)
+                if kind == 'word':
+                    value = m.group('word')
+                    if value in keywords:
+                        # keyword
+                        yield Token('', keywords[value], line_no, char_no, line_no, offset - line_start)
+                    else:
+                        # identifier, interned so that name lookups compare by identity
+                        yield Token(intern(value), IDENTIFIER, line_no, char_no, line_no, offset - line_start)
+                elif kind == 'special':
+                    value = m.group('special')
+                    if value in special_characters:
+                        yield Token('', special_characters[value], line_no, char_no, line_no, offset - line_start)
+                    else:
+                        yield Token(value, token.TokenType.UNKNOWN, line_no, char_no, line_no, offset - line_start)
+                elif kind == 'number':
+                    faces = m.group('faces')
+                    if faces is None:
+                        yield Token(m.group('amount'), token.TokenType.NUMBER_LITERAL, line_no, char_no, line_no, offset - line_start)
+                    elif not faces:
+                        raise error_handling.DiceLiteralError("DiceLiteralError: Dice literal without the amount of faces, line " \
+                                                                + str(line_no) + ", char " + str(m.start('faces') - line_start))
+                    elif m.group('side') == '':
+                        # dice kept or dropped without saying which
+                        raise error_handling.DiceLiteralError("DiceLiteralError: Dice literal keeping or dropping dice without h or l, line " \
+                                                                + str(line_no) + ", char " + str(m.start('side') - line_start))
+                    else:
+                        yield Token(m.group('amount') + 'd' + faces + m.group('modifiers').lower(), token.TokenType.DICE_LITERAL, \
+                                    line_no, char_no, line_no, offset - line_start)
+                else:
+                    if not m.group('string_end'):
+                        raise error_handling.StringLiteralError("StringLiteralError: String opening without closing, line " \
+                                                                + str(line_no) + ", char " + str(char_no))
+                    start_line_no = line_no
+                    newlines = text.count('\n', start, offset)
+                    if newlines:
+                        line_no += newlines
+                        line_start = text.rfind('\n', start, offset) + 1
+                    yield Token(m.group('string_value'), token.TokenType.STRING_LITERAL, start_line_no, char_no, line_no, offset - line_start)
 
-    def get_string_literal(self) -> token.Token:
-        string_start = deepcopy(self.reader.position)
-        string_value = ''
-        pc = self.reader.peek()
-        while pc != '"' and pc != '':
-            string_value += self.reader.next_char()
-            pc = self.reader.peek()
-        if pc == '"':
-            self.reader.next_char()
-            return token.Token(token_value = string_value, token_type = token.TokenType.STRING_LITERAL)
-        else:
-            raise error_handling.StringLiteralError("StringLiteralError: String opening without closing, line " \
-                                                    + str(string_start.line_no) + ", char " + str(string_start.char_no))
+            # trailing whitespace
+            newlines = text.count('\n', offset)
+            if newlines:
+                line_no += newlines
+                line_start = text.rfind('\n', offset) + 1
+            position.line_no = line_no
+            position.char_no = len(text) - line_start
+        except error_handling.LexerError as e:
+            print(e)
+            sys.exit()
 
-    def get_special_character(self, c: str) -> token.Token:
-        if c == '+':
-            if self.reader.peek() == '=':
-                # +=
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.INCREASES_BY)
-            else:
-                # +
-                return token.Token(token_type = token.TokenType.PLUS)
-        elif c == '*':
-            if self.reader.peek() == '=':
-                # *=
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.MULTIPLIES_BY)
-            else:
-                # *
-                return token.Token(token_type = token.TokenType.ASTERISK)
-        elif c == '>':
-            if self.reader.peek() == '>':
-                # >>
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.ATTACK_MOVE)
-                
-            elif self.reader.peek() == '=':
-                # >=
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.MORE_OR_EQUAL)
-            else:
-                # >
-                return token.Token(token_type = token.TokenType.MORE_THAN)
-        elif c == '<':
-            if self.reader.peek() == '=':
-                # <=
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.LESS_OR_EQUAL)
-            else:
-                # <
-                return token.Token(token_type = token.TokenType.LESS_THAN)
-        elif c == '=':
-            if self.reader.peek() == '=':
-                # ==
-                self.reader.next_char()
-                return token.Token(token_type = token.TokenType.EQUALS)
-            else:
-                # =
-                return token.Token(token_type = token.TokenType.ASSIGN)
-        else:
-            # other single special character
-            if c in dicts.SINGLE_SPECIAL_CHARACTERS:
-                return token.Token(token_type = dicts.SINGLE_SPECIAL_CHARACTERS[c])
-            else:
-                return token.Token(token_value = c, token_type = token.TokenType.UNKNOWN)
+        # end of file
+        end_of_file = token.Token('', token.TokenType.END_OF_FILE, position.line_no, position.char_no, position.line_no, position.char_no)
+        while True:
+            yield end_of_file
 
 if __name__ == '__main__':
     from .token import TokenType
@@ -145,11 +125,10 @@ if __name__ == '__main__':
     try:
         file = open(fname, 'r')
         lexer = Lexer(file)
-        token = lexer.next_token()
-        while token.t_type != TokenType.END_OF_FILE:
-            print(token)
-            token = lexer.next_token()
-        print(token)
+        for t in lexer:
+            print(t)
+            if t.t_type == TokenType.END_OF_FILE:
+                break
     except OSError:
         print("Could not open file: " + fname)
         sys.exit()
@@ -1,17 +1,39 @@
 from io import TextIOWrapper
-import sys
-from typing import NamedTuple
 from recordtype import recordtype
 
+Position = recordtype('Position', 'line_no char_no', default = 0)
+
 class Reader:
-    def __init__(self, io: TextIOWrapper) -> None:
-        Position = recordtype('Position', 'line_no char_no', default = 0)
+    # characters pulled from the underlying io per read call
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, io: TextIOWrapper, chunk_size: int = CHUNK_SIZE) -> None:
         self.position = Position(1, 0)
         self.io = io
+        self.chunk_size = chunk_size
+        # the buffer only ever moves forward, so the io doesn't have to be seekable (stdin, pipes)
+        self.buffer = ''
+        self.index = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        # returns False if there is nothing left to read
+        if self.eof:
+            return False
+        chunk = self.io.read(self.chunk_size)
+        if chunk == '':
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.index:] + chunk
+        self.index = 0
+        return True
 
     def next_char(self) -> str:
         # returns empty string if end of file was reached
-        c = self.io.read(1)
+        if self.index >= len(self.buffer) and not self.fill():
+            return ''
+        c = self.buffer[self.index]
+        self.index += 1
         if (c == '\n'):
             self.position.line_no += 1
             self.position.char_no = 0
@@ -21,6 +43,15 @@ class Reader:
 
     def peek(self) -> str:
         # returns empty string if end of file was reached
-        c = self.io.read(1)
-        self.io.seek(self.io.tell() - 1)
-        return c
+        if self.index >= len(self.buffer) and not self.fill():
+            return ''
+        return self.buffer[self.index]
+
+    def read_rest(self) -> str:
+        # returns everything that wasn't consumed yet, position is left for the caller to update
+        while self.fill():
+            pass
+        rest = self.buffer[self.index:]
+        self.buffer = ''
+        self.index = 0
+        return rest
@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import NamedTuple
 
 class TokenType(Enum):
     # keywords (templates, general)
@@ -59,10 +60,17 @@ class TokenType(Enum):
     UNKNOWN = auto()
     END_OF_FILE = auto()
 
-class Token:
-    def __init__(self, token_value = '', token_type = TokenType.UNKNOWN):
-        self.t_value: str = token_value
-        self.t_type: TokenType = token_type
+    # members are singletons, hashing by identity keeps set and dict lookups in C
+    __hash__ = object.__hash__
+
+class Token(NamedTuple):
+    # immutable and without a __dict__, position of the first and the last character of the token
+    t_value: str = ''
+    t_type: TokenType = TokenType.UNKNOWN
+    line_no: int = 0
+    char_no: int = 0
+    end_line_no: int = 0
+    end_char_no: int = 0
     def __repr__(self) -> str:
         return '<Token t_value:%s t_type:%s>' % (self.t_value, self.t_type)
     def __str__(self) -> str:
@@ -0,0 +1,43 @@
+from array import array
+from .token import Token, TokenType
+
+TOKEN_TYPES = tuple(TokenType)
+TOKEN_TYPE_INDICES = { t_type: index for index, t_type in enumerate(TOKEN_TYPES) }
+
+class TokenBuffer:
+    '''Token stream stored column-wise in typed arrays, Token objects are only built while iterating'''
+    def __init__(self, tokens) -> None:
+        self.types = array('B')
+        # values share one empty string for every keyword and special character
+        self.values = []
+        self.line_nos = array('L')
+        self.char_nos = array('L')
+        self.end_line_nos = array('L')
+        self.end_char_nos = array('L')
+        for token in tokens:
+            self.append(token)
+            if token.t_type == TokenType.END_OF_FILE:
+                break
+
+    def append(self, token: Token) -> None:
+        self.types.append(TOKEN_TYPE_INDICES[token.t_type])
+        self.values.append(token.t_value)
+        self.line_nos.append(token.line_no)
+        self.char_nos.append(token.char_no)
+        self.end_line_nos.append(token.end_line_no)
+        self.end_char_nos.append(token.end_char_no)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        return Token(self.values[index], TOKEN_TYPES[self.types[index]], self.line_nos[index], self.char_nos[index], \
+                     self.end_line_nos[index], self.end_char_nos[index])
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
+        # the end of file token repeats, like it does for the lexer
+        end_of_file = self[len(self.types) - 1]
+        while True:
+            yield end_of_file
@@ -1,16 +1,80 @@
-from interpreting.interpreter import Interpreter
+from interpreting.interpreter import Interpreter, ENGINES
+from interpreting.cache import ProgramCache
+from interpreting.memoization import DEFAULT_MEMO_SIZE
+from interpreting.vm import DEFAULT_MAX_DEPTH
+from interpreting.rolling import RNGS
+from interpreting.trials import run_trials, format_histograms
+import os
+import random
 import sys
 import argparse
 
 argparser = argparse.ArgumentParser(description="Run dndlang interpreter with filename")
-argparser.add_argument('filename', metavar = 'FILE_PATH', type=str)
+argparser.add_argument('filename', metavar = 'FILE_PATH', type=str, help="path to the script, '-' reads it from standard input")
+argparser.add_argument('--no-cache', action = 'store_true', help="don't read or write the parsed program cache (__dndcache__)")
+argparser.add_argument('--engine', choices = ENGINES, default = 'tree', help="execution engine (default: tree)")
+argparser.add_argument('-O', '--optimize', action = 'store_true', help="simplify the syntax tree before running it")
+argparser.add_argument('--optimizer-report', action = 'store_true', help="print the node count before and after optimizing to stderr, implies -O")
+argparser.add_argument('--memo-size', type = int, default = DEFAULT_MEMO_SIZE, metavar = 'N', \
+                       help="results cached per pure function, 0 turns caching off (default: %d)" % DEFAULT_MEMO_SIZE)
+argparser.add_argument('--memo-stats', action = 'store_true', help="print the cache hits and misses of every pure function to stderr")
+argparser.add_argument('--max-depth', type = int, default = DEFAULT_MAX_DEPTH, metavar = 'N', \
+                       help="calls in progress the vm engine allows, tail calls excluded (default: %d)" % DEFAULT_MAX_DEPTH)
+argparser.add_argument('--ensemble', type = int, default = 0, metavar = 'N', \
+                       help="run N trials of the script at once, with a numpy array lane per trial, and summarize their output")
+argparser.add_argument('--lanes', action = 'store_true', help="print the output of every trial of --ensemble instead of a summary")
+argparser.add_argument('--trials', type = int, default = 0, metavar = 'N', \
+                       help="run the script N times in a process pool and print histograms of the printed values")
+argparser.add_argument('--workers', type = int, default = os.cpu_count(), metavar = 'K', help="processes running --trials (default: one per CPU)")
+argparser.add_argument('--rng', choices = RNGS, default = 'stdlib', help="random number generator the dice roll with (default: stdlib)")
+argparser.add_argument('--seed', type = int, default = None, metavar = 'S', \
+                       help="seed of the random number generator, and of the --trials random streams (default: a random one)")
+argparser.add_argument('--disassemble', action = 'store_true', help="print the bytecode of the vm engine instead of running the script")
 args = argparser.parse_args()
 fname = args.filename
 
+def run(interpreter: Interpreter):
+    if interpreter.optimizer is not None and args.optimizer_report:
+        print(interpreter.optimizer.report(), file = sys.stderr)
+    if args.disassemble:
+        # the error is reported already, there is no bytecode
+        if interpreter.parsing_error:
+            return
+        print(interpreter.vm.disassemble())
+    elif args.trials > 0:
+        if interpreter.parsing_error:
+            return
+        seed = random.SystemRandom().getrandbits(64) if args.seed is None else args.seed
+        print(format_histograms(run_trials(interpreter, args.trials, args.workers, seed), args.trials))
+    elif args.ensemble > 0:
+        ensemble = interpreter.execute_ensemble(args.ensemble)
+        if ensemble == -1:
+            return
+        if not args.lanes:
+            print(ensemble.summary())
+            return
+        for lane in range(args.ensemble):
+            print("lane %d:" % lane)
+            print(ensemble.lane_output(lane), end = '')
+    else:
+        interpreter.execute()
+        if args.memo_stats and not interpreter.parsing_error:
+            print(interpreter.memoizer.statistics(), file = sys.stderr)
+
+if args.disassemble:
+    args.engine = 'vm'
+if args.optimizer_report:
+    args.optimize = True
+
+if fname == '-':
+    run(Interpreter(sys.stdin, engine = args.engine, optimize = args.optimize, memo_size = args.memo_size, \
+                     max_depth = args.max_depth, rng = args.rng, seed = args.seed))
+    sys.exit()
+
 try:
     file = open(fname, 'r')
-    interpreter = Interpreter(file)
-    interpreter.execute()
+    run(Interpreter(file, cache = None if args.no_cache else ProgramCache.for_script(fname), engine = args.engine, optimize = args.optimize, \
+                    memo_size = args.memo_size, max_depth = args.max_depth, rng = args.rng, seed = args.seed))
 except OSError:
     print("Could not open file: " + fname)
     sys.exit()
@@ -1,9 +1,16 @@
-from interpreting.error_handling import ArgumentError
+import re
+from lexing.error_handling import DiceLiteralError
+from interpreting.probability import Distribution
+from interpreting import rolling, entities
+from interpreting.error_handling import UndeclaredVariableError
+
+# types arithmetic operators accept
+NUMERIC_TYPES = (int, float, Distribution)
 
 class Node():
     pass
 
-from interpreting.scope import Scope
+from interpreting.scope import Scope, Frame, UNDECLARED
 class Instruction(Node):
     # line_no
     def execute(self, scope: Scope):
@@ -11,15 +18,20 @@ class Instruction(Node):
 class Declaration(Instruction):
     # var_type, var
     def execute(self, scope: Scope):
-        scope.add_variable(self.var.name)
+        # the resolver made sure the name is declared once, executing it again (in a loop) resets the variable
+        scope.slots[self.var.slot] = None
 class Assignment(Instruction):
     # lhs, rhs
     def execute(self, scope: Scope):
-        scope.set_variable_value(self.lhs.name, self.rhs.evaluate(scope))
+        value = self.rhs.evaluate(scope)
+        if scope.slots[self.lhs.slot] is UNDECLARED:
+            # the resolver saw the declaration, but it didn't run
+            raise UndeclaredVariableError(self.lhs.name)
+        scope.slots[self.lhs.slot] = value
 class AttackMove(Instruction):
     # attacker, defender
     def execute(self, scope: Scope):
-        pass
+        entities.attack(self.attacker.evaluate(scope), self.defender.evaluate(scope))
 class While(Instruction):
     # condition, block
     def execute(self, scope: Scope):
@@ -52,23 +64,41 @@ class Condition(Node):
             return self.first_operand.evaluate(scope) >= self.second_operand.evaluate(scope)
         elif self.operator == TokenType.EQUALS:
             return self.first_operand.evaluate(scope) == self.second_operand.evaluate(scope)
+class ConstantCondition(Condition):
+    # value, computed by the optimizer
+    def __init__(self, value: bool):
+        super(ConstantCondition, self).__init__()
+        self.value = value
+    def evaluate(self, scope: Scope) -> bool:
+        return self.value
 class Log(Instruction):
     # value
     def execute(self, scope: Scope):
-        if isinstance(self.value, Variable):
-            print( scope.get_variable_value( self.value.evaluate(scope) ) )
-        else:
-            print( self.value.evaluate(scope) )
+        print( self.value.evaluate(scope) )
 class Return(Instruction):
     # value
     def execute(self, scope: Scope):
         return self.value.evaluate(scope)
 
 class FunctionDefinition(Node):
-    # name, block
+    # name, block, line_no, frame_size
+    # the cached version of call, set for pure functions when memoizing, called instead of running the block
+    memo = None
     def __init__(self):
         super(FunctionDefinition, self).__init__()
         self.parameters = []
+    def __getstate__(self):
+        # the cached call can't be pickled, the memoizer of the unpickled program sets it again
+        state = dict(self.__dict__)
+        state.pop('memo', None)
+        return state
+    def call(self, *arguments):
+        function_scope = Frame(self.frame_size)
+        function_scope.slots[:len(arguments)] = arguments
+        for instruction in self.block.instructions:
+            result = instruction.execute(function_scope)
+            if result is not None:
+                return result
 class InstructionBlock(Node):
     def __init__(self):
         super(InstructionBlock, self).__init__()
@@ -79,7 +109,7 @@ from lexing.token import TokenType
 CharacterAttribute = recordtype('CharacterAttribute', 'value increase_type increase_amount')
 
 class Template(Node):
-    # name, health, attack, defence
+    # name, line_no, health, attack, defence
     pass
 class Item(Template):
     # desc, value
@@ -94,9 +124,10 @@ class Assignable(Node):
 class Literal(Assignable):
     pass
 class Number(Literal):
-    def __init__(self, value: str):
+    def __init__(self, value):
         super(Number, self).__init__()
-        self.value = int(value)
+        # number literals are parsed from strings, the optimizer creates them from computed values
+        self.value = int(value) if isinstance(value, str) else value
     def evaluate(self, scope):
         return self.value
 class String(Literal):
@@ -105,7 +136,7 @@ class String(Literal):
         self.value = value
     def evaluate(self, scope):
         return self.value
-from random import randint
+DICE_PATTERN = re.compile(r'(\d+)d(\d+)(!?)(?:([kd])([hl])(\d*))?')
 class Dice(Literal):
     def __init__(self, number: int, faces: int):
         super(Dice, self).__init__()
@@ -113,18 +144,42 @@ class Dice(Literal):
         self.faces = faces
     def __init__(self, string: str):
         super(Dice, self).__init__()
-        values = string.split('d')
-        self.number = int(values[0])
-        self.faces = int(values[1])
+        # NdF, then ! for exploding dice and kh, kl, dh or dl with a count (1 by default) keeping or dropping
+        # the highest or lowest dice, like the lexer writes them
+        number, faces, exploding, selection, side, count = DICE_PATTERN.fullmatch(string).groups()
+        self.number = int(number)
+        self.faces = int(faces)
+        if self.number < 0 or self.faces < 1:
+            raise DiceLiteralError("Dice literal without any faces" if self.faces < 1 else "Dice literal with a negative amount of dice")
+        self.exploding = exploding == '!'
+        self.modifiers = string[string.index('d') + len(faces) + 1:]
+        # how many dice are summed, None for all of them, and whether the highest or the lowest
+        self.keep = None
+        self.highest = True
+        if selection is not None:
+            count = int(count) if count else 1
+            self.highest = (selection, side) in (('k', 'h'), ('d', 'l'))
+            keep = min(count, self.number) if selection == 'k' else max(self.number - count, 0)
+            if keep < self.number:
+                self.keep = keep
+        self.pool = (self.number, self.faces, self.exploding, self.keep, self.highest)
+        self.modified = self.exploding or self.keep is not None
     def evaluate(self, scope: Scope):
         return self
     def roll(self) -> int:
-        result = 0
-        for i in range(self.number):
-            result += randint(1, self.faces)
-        return result
+        if self.number > 1 or self.modified:
+            # repeated rolls of a pool cost one draw from its cached alias table
+            table = rolling.alias_tables.table(*self.pool)
+            if table is not None:
+                return table.sample()
+            if self.number >= rolling.BULK_ROLL_THRESHOLD or self.modified:
+                return rolling.roll(*self.pool)
+        return rolling.active.roll(self.number, self.faces)
+    def roll_many(self, count: int):
+        # count independent rolls, as a numpy array
+        return rolling.roll_many(self.number, self.faces, count, self.exploding, self.keep, self.highest)
     def __str__(self) -> str:
-        return "%sd%s" % (self.number, self.faces)
+        return "%sd%s%s" % (self.number, self.faces, self.modifiers)
 
 class Expression(Assignable):
     def __init__(self):
@@ -144,11 +199,11 @@ class Expression(Assignable):
                 return result.evaluate(scope)
         else:
             evaluated_value = self.operands[0].evaluate(scope)
-            if not isinstance(evaluated_value, (int, float)): raise TypeError(self.operands[0])
+            if not isinstance(evaluated_value, NUMERIC_TYPES): raise TypeError(self.operands[0])
             i = 1
             for operator in self.operators:
                 next_value = self.operands[i].evaluate(scope)
-                if not isinstance(next_value, (int, float)): raise TypeError(self.operands[i])
+                if not isinstance(next_value, NUMERIC_TYPES): raise TypeError(self.operands[i])
                 if operator == TokenType.PLUS:
                     evaluated_value += next_value
                 elif operator == TokenType.MINUS:
@@ -161,40 +216,38 @@ class Expression(Assignable):
             return evaluated_value
 
 class FunctionCall(Instruction, Assignable):
+    # definition, bound by the linker
     def __init__(self, name: str):
         super(FunctionCall, self).__init__()
         self.name = name
         self.arguments = []
     def evaluate(self, scope: Scope):
-        if self.name in scope.definitions:
-            definition = scope.definitions[self.name]
-            if len(self.arguments) != len(definition.parameters):
-                # argument count doesn't match
-                raise ArgumentError(abs(len(self.arguments) - len(definition.parameters)))
-            else:
-                function_scope = Scope()
-                function_scope.definitions = scope.definitions
-                i = 0
-                for argument in self.arguments:
-                    var = definition.parameters[i]
-                    function_scope.add_variable(var.name)
-                    function_scope.set_variable_value(var.name, argument.evaluate(scope))
-                    i += 1
-                for instruction in definition.block.instructions:
-                    result = instruction.execute(function_scope)
-                    if result is not None:
-                        return result
-        else:
-            # function not defined
-            raise NameError(self.name)
+        definition = self.definition
+        if definition.memo is not None:
+            return definition.memo(*[argument.evaluate(scope) for argument in self.arguments])
+        # parameters take the first slots of the frame
+        function_scope = Frame(definition.frame_size)
+        slots = function_scope.slots
+        i = 0
+        for argument in self.arguments:
+            slots[i] = argument.evaluate(scope)
+            i += 1
+        for instruction in definition.block.instructions:
+            result = instruction.execute(function_scope)
+            if result is not None:
+                return result
     def execute(self, scope: Scope):
         self.evaluate(scope)
 class Variable(Assignable):
+    # slot, given by the resolver
     def __init__(self, name: str):
         super(Variable, self).__init__()
         self.name = name
     def evaluate(self, scope: Scope):
-        return scope.get_variable_value(self.name)
+        value = scope.slots[self.slot]
+        if value is UNDECLARED:
+            raise UndeclaredVariableError(self.name)
+        return value
 
 class DiceRoll(Expression):
     def __init__(self, operand):
@@ -212,6 +265,8 @@ class Program(Node):
         self.templates = []
         self.functions = []
         self.instructions = []
+        # size of the top level frame, given by the resolver
+        self.frame_size = 0
 
     def add(self, node: Node):
         if isinstance(node, Instruction):
@@ -227,3 +282,14 @@ class Program(Node):
         self.templates.append(template)
     def add_function(self, function: FunctionDefinition):
         self.functions.append(function)
+
+def walk(node):
+    # yields every node of the tree, a call's definition is walked with the functions, not once per call site
+    if isinstance(node, (list, tuple)):
+        for item in node:
+            yield from walk(item)
+    elif isinstance(node, Node):
+        yield node
+        for name, value in vars(node).items():
+            if name != 'definition':
+                yield from walk(value)
@@ -1,14 +1,92 @@
 import sys
 
 from lexing.lexer import Lexer
+from lexing.error_handling import DiceLiteralError
 from lexing.token import Token, TokenType
 from . import error_handling, ast
 
+class TokenSet(frozenset):
+    # frozenset for constant time membership tests, remembers the declaration order for error messages
+    __slots__ = ('ordered', )
+    def __new__(cls, *token_types: TokenType):
+        result = super(TokenSet, cls).__new__(cls, token_types)
+        result.ordered = token_types
+        return result
+    def __str__(self) -> str:
+        return str(self.ordered)
+
+# FIRST sets of the grammar rules
+INSTRUCTION_FIRST = TokenSet(TokenType.IDENTIFIER, TokenType.WHILE, TokenType.IF, TokenType.QUESTION_MARK, TokenType.RETURN)
+STATEMENT_FIRST = TokenSet(TokenType.ITEM, TokenType.CHARACTER, TokenType.FUNCTION, TokenType.IDENTIFIER, \
+                           TokenType.WHILE, TokenType.IF, TokenType.QUESTION_MARK, TokenType.RETURN, TokenType.END_OF_FILE)
+ITEM_ATTRIBUTE_FIRST = TokenSet(TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.DESC, TokenType.VALUE)
+CHARACTER_ATTRIBUTE_FIRST = TokenSet(TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.LEVEL, TokenType.REQEXP, \
+                                     TokenType.EXP, TokenType.EQUIPPED, TokenType.INVENTORY, TokenType.REWARD)
+INCREASE_OPERATORS = TokenSet(TokenType.INCREASES_BY, TokenType.MULTIPLIES_BY)
+INCREASE_AMOUNT_FIRST = TokenSet(TokenType.NUMBER_LITERAL, TokenType.DICE_LITERAL)
+ITEM_SEPARATORS = TokenSet(TokenType.SLASH, TokenType.AND)
+ADDITIVE_OPERATORS = TokenSet(TokenType.PLUS, TokenType.MINUS)
+MULTIPLICATIVE_OPERATORS = TokenSet(TokenType.ASTERISK, TokenType.SLASH)
+LOGICAL_OPERATORS = TokenSet(TokenType.LESS_THAN, TokenType.MORE_THAN, TokenType.LESS_OR_EQUAL, TokenType.MORE_OR_EQUAL, TokenType.EQUALS)
+
+# template attribute token -> template attribute name
+ITEM_ATTRIBUTES = {
+    TokenType.HEALTH: 'health',
+    TokenType.ATTACK: 'attack',
+    TokenType.DEFENCE: 'defence',
+    TokenType.DESC: 'desc',
+    TokenType.VALUE: 'value'
+}
+CHARACTER_ATTRIBUTES = {
+    TokenType.HEALTH: 'health',
+    TokenType.ATTACK: 'attack',
+    TokenType.DEFENCE: 'defence',
+    TokenType.LEVEL: 'level',
+    TokenType.REQEXP: 'reqexp',
+    TokenType.EXP: 'exp',
+    TokenType.EQUIPPED: 'equipped',
+    TokenType.INVENTORY: 'inventory',
+    TokenType.REWARD: 'reward'
+}
+
 class Parser():
     def __init__(self, lexer: Lexer):
         self.lexer = lexer
+        self.next_token = iter(lexer).__next__
         self.buffered_token = None
-    
+
+        # dispatch tables, token type -> parsing method
+        self.statement_parsers = {
+            TokenType.ITEM: lambda token: self.parse_item(),
+            TokenType.CHARACTER: lambda token: self.parse_character(),
+            TokenType.FUNCTION: lambda token: self.parse_function_definition(),
+            TokenType.END_OF_FILE: lambda token: None
+        }
+        for token_type in INSTRUCTION_FIRST:
+            self.statement_parsers[token_type] = self.parse_instruction
+        self.instruction_parsers = {
+            TokenType.IDENTIFIER: self.parse_assignment_or_call_or_declaration_or_attack_move,
+            TokenType.WHILE: lambda token: self.parse_while(),
+            TokenType.IF: lambda token: self.parse_if(),
+            TokenType.QUESTION_MARK: lambda token: self.parse_log(),
+            TokenType.RETURN: lambda token: self.parse_return()
+        }
+        # instructions which end with a semicolon instead of an instruction block
+        self.semicolon_terminated = frozenset(( TokenType.IDENTIFIER, TokenType.QUESTION_MARK, TokenType.RETURN ))
+        self.identifier_instruction_parsers = {
+            TokenType.ASSIGN: self.parse_assignment,
+            TokenType.ROUND_OPEN: self.parse_function_call,
+            TokenType.IDENTIFIER: self.parse_declaration,
+            TokenType.ATTACK_MOVE: self.parse_attack_move
+        }
+        self.primary_expression_parsers = {
+            TokenType.ROUND_OPEN: self.parse_parenthesized_expression,
+            TokenType.IDENTIFIER: self.parse_variable_or_function_call,
+            TokenType.CARET: self.parse_dice_roll,
+            TokenType.NUMBER_LITERAL: self.parse_number,
+            TokenType.DICE_LITERAL: self.parse_dice
+        }
+
     def parse(self):
         self.buffered_token = None
 
@@ -19,79 +97,59 @@ class Parser():
 
         return syntax_tree
 
-    def is_acceptable(self, token: Token, acceptable: tuple) -> bool:
-        for token_type in acceptable:
-            if token.t_type == token_type:
-                return True
-        return False
+    def is_acceptable(self, token: Token, acceptable: TokenSet) -> bool:
+        return token.t_type in acceptable
 
-    def accept(self, acceptable: tuple) -> Token:
+    def accept(self, acceptable: TokenSet) -> Token:
         if self.buffered_token is None:
-            token = self.lexer.next_token()
+            token = self.next_token()
         else:
             token = self.buffered_token
             self.buffered_token = None
         
         try:
-            if self.is_acceptable(token, acceptable):
+            if token.t_type in acceptable:
                 return token
             else:
                 raise error_handling.UnexpectedTokenError("UnexpectedTokenError: expected: " + str(acceptable) \
                                                         + "; got: " + str(token.t_type) + " '" + token.t_value + "', line " \
-                                                        + str(self.lexer.reader.position.line_no) + ", char " + str(self.lexer.reader.position.char_no))
+                                                        + str(token.line_no) + ", char " + str(token.char_no))
         except error_handling.UnexpectedTokenError as e:
             print(e)
             sys.exit()
 
-    def peek(self, acceptable: tuple) -> bool:
+    def peek(self, acceptable: TokenSet) -> bool:
         if self.buffered_token is None:
-            self.buffered_token = self.lexer.next_token()
-        return self.is_acceptable(self.buffered_token, acceptable)
+            self.buffered_token = self.next_token()
+        return self.buffered_token.t_type in acceptable
 
-    def parse_statement(self) -> ast.Node:
-        token = self.accept(( TokenType.ITEM, TokenType.CHARACTER, TokenType.FUNCTION, TokenType.IDENTIFIER, \
-                              TokenType.WHILE, TokenType.IF, TokenType.QUESTION_MARK, TokenType.RETURN, TokenType.END_OF_FILE ))
-
-        result = None
-        if token.t_type == TokenType.ITEM:
-            result = self.parse_item()
-        elif token.t_type == TokenType.CHARACTER:
-            result = self.parse_character()
-        elif token.t_type == TokenType.FUNCTION:
-            result = self.parse_function_definition()
-        elif token.t_type in (TokenType.IDENTIFIER, TokenType.WHILE, TokenType.IF, TokenType.QUESTION_MARK, TokenType.RETURN):
-            result = self.parse_instruction(token)
-        elif token.t_type == TokenType.END_OF_FILE:
-            result = None
+    def peek_type(self) -> TokenType:
+        if self.buffered_token is None:
+            self.buffered_token = self.next_token()
+        return self.buffered_token.t_type
 
-        return result
+    def parse_statement(self) -> ast.Node:
+        token = self.accept(STATEMENT_FIRST)
+        return self.statement_parsers[token.t_type](token)
 
     def parse_item(self) -> ast.Item:
         result = ast.Item()
 
         token = self.accept(( TokenType.IDENTIFIER, ))
         result.name = token.t_value
+        result.line_no = token.line_no
 
         self.accept(( TokenType.CURLY_OPEN, ))
-        while self.peek(( TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.DESC, TokenType.VALUE )):
+        while self.peek(ITEM_ATTRIBUTE_FIRST):
 
-            attribute_token = self.accept(( TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.DESC, TokenType.VALUE ))
+            attribute_token = self.accept(ITEM_ATTRIBUTE_FIRST)
             self.accept(( TokenType.COLON, ))
-            if attribute_token.t_type in { TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.VALUE }:
-                attribute_value = self.parse_number()
-            elif attribute_token.t_type in { TokenType.DESC }:
+            if attribute_token.t_type == TokenType.DESC:
                 attribute_value = self.parse_string()
+            else:
+                attribute_value = self.parse_number()
 
-            if attribute_token.t_type == TokenType.HEALTH:
-                result.health = attribute_value
-            elif attribute_token.t_type == TokenType.ATTACK:
-                result.attack = attribute_value
-            elif attribute_token.t_type == TokenType.DEFENCE:
-                result.defence = attribute_value
-            elif attribute_token.t_type == TokenType.DESC:
-                result.desc = attribute_value
-            elif attribute_token.t_type == TokenType.VALUE:
-                result.value = attribute_value
+            setattr(result, ITEM_ATTRIBUTES[attribute_token.t_type], attribute_value)
 
         self.accept(( TokenType.CURLY_CLOSE, ))
 
@@ -102,39 +160,20 @@ class Parser():
 
         token = self.accept(( TokenType.IDENTIFIER, ))
         result.name = token.t_value
+        result.line_no = token.line_no
 
         self.accept(( TokenType.CURLY_OPEN, ))
 
-        while self.peek(( TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.LEVEL, TokenType.REQEXP, \
-                          TokenType.EXP, TokenType.EQUIPPED, TokenType.INVENTORY, TokenType.REWARD )):
+        while self.peek(CHARACTER_ATTRIBUTE_FIRST):
 
-            attribute_token = self.accept(( TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.LEVEL, TokenType.REQEXP, \
-                                            TokenType.EXP, TokenType.EQUIPPED, TokenType.INVENTORY, TokenType.REWARD ))
+            attribute_token = self.accept(CHARACTER_ATTRIBUTE_FIRST)
             self.accept(( TokenType.COLON, ))
-            if attribute_token.t_type in { TokenType.HEALTH, TokenType.ATTACK, TokenType.DEFENCE, TokenType.LEVEL, TokenType.REQEXP, TokenType.EXP }:
-                attribute_value = self.parse_character_stat()
-            elif attribute_token.t_type in { TokenType.EQUIPPED, TokenType.INVENTORY, TokenType.REWARD }:
+            if attribute_token.t_type in { TokenType.EQUIPPED, TokenType.INVENTORY, TokenType.REWARD }:
                 attribute_value = self.parse_item_set()
+            else:
+                attribute_value = self.parse_character_stat()
 
-            if attribute_token.t_type == TokenType.HEALTH:
-                result.health = attribute_value
-            elif attribute_token.t_type == TokenType.ATTACK:
-                result.attack = attribute_value
-            elif attribute_token.t_type == TokenType.DEFENCE:
-                result.defence = attribute_value
-            elif attribute_token.t_type == TokenType.LEVEL:
-                result.level = attribute_value
-            elif attribute_token.t_type == TokenType.REQEXP:
-                result.reqexp = attribute_value
-            elif attribute_token.t_type == TokenType.EXP:
-                result.exp = attribute_value
-
-            elif attribute_token.t_type == TokenType.EQUIPPED:
-                result.equipped = attribute_value
-            elif attribute_token.t_type == TokenType.INVENTORY:
-                result.inventory = attribute_value
-            elif attribute_token.t_type == TokenType.REWARD:
-                result.reward = attribute_value
+            setattr(result, CHARACTER_ATTRIBUTES[attribute_token.t_type], attribute_value)
 
         self.accept(( TokenType.CURLY_CLOSE, ))
 
@@ -143,9 +182,12 @@ class Parser():
     def parse_character_stat(self) -> ast.CharacterAttribute:
         value_token = self.accept(( TokenType.NUMBER_LITERAL, ))
 
-        if self.peek(( TokenType.INCREASES_BY, TokenType.MULTIPLIES_BY )):
-            increase_type_token = self.accept(( TokenType.INCREASES_BY, TokenType.MULTIPLIES_BY ))
-            increase_amount_token = self.accept(( TokenType.NUMBER_LITERAL, TokenType.DICE_LITERAL ))
+        if self.peek(INCREASE_OPERATORS):
+            increase_type_token = self.accept(INCREASE_OPERATORS)
+            increase_amount_token = self.accept(INCREASE_AMOUNT_FIRST)
+            if increase_amount_token.t_type == TokenType.DICE_LITERAL:
+                # rolled when the character levels up, checked now
+                self.make_dice(increase_amount_token)
             result = ast.CharacterAttribute(int(value_token.t_value), increase_type_token.t_type, increase_amount_token.t_value)
         else:
             result = ast.CharacterAttribute(int(value_token.t_value), None, None)
@@ -157,8 +199,8 @@ class Parser():
         end = False
         while not end:
             item_name = self.accept(( TokenType.IDENTIFIER, ))
-            if self.peek(( TokenType.SLASH, TokenType.AND )):
-                separator = self.accept(( TokenType.SLASH, TokenType.AND ))
+            if self.peek(ITEM_SEPARATORS):
+                separator = self.accept(ITEM_SEPARATORS)
                 if separator.t_type == TokenType.SLASH:
                     item_amount = self.accept(( TokenType.NUMBER_LITERAL, ))
                     item_set.append( (item_name.t_value, int(item_amount.t_value)) )
@@ -177,6 +219,7 @@ class Parser():
         result = ast.FunctionDefinition()
         name_token = self.accept(( TokenType.IDENTIFIER, ))
         result.name = name_token.t_value
+        result.line_no = name_token.line_no
         result.parameters = self.parse_definition_parameters()
         result.block = self.parse_instruction_block()
         return result
@@ -201,34 +244,18 @@ class Parser():
         return result
 
     def parse_instruction(self, token: Token = None) -> ast.Instruction:
-        line_no = self.lexer.reader.position.line_no
         if token is None:
-            token = self.accept(( TokenType.IDENTIFIER, TokenType.WHILE, TokenType.IF, TokenType.QUESTION_MARK, TokenType.RETURN ))
-        if token.t_type == TokenType.IDENTIFIER:
-            result = self.parse_assignment_or_call_or_declaration_or_attack_move(token)
-            self.accept(( TokenType.SEMICOLON, ))
-        elif token.t_type == TokenType.WHILE:
-            result = self.parse_while()
-        elif token.t_type == TokenType.IF:
-            result = self.parse_if()
-        elif token.t_type == TokenType.QUESTION_MARK:
-            result = self.parse_log()
+            token = self.accept(INSTRUCTION_FIRST)
+        result = self.instruction_parsers[token.t_type](token)
+        if token.t_type in self.semicolon_terminated:
             self.accept(( TokenType.SEMICOLON, ))
-        elif token.t_type == TokenType.RETURN:
-            result = self.parse_return()
-            self.accept(( TokenType.SEMICOLON, ))
-        result.line_no = line_no
+        result.line_no = token.line_no
         return result
 
     def parse_assignment_or_call_or_declaration_or_attack_move(self, token: Token) -> ast.Instruction:
-        if self.peek(( TokenType.ASSIGN, )):
-            return self.parse_assignment(token)
-        elif self.peek(( TokenType.ROUND_OPEN, )):
-            return self.parse_function_call(token)
-        elif self.peek(( TokenType.IDENTIFIER, )):
-            return self.parse_declaration(token)
-        elif self.peek(( TokenType.ATTACK_MOVE, )):
-            return self.parse_attack_move(token)
+        parser = self.identifier_instruction_parsers.get(self.peek_type())
+        if parser is not None:
+            return parser(token)
 
     def parse_assignment(self, identifier: Token) -> ast.Assignment:
         result = ast.Assignment()
@@ -287,17 +314,18 @@ class Parser():
         return result
 
     def parse_logical_operator(self) -> TokenType:
-        token = self.accept(( TokenType.LESS_THAN, TokenType.MORE_THAN, TokenType.LESS_OR_EQUAL, TokenType.MORE_OR_EQUAL, TokenType.EQUALS ))
+        token = self.accept(LOGICAL_OPERATORS)
         return token.t_type
 
     def parse_assignable(self) -> ast.Assignable:
-        if self.peek(( TokenType.IDENTIFIER, )):
+        next_type = self.peek_type()
+        if next_type == TokenType.IDENTIFIER:
             identifier_token = self.accept(( TokenType.IDENTIFIER, ))
-            if self.peek(( TokenType.ROUND_OPEN, )):
+            if self.peek_type() == TokenType.ROUND_OPEN:
                 return self.parse_function_call(identifier_token)
             else:
                 return self.parse_expression(identifier_token)
-        elif self.peek(( TokenType.STRING_LITERAL, )):
+        elif next_type == TokenType.STRING_LITERAL:
             return self.parse_string()
         else:
             return self.parse_expression()
@@ -321,8 +349,8 @@ class Parser():
     def parse_expression(self, token: Token = None) -> ast.Expression:
         result = ast.Expression()
         result.add_operand(self.parse_multiplicative_expression(token))
-        while ( self.peek(( TokenType.PLUS, TokenType.MINUS )) ):
-            op_token = self.accept(( TokenType.PLUS, TokenType.MINUS ))
+        while self.peek(ADDITIVE_OPERATORS):
+            op_token = self.accept(ADDITIVE_OPERATORS)
             result.add_operator(op_token.t_type)
             result.add_operand(self.parse_multiplicative_expression())
         return result
@@ -330,8 +358,8 @@ class Parser():
     def parse_multiplicative_expression(self, token: Token = None) -> ast.Expression:
         result = ast.Expression()
         result.add_operand(self.parse_primary_expression(token))
-        while ( self.peek(( TokenType.ASTERISK, TokenType.SLASH )) ):
-            op_token = self.accept(( TokenType.ASTERISK, TokenType.SLASH ))
+        while self.peek(MULTIPLICATIVE_OPERATORS):
+            op_token = self.accept(MULTIPLICATIVE_OPERATORS)
             result.add_operator(op_token.t_type)
             result.add_operand(self.parse_primary_expression())
         return result
@@ -339,29 +367,29 @@ class Parser():
     def parse_primary_expression(self, token: Token = None) -> ast.Expression:
         if token is not None:
             return self.parse_variable(token)
-        elif self.peek(( TokenType.ROUND_OPEN, )):
-            self.accept(( TokenType.ROUND_OPEN, ))
-            result = self.parse_expression()
-            self.accept(( TokenType.ROUND_CLOSE, ))
-            return result
-        elif self.peek(( TokenType.IDENTIFIER, )):
-            t = self.accept(( TokenType.IDENTIFIER, ))
-            if self.peek(( TokenType.ROUND_OPEN, )):
-                return self.parse_function_call(t)
-            return self.parse_variable(t)
-        elif self.peek(( TokenType.CARET, )):
-            return self.parse_dice_roll()
-        elif self.peek(( TokenType.NUMBER_LITERAL, )):
-            return self.parse_number()
-        elif self.peek(( TokenType.DICE_LITERAL, )):
-            return self.parse_dice()
+        parser = self.primary_expression_parsers.get(self.peek_type())
+        if parser is not None:
+            return parser()
+
+    def parse_parenthesized_expression(self) -> ast.Expression:
+        self.accept(( TokenType.ROUND_OPEN, ))
+        result = self.parse_expression()
+        self.accept(( TokenType.ROUND_CLOSE, ))
+        return result
+
+    def parse_variable_or_function_call(self) -> ast.Assignable:
+        t = self.accept(( TokenType.IDENTIFIER, ))
+        if self.peek_type() == TokenType.ROUND_OPEN:
+            return self.parse_function_call(t)
+        return self.parse_variable(t)
 
     def parse_literal(self) -> ast.Literal:
-        if self.peek(( TokenType.NUMBER_LITERAL, )):
+        next_type = self.peek_type()
+        if next_type == TokenType.NUMBER_LITERAL:
             return self.parse_number()
-        elif self.peek(( TokenType.STRING_LITERAL, )):
+        elif next_type == TokenType.STRING_LITERAL:
             return self.parse_string()
-        elif self.peek(( TokenType.DICE_LITERAL, )):
+        elif next_type == TokenType.DICE_LITERAL:
             return self.parse_dice()
 
     def parse_number(self) -> ast.Number:
@@ -374,13 +402,22 @@ class Parser():
 
     def parse_dice(self) -> ast.Dice:
         dice_token = self.accept(( TokenType.DICE_LITERAL, ))
-        return ast.Dice(dice_token.t_value)
+        return self.make_dice(dice_token)
+
+    def make_dice(self, dice_token: Token) -> ast.Dice:
+        # the lexer lets through dice it can't roll, like 1d0
+        try:
+            return ast.Dice(dice_token.t_value)
+        except DiceLiteralError as e:
+            print("DiceLiteralError: " + str(e) + ", line " + str(dice_token.line_no) + ", char " + str(dice_token.char_no))
+            sys.exit()
 
     def parse_dice_roll(self) -> ast.DiceRoll:
         self.accept(( TokenType.CARET, ))
-        if self.peek(( TokenType.DICE_LITERAL, )):
+        next_type = self.peek_type()
+        if next_type == TokenType.DICE_LITERAL:
             return ast.DiceRoll(self.parse_dice())
-        elif self.peek(( TokenType.IDENTIFIER, )):
+        elif next_type == TokenType.IDENTIFIER:
             return ast.DiceRoll(self.parse_variable())
 
     def parse_variable(self, token: Token = None) -> ast.Variable:
@@ -0,0 +1,58 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+sys.path.append('D:\Projects\dndlang-python')
+from interpreting.cache import ProgramCache
+from interpreting.interpreter import Interpreter
+from parsing import ast
+
+class TestProgramCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ProgramCache.for_script(os.path.join(self.directory.name, 'script.adv'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cold_and_warm_start(self):
+        source = "function add(a, b) { return a + b; }\nitem Gold { value: 1 }\n?add(1, 2);"
+
+        cold = Interpreter(io.StringIO(source), cache = self.cache)
+        self.assertIsNotNone(cold.parser)
+        self.assertTrue(os.path.exists(self.cache.path))
+
+        warm = Interpreter(io.StringIO(source), cache = self.cache)
+        self.assertIsNone(warm.lexer)
+        self.assertIsNone(warm.parser)
+        self.assertEqual(len(warm.ast.functions), 1)
+        self.assertEqual(warm.ast.functions[0].name, 'add')
+        self.assertIsInstance(warm.ast.templates[0], ast.Item)
+        self.assertEqual(len(warm.ast.instructions), 1)
+
+    def test_changed_source_invalidates(self):
+        Interpreter(io.StringIO("?1;"), cache = self.cache)
+        self.assertIsNone(self.cache.load("?2;"))
+        self.assertIsNotNone(self.cache.load("?1;"))
+
+    def test_corrupted_cache_ignored(self):
+        Interpreter(io.StringIO("?1;"), cache = self.cache)
+        with open(self.cache.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.cache.path) // 2)
+        self.assertIsNone(self.cache.load("?1;"))
+
+        interpreter = Interpreter(io.StringIO("?1;"), cache = self.cache)
+        self.assertIsNotNone(interpreter.parser)
+        self.assertIsNotNone(self.cache.load("?1;"))
+
+    def test_unwritable_cache_ignored(self):
+        blocker = os.path.join(self.directory.name, 'blocker')
+        open(blocker, 'w').close()
+        cache = ProgramCache(os.path.join(blocker, 'script.ast'))
+        interpreter = Interpreter(io.StringIO("?1;"), cache = cache)
+        self.assertEqual(len(interpreter.ast.instructions), 1)
+
+if __name__ == '__main__':
+    unittest.main()
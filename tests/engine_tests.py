@@ -0,0 +1,106 @@
+import unittest
+import io
+import os
+import random
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from interpreting.interpreter import Interpreter, ENGINES
+
+TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test_cases')
+
+# scripts exercising the error reporting and the less obvious semantics
+SNIPPETS = [
+    'String s; s = "a"; ?s + 1;',
+    'Number a; ?a; ?b;',
+    'Number a; a = 2; Number a;',
+    'Number i; i = 0; while (i < 2) { Number x; i = i + 1; }',
+    'function f(a, b) { return a; } ?f(1);',
+    '?1; ?missing(2); ?3;',
+    'function f(n) { Number i; i = 0; while (i < 3) { if (i == 1) { return 7; ?"skipped"; } ?i; i = i + 1; } return n; } ?f(5);',
+    'function f() { ?"no return"; } ?f();',
+    'function g() { return 4; } function f() { g(); return 2 * g() - 1 / 4; } ?f();',
+    'function f(n) { if (n > 0) { return f(n - 1); } return "done"; } ?f(50);',
+    'function f(n) { return 0 + f(n + 1); } ?f(1); ?"unreachable";',
+    'function f(n) { if (n > 0) { return f(n - 1); } } function g(n) { if (n > 0) { ?n; return f(n); } else { return f(1); } } ?g(2); ?g(0);',
+    'Dice d; d = 3d6; ?d; ?^d; ?^2d4 * 2; Number x; x = ^d; if (x <= 18) { ?x; }',
+    'Dice pool; pool = 200d6; ?^pool; ?^pool + ^2d6; ?^40d4 * 2;',
+    'Number a; a = 1; if (a == 1) { ?"one"; } else { ?"other"; } if (a > 1) { ?"more"; } else { ?"less"; }',
+    '?(1 + 2) * (3 - 4) / 5 - 6 * 7;',
+    'Number i; i = 0; while (i < 3) { Number x; ?x; x = i; i = i + 1; }',
+    'function f(n) { if (n > 0) { Number x; x = n; } return x; } ?f(1);',
+    'Number i; i = 2 * 3 + 1; while (1 > 2) { ?"never"; } if ("a" == "a") { ?i / 2 * 4; }',
+    'String s; s = "x"; ?2 * 3 + s;',
+    'Number d; d = 2 * distribution(2d6) - 1; ?d; ?probability(d, 13); ?distribution(1); ?0 + distribution(1d4) + 1d4;',
+    'function p(d) { return probability(d, 4); } ?p(1d4); ?p(2d4); ?probability(1d6, "a");',
+    'Dice stat; stat = 4d6dl1; ?stat; ?^stat; ?^2d20kh + ^2d20kl1; ?^3d6!; ?^100d6kh3; ?^40d6!dl39; ?probability(2d20kh, 20);',
+    'function best(a, b) { if (0 + mean(a) > mean(b)) { return a; } return b; } ?best(2d6, 1d12); ?variance(4d6dl1); ?min(3d6!kh2); ?max(distribution(2d4) * 2); ?at_least(2d20kh, 20); ?at_least(1d6, "a");',
+    'character Goblin { health: 6 attack: 2 } function hurt(g, n) { set_stat(g, "health", 0 + stat(g, "health") - n); return alive(g); } Character g; g = spawn("Goblin"); ?hurt(g, 2); ?hurt(g, 4); ?g; Character many; many = spawn_many("Goblin", 5); ?stat(many, "attack"); ?spawn("Orc");',
+    'character A { health: 10 attack: 4 defence: 1 } function fight(a, b) { a >> b; return alive(b); } Character x; x = spawn("A"); Character y; y = spawn_many("A", 3); ?fight(y, x); ?fight(x, y); ?stat(y, "health"); Number n; x >> n;',
+    'character Hero { health: 10 += 1d8 attack: 3 += 2 defence: 1 *= 2 reqexp: 100 += 2d6kh1 } Character h; h = spawn("Hero"); level_up(h, 9); ?stat(h, "health"); ?stat(h, "attack"); ?stat(h, "reqexp"); Character g; g = spawn_many("Hero", 4); level_up(g, 2); ?stat(g, "health"); ?stat_at("Hero", "defence", 5); ?expected_stat("Hero", "health", 50); ?probability(stat_at("Hero", "health", 2), 11); ?stat_at("Hero", "luck", 2);',
+    'function same(n) { return n; } function twice(n) { return 0 + same(n) + same(n); } ?same(1); ?same(2 / 2); ?twice(3); ?twice(3);',
+]
+
+def run(source: str, engine: str, optimize: bool = False, seed: int = 0, rng: str = 'stdlib') -> str:
+    random.seed(seed)
+    output = io.StringIO()
+    with redirect_stdout(output):
+        # the numpy generator is seeded itself, the stdlib one rolls with the seeded random module
+        Interpreter(io.StringIO(source), engine = engine, optimize = optimize, rng = rng, seed = seed if rng == 'numpy' else None).execute()
+    return output.getvalue()
+
+class TestEngines(unittest.TestCase):
+
+    def test_test_cases(self):
+        for fname in sorted(os.listdir(TEST_CASES)):
+            if not fname.endswith('.adv'):
+                continue
+            with open(os.path.join(TEST_CASES, fname), 'r') as file:
+                source = file.read()
+            expected = run(source, 'tree')
+            for engine in ENGINES:
+                for optimize in (False, True):
+                    with self.subTest(engine = engine, optimize = optimize, fname = fname):
+                        self.assertEqual(run(source, engine, optimize), expected)
+
+    def test_snippets(self):
+        for source in SNIPPETS:
+            expected = run(source, 'tree')
+            for engine in ENGINES:
+                for optimize in (False, True):
+                    with self.subTest(engine = engine, optimize = optimize, source = source):
+                        self.assertEqual(run(source, engine, optimize), expected)
+
+    def test_undeclared_variables(self):
+        # the declaration is resolved, but it never runs
+        undeclared = "UndeclaredVariableError: Variable 'b' is not declared, line 1\n"
+        cases = [
+            ('Number a; if (1 == 2) { Number b; } ?b;', undeclared),
+            ('Number a; if (1 == 2) { Number b; } b = 3; ?b;', undeclared),
+            ('function f() { if (1 == 2) { Number b; } return b; } ?f();', undeclared),
+            ('function f() { if (1 == 2) { Number b; } b = 3; return b; } ?f();', undeclared),
+            ('Number a; if (1 == 1) { Number b; b = 2; } a = b; ?a;', "2\n"),
+            ('function f() { if (1 == 1) { Number b; b = 2; } return b; } ?f();', "2\n"),
+        ]
+        for source, expected in cases:
+            for engine in ENGINES:
+                for optimize in (False, True):
+                    with self.subTest(engine = engine, optimize = optimize, source = source):
+                        self.assertEqual(run(source, engine, optimize), expected)
+            with self.subTest(engine = 'ensemble', source = source):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    ensemble = Interpreter(io.StringIO(source)).execute_ensemble(3)
+                self.assertEqual(output.getvalue(), '')
+                self.assertEqual([ensemble.lane_output(lane) for lane in range(3)], [expected] * 3)
+
+    def test_numpy_rng(self):
+        source = 'Dice d; d = 3d6; ?^d; ?^1d20 + ^1d20; ?^200d6; ?^40d4 * 2; function f(n) { return ^n; } ?f(2d8);'
+        expected = run(source, 'tree', seed = 3, rng = 'numpy')
+        self.assertNotEqual(run(source, 'tree', seed = 4, rng = 'numpy'), expected)
+        for engine in ENGINES:
+            with self.subTest(engine = engine):
+                self.assertEqual(run(source, engine, True, seed = 3, rng = 'numpy'), expected)
+
+if __name__ == '__main__':
+    unittest.main()
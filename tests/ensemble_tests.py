@@ -0,0 +1,120 @@
+import unittest
+import io
+import os
+import random
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from interpreting.interpreter import Interpreter
+
+TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test_cases')
+
+# without dice every lane prints what a single run prints
+DETERMINISTIC = [
+    'function f(n) { Number i; i = 0; while (i < 3) { if (i == 1) { return 7; ?"skipped"; } ?i; i = i + 1; } return n; } ?f(5);',
+    'function f() { ?"no return"; } ?f();',
+    'function f(n) { if (n > 0) { return f(n - 1); } return "done"; } ?f(50);',
+    'Number i; i = 0; while (i < 3) { Number x; ?x; x = i; i = i + 1; }',
+    'function f(n) { if (n > 2) { return "big"; } else { if (n == 1) { return 1; } } } ?f(1); ?f(2); ?f(3);',
+    '?(1 + 2) * (3 - 4) / 5 - 6 * 7; ?probability(2d6, 7);',
+    # ^1d1 makes lane arrays, too large for int64 after doubling 70 times
+    'Number x; x = ^1d1; Number i; i = 0; while (i < 70) { x = x * 2; i = i + 1; } ?x; ?x / 3; ?x - x + 5; ?x * x;',
+    'Number z; z = ^1d1 - 1; if (z > 0) { ?10 / z; } ?"no division";',
+]
+
+def run(source: str, lanes: int):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        ensemble = Interpreter(io.StringIO(source)).execute_ensemble(lanes)
+    return ensemble, output.getvalue()
+
+def run_tree(source: str) -> str:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        Interpreter(io.StringIO(source)).execute()
+    return output.getvalue()
+
+class TestEnsemble(unittest.TestCase):
+
+    def test_lanes_match_single_runs(self):
+        sources = list(DETERMINISTIC)
+        for fname in ('fibonacci.adv', 'power.adv', 'simple_functions.adv', 'string_return.adv', 'hello_world.adv'):
+            with open(os.path.join(TEST_CASES, fname), 'r') as file:
+                sources.append(file.read())
+        for source in sources:
+            with self.subTest(source = source):
+                ensemble, output = run(source, 3)
+                expected = run_tree(source)
+                for lane in range(3):
+                    self.assertEqual(ensemble.lane_output(lane), expected)
+
+    def test_rolls_per_lane(self):
+        random.seed(0)
+        ensemble, output = run('Number r; r = ^2d6; ?r; if (r == 7) { ?"seven"; }', 36000)
+
+        mask, rolls = ensemble.output[0]
+        self.assertEqual(len(set(rolls.tolist())), 11)
+        self.assertAlmostEqual(rolls.mean(), 7, delta = 0.05)
+        mask, value = ensemble.output[1]
+        self.assertAlmostEqual(mask.sum() / 36000, 1 / 6, delta = 0.01)
+        self.assertEqual(value, "seven")
+
+    def test_loops_and_returns_per_lane(self):
+        source = 'function f(n) { Number i; i = 0; while (i < n) { i = i + 1; } if (i > 2) { return "many"; } return i; } ?f(^1d4);'
+        ensemble, output = run(source, 1000)
+
+        outputs = { ensemble.lane_output(lane) for lane in range(1000) }
+        self.assertEqual(outputs, { "1\n", "2\n", "many\n" })
+
+    def test_summary(self):
+        ensemble, output = run('?"a"; Number x; x = ^1d1 + 2; ?x; if (^1d2 == 1) { ?x; } ?^1d6;', 100)
+
+        lines = ensemble.summary().split('\n')
+        self.assertEqual(lines[:2], ["a", "3"])
+        self.assertRegex(lines[2], r"^3 \(\d+ lanes\)$")
+        self.assertRegex(lines[3], r"^mean [\d.]+, sd [\d.]+, min 1, max 6$")
+
+    def test_entities_per_lane(self):
+        source = '''character Goblin { health: 6 }
+            Character c; Number r; r = ^1d2; if (r == 1) { c = spawn("Goblin"); } c = spawn("Goblin"); ?c;
+            set_stat(c, "health", 0 + r); ?stat(c, "health"); ?alive(spawn_many("Goblin", 3));'''
+        ensemble, output = run(source, 200)
+
+        outputs = { ensemble.lane_output(lane) for lane in range(200) }
+        # the lanes rolling 1 spawned a goblin before, in a store of their own
+        self.assertEqual(outputs, { "Goblin#1\n1\n3\n", "Goblin#0\n2\n3\n" })
+        self.assertEqual(len({ id(ensemble.lane_store(lane)) for lane in range(200) }), 200)
+
+    def test_attack_in_condition(self):
+        source = '''character A { health: 10 attack: 4 }
+            Character x; x = spawn("A"); Character y; y = spawn("A"); Number r; r = ^1d2;
+            if (r == 1) { x >> y; } ?r; ?stat(y, "health");'''
+        ensemble, output = run(source, 200)
+
+        outputs = { ensemble.lane_output(lane) for lane in range(200) }
+        self.assertEqual(outputs, { "1\n6\n", "2\n10\n" })
+
+    def test_level_up_per_lane(self):
+        random.seed(0)
+        source = '''character Hero { health: 10 += 1d8 attack: 3 += 2 }
+            Character h; h = spawn("Hero"); level_up(h, 49); ?stat(h, "health"); ?stat(h, "attack");'''
+        ensemble, output = run(source, 1000)
+
+        # every lane rolls its own growth, 49d8 on top of 10
+        mask, health = ensemble.output[0]
+        self.assertTrue(len(set(health.tolist())) > 20)
+        self.assertAlmostEqual(health.mean(), 10 + 49 * 4.5, delta = 2)
+        self.assertEqual(ensemble.output[1][1], 101)
+
+    def test_error(self):
+        ensemble, output = run('String s;\ns = "a";\n?1;\n?s + 1;\n?2;', 10)
+
+        # printed after the output before it, like a single run does
+        error = "TypeError: Attempted arithmetic operation on unsupported type, line 4"
+        self.assertEqual(output, "")
+        self.assertEqual(ensemble.summary(), "1\n" + error)
+        self.assertEqual(ensemble.lane_output(3), "1\n%s\n" % error)
+        self.assertEqual(ensemble.lane_output(3), run_tree('String s;\ns = "a";\n?1;\n?s + 1;\n?2;'))
+
+if __name__ == '__main__':
+    unittest.main()
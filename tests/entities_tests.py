@@ -0,0 +1,174 @@
+import unittest
+import io
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting import entities
+from interpreting.entities import EntityStore
+from interpreting.interpreter import Interpreter
+from interpreting.error_handling import MultipleNameError
+
+TEMPLATES = '''
+item Sword { attack: 3 value: 10 }
+item Shield { defence: 2 health: 5 }
+character Knight { level: 2 health: 20 attack: 4 defence: 1 equipped: Sword & Shield/2 }
+character Goblin { health: 6 attack: 2 }
+'''
+
+def parse_templates(source: str) -> list:
+    return Parser(Lexer(io.StringIO(source))).parse().templates
+
+def run(source: str) -> str:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        Interpreter(io.StringIO(source)).execute()
+    return output.getvalue()
+
+class TestEntities(unittest.TestCase):
+
+    def test_template_stats(self):
+        store = EntityStore(parse_templates(TEMPLATES))
+
+        knight = store.spawn('Knight', 1)
+        goblins = store.spawn('Goblin', 3)
+        self.assertEqual((knight.start, goblins.start, goblins.stop), (0, 1, 4))
+        # equipped items add their stats
+        self.assertEqual([int(store.column(stat)[0]) for stat in ('health', 'attack', 'defence', 'level')], [30, 7, 5, 2])
+        # left out stats
+        self.assertEqual([int(store.column(stat)[3]) for stat in ('health', 'attack', 'defence', 'level', 'exp')], [6, 2, 0, 1, 0])
+        self.assertEqual(str(goblins), "3 x Goblin")
+        self.assertEqual(str(entities.Entity(store, 2)), "Goblin#2")
+
+    def test_columns_grow(self):
+        store = EntityStore(parse_templates(TEMPLATES))
+        for i in range(entities.INITIAL_CAPACITY + 1):
+            store.spawn('Goblin', 1)
+        store.spawn('Knight', 1000)
+
+        self.assertEqual(store.size, entities.INITIAL_CAPACITY + 1001)
+        self.assertTrue(len(store.column('health')) >= store.size)
+        self.assertEqual(int(store.column('health')[:store.size].sum()), 6 * (entities.INITIAL_CAPACITY + 1) + 30 * 1000)
+        self.assertEqual(store.template_name(store.size - 1), 'Knight')
+
+        store.clear()
+        self.assertEqual(store.size, 0)
+
+    def test_template_errors(self):
+        with self.assertRaises(MultipleNameError):
+            EntityStore(parse_templates("character A { }\nitem A { }"))
+        with self.assertRaises(NameError):
+            EntityStore(parse_templates("character A { equipped: B }"))
+        with self.assertRaises(NameError):
+            EntityStore(parse_templates("character A { }")).spawn('B', 1)
+        self.assertEqual(run("character A { }\nitem A { }\n?1;"), "MultipleNameError: Name 'A' is already defined, line 2\n")
+
+    def test_builtins(self):
+        output = run(TEMPLATES + '''
+            Character k; k = spawn("Knight"); ?k; ?stat(k, "attack");
+            Character horde; horde = spawn_many("Goblin", 1000); ?horde; ?stat(horde, "health");
+            set_stat(horde, "health", 0); ?alive(horde); ?alive(k); set_stat(k, "exp", 9 / 3); ?stat(k, "exp");
+            ?stat(k, "luck");''')
+
+        self.assertEqual(output, "Knight#0\n7\n1000 x Goblin\n6000\n0\n1\n3\nNameError: Name 'luck' is not defined, line 10\n")
+
+    def test_attack(self):
+        store = EntityStore(parse_templates(TEMPLATES))
+        knight = store.spawn('Knight', 1)
+        goblin = store.spawn('Goblin', 1)
+        health = store.column('health')
+
+        entities.attack(entities.Entity(store, 0), entities.Entity(store, 1))
+        # 7 attack against no defence, health doesn't go below 0
+        self.assertEqual(int(health[1]), 0)
+        # dead characters don't attack
+        store.attack(goblin.rows(), knight.rows())
+        self.assertEqual(int(health[0]), 30)
+        with self.assertRaises(TypeError):
+            entities.attack(knight, 3)
+
+    def test_group_attack(self):
+        store = EntityStore(parse_templates("character A { health: 100 attack: 5 defence: 1 }"))
+        first = store.spawn('A', 4)
+        second = store.spawn('A', 4)
+        health = store.column('health')
+
+        entities.attack(first, second)
+        self.assertEqual(health[:8].tolist(), [100] * 4 + [96] * 4)
+        # the smaller side wraps around, hits on the same defender add up
+        few = store.spawn('A', 2)
+        entities.attack(first, few)
+        self.assertEqual(health[8:10].tolist(), [92, 92])
+        entities.attack(few, first)
+        self.assertEqual(health[:4].tolist(), [96] * 4)
+        # a group attacking itself, the hits land at once
+        entities.attack(second, second)
+        self.assertEqual(health[4:8].tolist(), [92] * 4)
+
+    def test_attack_move(self):
+        output = run(TEMPLATES + '''
+            Character k; k = spawn("Knight"); Character g; g = spawn("Goblin");
+            g >> k; ?stat(k, "health"); k >> g; ?alive(g); g >> k; ?stat(k, "health");
+            Character army; army = spawn_many("Knight", 1000); Character horde; horde = spawn_many("Goblin", 3000);
+            army >> horde; ?alive(horde); Number n; n = 3; n >> k;''')
+
+        self.assertEqual(output, "30\n0\n30\n0\nTypeError: Attempted arithmetic operation on unsupported type, line 10\n")
+
+    def test_level_up(self):
+        store = EntityStore(parse_templates('''
+            item Ring { health: 4 }
+            character Hero { health: 10 += 1d8 attack: 3 += 2 defence: 1 *= 2 reqexp: 100 += 1d6kh1 equipped: Ring }'''))
+        heroes = store.spawn('Hero', 1000)
+        rows = heroes.rows()
+
+        store.level_up(rows, 49)
+        self.assertEqual(set(store.column('level')[rows].tolist()), { 50 })
+        self.assertEqual(set(store.column('attack')[rows].tolist()), { 101 })
+        self.assertEqual(set(store.column('defence')[rows].tolist()), { 2 ** 49 })
+        # 49d8 on top of the template and the ring, rolled for every hero
+        health = store.column('health')[rows]
+        self.assertTrue(63 <= health.min() and health.max() <= 406 and len(set(health.tolist())) > 10)
+        self.assertAlmostEqual(health.mean(), 14 + 49 * 4.5, delta = 5)
+        reqexp = store.column('reqexp')[rows]
+        self.assertTrue(149 <= reqexp.min() and reqexp.max() <= 394)
+        # growing from the stats as they are
+        store.columns['attack'][rows] = 0
+        store.level_up(rows, 1)
+        self.assertEqual(set(store.column('attack')[rows].tolist()), { 2 })
+
+    def test_stat_at(self):
+        store = EntityStore(parse_templates('''
+            item Ring { health: 4 }
+            character Hero { level: 2 health: 10 += 1d8 attack: 3 += 2 defence: 1 *= 2 equipped: Ring }'''))
+
+        self.assertEqual(store.stat_at('Hero', 'attack', 50), 99)
+        self.assertEqual(store.stat_at('Hero', 'defence', 7), 32)
+        self.assertEqual(store.stat_at('Hero', 'health', 2), 14)
+        self.assertEqual(store.stat_at('Hero', 'exp', 50), 0)
+        health = store.stat_at('Hero', 'health', 50)
+        self.assertEqual((health.minimum(), health.maximum()), (62, 398))
+        self.assertAlmostEqual(health.mean(), 14 + 48 * 4.5)
+        self.assertAlmostEqual(store.stat_at('Hero', 'health', 50, expected = True), 14 + 48 * 4.5)
+        self.assertAlmostEqual(store.stat_at('Hero', 'health', 3).probability(15), 1 / 8)
+        with self.assertRaises(TypeError):
+            store.stat_at('Hero', 'health', 1)
+        with self.assertRaises(NameError):
+            store.stat_at('Hero', 'luck', 3)
+
+        # no distribution for dice multiplying a stat
+        output = run(TEMPLATES + '''character Hero { health: 10 *= 1d6 }
+            ?stat_at("Knight", "attack", 9); ?expected_stat("Hero", "health", 3); ?stat_at("Hero", "health", 3);''')
+        self.assertEqual(output, "7\n122.5\nTypeError: Attempted arithmetic operation on unsupported type, line 7\n")
+
+    def test_runs_start_empty(self):
+        interpreter = Interpreter(io.StringIO(TEMPLATES + '?spawn("Goblin");'))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            interpreter.execute()
+            interpreter.execute()
+
+        self.assertEqual(output.getvalue(), "Goblin#0\nGoblin#0\n")
+
+if __name__ == '__main__':
+    unittest.main()
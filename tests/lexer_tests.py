@@ -1,8 +1,11 @@
 import unittest
 import io
+import os
 import sys
+from contextlib import redirect_stdout
 sys.path.append('D:\Projects\dndlang-python')
 from lexing.lexer import Lexer
+from lexing.char_lexer import CharLexer
 from lexing.token import TokenType
 
 class TestLexerMethods(unittest.TestCase):
@@ -22,5 +25,71 @@ class TestLexerMethods(unittest.TestCase):
         self.assertEqual(test_lexer.next_token().t_value, 'some_identifier')
         self.assertEqual(test_lexer.next_token().t_value, 'Test123')
 
+    def test_dice_modifiers(self):
+        test_lexer = Lexer(io.StringIO("4d6dl1 2D20KH 3d6! 10d10!kl3"))
+        for value in ('4d6dl1', '2d20kh', '3d6!', '10d10!kl3'):
+            token = test_lexer.next_token()
+            self.assertEqual((token.t_type, token.t_value), (TokenType.DICE_LITERAL, value))
+        self.assertSameTokens("?4d6dl1 + 2D20KH * 3d6!;\nx = 10d10!kl3 + 1d4dh0;")
+        self.assertSameError("Number a;\n  a = 4d6k + 1;")
+        self.assertSameError("?1;\n?3d6!d;")
+
+    def test_token_positions(self):
+        test_lexer = Lexer(io.StringIO("Number abc;\n  ?\"two\nlines\";"))
+        token = test_lexer.next_token()
+        self.assertEqual((token.line_no, token.char_no, token.end_line_no, token.end_char_no), (1, 1, 1, 6))
+        token = test_lexer.next_token()
+        self.assertEqual((token.line_no, token.char_no, token.end_line_no, token.end_char_no), (1, 8, 1, 10))
+        test_lexer.next_token()
+        self.assertEqual(test_lexer.next_token().line_no, 2)
+        token = test_lexer.next_token()
+        self.assertEqual((token.line_no, token.char_no, token.end_line_no, token.end_char_no), (2, 4, 3, 6))
+        with self.assertRaises(AttributeError):
+            token.t_value = 'changed'
+
+    def test_identifiers_interned(self):
+        test_lexer = Lexer(io.StringIO("some_name " + "some_" + "name"))
+        self.assertIs(test_lexer.next_token().t_value, test_lexer.next_token().t_value)
+
+    def test_buffered_tokens(self):
+        source = "Number a;\na = 3d6 + 12;\n?\"text\" ;"
+        test_lexer = Lexer(io.StringIO(source), buffer_tokens = True)
+        reference_lexer = Lexer(io.StringIO(source))
+        self.assertEqual(len(test_lexer.token_buffer), 13)
+        for i in range(14):
+            self.assertEqual(test_lexer.next_token(), reference_lexer.next_token())
+
+    def assertSameTokens(self, source):
+        test_lexer = Lexer(io.StringIO(source))
+        reference_lexer = CharLexer(io.StringIO(source))
+        while True:
+            token = test_lexer.next_token()
+            reference_token = reference_lexer.next_token()
+            self.assertEqual(token, reference_token)
+            if token.t_type == TokenType.END_OF_FILE:
+                break
+
+    def assertSameError(self, source):
+        outputs = []
+        for lexer_class in (Lexer, CharLexer):
+            output = io.StringIO()
+            with redirect_stdout(output), self.assertRaises(SystemExit):
+                test_lexer = lexer_class(io.StringIO(source))
+                while test_lexer.next_token().t_type != TokenType.END_OF_FILE:
+                    pass
+            outputs.append(output.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_matches_reference_lexer(self):
+        self.assertSameTokens("Number a;\n  a = 3d6 + 12 * (4 / 2);\n\t?\"multi\nline\" ;\nx>>y>=z<=w==v>u<t %$ a+=1d4 b*=2")
+        test_cases = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test_cases')
+        for fname in sorted(os.listdir(test_cases)):
+            with open(os.path.join(test_cases, fname), 'r') as file:
+                self.assertSameTokens(file.read())
+
+    def test_errors_match_reference_lexer(self):
+        self.assertSameError("Number a;\n  a = 3d + 1;")
+        self.assertSameError("?1;\n?\"never closed;\n?2;")
+
 if __name__ == '__main__':
     unittest.main()
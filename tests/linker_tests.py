@@ -0,0 +1,53 @@
+import unittest
+import io
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting.resolver import Resolver
+from interpreting.linker import Linker
+from interpreting.interpreter import Interpreter
+from interpreting.builtins import BUILTINS
+from interpreting.error_handling import ArgumentError
+
+def link(source: str):
+    program = Parser(Lexer(io.StringIO(source))).parse()
+    resolver = Resolver(program)
+    resolver.resolve()
+    Linker({ function.name: function for function in program.functions }, resolver.call_sites).link()
+    return program, [call for call, line_no in resolver.call_sites]
+
+class TestLinker(unittest.TestCase):
+
+    def test_call_sites_bound(self):
+        program, calls = link("?f(1); function f(n) { if (n > 0) { return f(n - 1); } return g(); } function g() { return 0; }")
+
+        f, g = program.functions
+        self.assertEqual([call.definition for call in calls], [f, g, f])
+
+    def test_builtins(self):
+        program, calls = link("?distribution(1d6); function distribution(d) { return d; } ?probability(1d6, 2);")
+
+        self.assertEqual(calls[0].definition, program.functions[0])
+        self.assertEqual(calls[1].definition, BUILTINS['probability'])
+
+    def test_undefined_function(self):
+        with self.assertRaises(NameError):
+            link("function f() { return missing(); }")
+
+    def test_argument_count(self):
+        with self.assertRaises(ArgumentError) as context:
+            link("function f(a, b, c) { return a; } f(1);")
+        self.assertEqual(context.exception.missing_argument_count, 2)
+
+    def test_error_reported_before_execution(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            result = Interpreter(io.StringIO('?1;\n?f(2);\nfunction f() { return 1; }')).execute()
+
+        self.assertEqual(result, -1)
+        self.assertEqual(output.getvalue(), "ArgumentError: Function call missing 1 argument, line 2\n")
+
+if __name__ == '__main__':
+    unittest.main()
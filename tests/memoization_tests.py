@@ -0,0 +1,57 @@
+import unittest
+import io
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting.memoization import Memoizer, pure_functions
+from interpreting.interpreter import Interpreter, ENGINES
+
+def parse(source: str):
+    return Parser(Lexer(io.StringIO(source))).parse()
+
+FIBONACCI = "function fib(n) { if (n <= 1) { return n; } return 0 + fib(n - 1) + fib(n - 2); } ?fib(20);"
+
+class TestMemoization(unittest.TestCase):
+
+    def test_purity(self):
+        program = parse("""
+            function add(a, b) { return a + b; }
+            function even(n) { if (n == 0) { return 1; } return odd(n - 1); }
+            function odd(n) { if (n == 0) { return 0; } return even(n - 1); }
+            function shout(n) { ?n; return n; }
+            function roll() { return ^1d6; }
+            function loud(n) { return 0 + shout(n) + add(n, 1); }
+        """)
+
+        self.assertEqual(pure_functions(program), { 'add', 'even', 'odd' })
+
+    def test_disabled(self):
+        memoizer = Memoizer(parse("function f() { return 1; }"), 0)
+
+        self.assertEqual(memoizer.pure, set())
+        self.assertIsNone(memoizer.wrap('f', lambda: 1))
+
+    def test_statistics(self):
+        for engine in ENGINES:
+            with self.subTest(engine = engine):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    interpreter = Interpreter(io.StringIO(FIBONACCI), engine = engine)
+                    interpreter.execute()
+
+                self.assertEqual(output.getvalue(), "6765\n")
+                self.assertEqual(interpreter.memoizer.statistics(), "fib: 18 hits, 21 misses, 21 cached")
+
+    def test_cache_size(self):
+        interpreter = Interpreter(io.StringIO(FIBONACCI), memo_size = 4)
+        with redirect_stdout(io.StringIO()):
+            interpreter.execute()
+
+        info = interpreter.memoizer.caches['fib'].cache_info()
+        self.assertEqual(info.maxsize, 4)
+        self.assertEqual(info.currsize, 4)
+
+if __name__ == '__main__':
+    unittest.main()
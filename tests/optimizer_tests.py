@@ -0,0 +1,53 @@
+import unittest
+import io
+import sys
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from parsing import ast
+from interpreting.optimizer import Optimizer, count_nodes
+
+def optimize(source: str) -> Optimizer:
+    optimizer = Optimizer(Parser(Lexer(io.StringIO(source))).parse())
+    optimizer.optimize()
+    return optimizer
+
+class TestOptimizer(unittest.TestCase):
+
+    def test_wrappers_collapsed(self):
+        program = optimize("Number a; a = b; ?\"text\";").program
+
+        self.assertIsInstance(program.instructions[1].rhs, ast.Variable)
+        self.assertIsInstance(program.instructions[2].value, ast.String)
+
+    def test_constant_folding(self):
+        program = optimize("Number a; a = 2 * 3 + 1 / 4; a = 1 + 2 - b * 2;").program
+
+        self.assertIsInstance(program.instructions[1].rhs, ast.Number)
+        self.assertEqual(program.instructions[1].rhs.value, 6.25)
+        folded = program.instructions[2].rhs
+        self.assertEqual(folded.operands[0].value, 3)
+        self.assertEqual(len(folded.operators), 1)
+
+    def test_division_by_zero_not_folded(self):
+        program = optimize("?1 / 0;").program
+
+        self.assertIsInstance(program.instructions[0].value, ast.Expression)
+
+    def test_constant_conditions(self):
+        program = optimize("while (2 < 1) { } if (\"a\" == \"a\") { } if (a < 1) { }").program
+
+        self.assertIsInstance(program.instructions[0].condition, ast.ConstantCondition)
+        self.assertFalse(program.instructions[0].condition.value)
+        self.assertTrue(program.instructions[1].condition.value)
+        self.assertNotIsInstance(program.instructions[2].condition, ast.ConstantCondition)
+
+    def test_node_count(self):
+        optimizer = optimize("?1 + 2;")
+
+        self.assertEqual(optimizer.nodes_after, count_nodes(optimizer.program))
+        self.assertLess(optimizer.nodes_after, optimizer.nodes_before)
+        self.assertEqual(optimizer.report(), "Optimizer: %d nodes before, %d after" % (optimizer.nodes_before, optimizer.nodes_after))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,9 @@ import unittest
 import io
 import sys
 sys.path.append('D:\Projects\dndlang-python')
+from contextlib import redirect_stdout
 from lexing.lexer import Lexer
-from parsing.parser import Parser
+from parsing.parser import Parser, TokenSet
 from parsing import ast
 from lexing.token import TokenType
 from parsing.error_handling import UnexpectedTokenError
@@ -18,6 +19,30 @@ class TestParserMethods(unittest.TestCase):
         self.assertFalse(test_parser.is_acceptable( test_lexer.next_token(), ( TokenType.AND, ) ) )
         self.assertTrue(test_parser.is_acceptable( test_lexer.next_token(), ( TokenType.SLASH, TokenType.IDENTIFIER ) ) )
 
+    def test_token_set(self):
+        token_set = TokenSet(TokenType.SEMICOLON, TokenType.COMMA)
+        self.assertIn(TokenType.COMMA, token_set)
+        self.assertNotIn(TokenType.DOT, token_set)
+        self.assertEqual(str(token_set), str(( TokenType.SEMICOLON, TokenType.COMMA )))
+
+    def test_unexpected_token_message(self):
+        test_lexer = Lexer(io.StringIO("Number a;\n  a = b c;"))
+        test_parser = Parser(test_lexer)
+
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(SystemExit):
+            test_parser.parse()
+        self.assertEqual(output.getvalue(), "UnexpectedTokenError: expected: " + str(( TokenType.SEMICOLON, )) \
+                                            + "; got: TokenType.IDENTIFIER 'c', line 2, char 9\n")
+
+    def test_dice_without_faces(self):
+        for source, position in (("Dice d;\n  d = 2d0;", "line 2, char 7"), ("character A { health: 5 += 1d0 }", "line 1, char 28")):
+            with self.subTest(source = source):
+                output = io.StringIO()
+                with redirect_stdout(output), self.assertRaises(SystemExit):
+                    Parser(Lexer(io.StringIO(source))).parse()
+                self.assertEqual(output.getvalue(), "DiceLiteralError: Dice literal without any faces, " + position + "\n")
+
     def test_accept(self):
         test_lexer = Lexer(io.StringIO("item Gold { }"))
         test_parser = Parser(test_lexer)
@@ -0,0 +1,113 @@
+import unittest
+import itertools
+import sys
+from collections import Counter
+import numpy
+sys.path.append('D:\Projects\dndlang-python')
+from interpreting.probability import Distribution, convolve, dice_probabilities, FFT_THRESHOLD, EXPLOSION_LIMIT
+from interpreting.builtins import to_distribution, probability, mean, variance, minimum, maximum, at_least
+from parsing import ast
+
+class TestDistribution(unittest.TestCase):
+
+    def test_dice(self):
+        distribution = Distribution.dice(2, 6)
+
+        self.assertEqual(distribution.offset, 2)
+        self.assertEqual(len(distribution.probabilities), 11)
+        self.assertAlmostEqual(distribution.probability(7), 6 / 36)
+        self.assertAlmostEqual(distribution.probability(12), 1 / 36)
+        self.assertEqual(distribution.probability(13), 0.0)
+        self.assertAlmostEqual(sum(distribution.probabilities), 1.0)
+
+    def test_cached(self):
+        self.assertIs(Distribution.dice(3, 8).probabilities, Distribution.dice(3, 8).probabilities)
+        self.assertFalse(dice_probabilities(3, 8).flags.writeable)
+
+    def test_arithmetic(self):
+        d6 = Distribution.dice(1, 6)
+
+        self.assertEqual((d6 + 3).items()[0], (4, d6.probability(1)))
+        self.assertEqual([value for value, p in (d6 * 2).items()], [2, 4, 6, 8, 10, 12])
+        self.assertEqual([value for value, p in (10 - d6).items()], [4, 5, 6, 7, 8, 9])
+        self.assertEqual((d6 * 0).items(), [(0, 1.0)])
+        self.assertAlmostEqual((d6 - d6).probability(0), 6 / 36)
+        self.assertEqual([value for value, p in (-2 * d6).items()], [-12, -10, -8, -6, -4, -2])
+
+    def test_unsupported(self):
+        d6 = Distribution.dice(1, 6)
+        for operation in (lambda: d6 * d6, lambda: d6 / 2, lambda: d6 + 0.5, lambda: d6 + "a"):
+            with self.assertRaises(TypeError):
+                operation()
+
+    def test_fft_convolution(self):
+        first = numpy.full(FFT_THRESHOLD + 1, 1 / (FFT_THRESHOLD + 1))
+        second = dice_probabilities(30, 20)
+
+        self.assertTrue(numpy.allclose(convolve(first, second), numpy.convolve(first, second), rtol = 0, atol = 1e-15))
+        self.assertTrue((convolve(first, second) >= 0).all())
+
+    def test_kept_dice(self):
+        for number, faces, keep, highest in ((4, 6, 3, True), (2, 20, 1, True), (2, 20, 1, False), (5, 4, 2, False), (3, 3, 0, True)):
+            with self.subTest(number = number, faces = faces, keep = keep, highest = highest):
+                # every roll of the pool, equally likely
+                counts = Counter()
+                for faces_rolled in itertools.product(range(1, faces + 1), repeat = number):
+                    kept = sorted(faces_rolled, reverse = highest)[:keep]
+                    counts[sum(kept)] += 1
+                distribution = Distribution.dice(number, faces, keep = keep, highest = highest)
+                self.assertEqual(distribution.offset, keep)
+                for value, count in counts.items():
+                    self.assertAlmostEqual(distribution.probability(value), count / faces ** number)
+                self.assertAlmostEqual(sum(distribution.probabilities), 1.0)
+
+    def test_exploding_dice(self):
+        d6 = Distribution.dice(1, 6, exploding = True)
+
+        self.assertEqual(d6.probability(6), 0.0)
+        self.assertAlmostEqual(d6.probability(8), 1 / 36)
+        self.assertEqual(len(d6.probabilities), 6 * (EXPLOSION_LIMIT + 1))
+        self.assertAlmostEqual(sum(d6.probabilities), 1.0)
+        self.assertAlmostEqual(sum(value * p for value, p in d6.items()), 4.2)
+        self.assertAlmostEqual(Distribution.dice(2, 6, exploding = True).probability(7), 4 / 36)
+        # the highest of three exploding dice
+        self.assertAlmostEqual(Distribution.dice(3, 4, True, 1, True).probability(4), 0.0)
+        self.assertAlmostEqual(Distribution.dice(3, 4, True, 1, True).probability(3), 27 / 64 - 8 / 64)
+
+    def test_statistics(self):
+        for source in ('2d6', '3d8', '4d6dl1', '2d20kl1', '2d4!', '3d6!kh2', '1d1'):
+            with self.subTest(dice = source):
+                dice = ast.Dice(source)
+                distribution = to_distribution(dice)
+                values = [value for value, p in distribution.items()]
+                expected_mean = sum(value * p for value, p in distribution.items())
+                self.assertAlmostEqual(mean(dice), expected_mean)
+                self.assertAlmostEqual(variance(dice), sum((value - expected_mean) ** 2 * p for value, p in distribution.items()))
+                self.assertEqual((minimum(dice), maximum(dice)), (min(values), max(values)))
+                for result in range(min(values) - 1, max(values) + 2):
+                    self.assertAlmostEqual(at_least(dice, result), sum(p for value, p in distribution.items() if value >= result))
+                # the same from the distribution itself
+                self.assertAlmostEqual(mean(distribution), mean(dice))
+                self.assertAlmostEqual(variance(distribution), variance(dice))
+                self.assertEqual((minimum(distribution), maximum(distribution)), (minimum(dice), maximum(dice)))
+
+        self.assertEqual(mean(4), 4)
+        self.assertEqual(variance(4), 0)
+        self.assertEqual(at_least(ast.Dice('2d6'), 12.5), 0.0)
+        self.assertAlmostEqual(at_least(ast.Dice('2d6'), 11.5), 1 / 36)
+        with self.assertRaises(TypeError):
+            at_least(ast.Dice('2d6'), "a")
+        with self.assertRaises(TypeError):
+            mean("a")
+
+    def test_builtins(self):
+        self.assertAlmostEqual(probability(ast.Dice('3d6'), 3), 1 / 216)
+        self.assertAlmostEqual(probability(ast.Dice('2d20kh'), 20), 39 / 400)
+        self.assertEqual(probability(4, 4.0), 1.0)
+        self.assertEqual(to_distribution(2).items(), [(2, 1.0)])
+        for value in ("a", 1.5, None):
+            with self.assertRaises(TypeError):
+                to_distribution(value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import io
+import sys
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting.resolver import Resolver
+from interpreting.scope import Scope
+from interpreting import quickening
+
+def quickened_expression(source: str):
+    # the right hand side of the last assignment, with a scope holding the program's variables
+    program = Resolver(Parser(Lexer(io.StringIO(source))).parse()).resolve()
+    quickening.Quickener(program).quicken()
+    return program.instructions[-1].rhs, Scope(program.frame_size)
+
+class TestQuickening(unittest.TestCase):
+
+    def test_int_specialization(self):
+        expression, scope = quickened_expression("Number a; Number b; b = a + 1;")
+        scope.slots[0] = 1
+
+        self.assertIsInstance(expression, quickening.AdaptiveExpression)
+        for i in range(quickening.WARMUP):
+            self.assertEqual(expression.evaluate(scope), 2)
+        self.assertIs(type(expression), quickening.IntBinaryExpression)
+        self.assertEqual(expression.evaluate(scope), 2)
+
+    def test_guard_failure_deoptimizes(self):
+        expression, scope = quickened_expression("Number a; Number b; b = a + a - 1;")
+        scope.slots[0] = 3
+        for i in range(quickening.WARMUP):
+            expression.evaluate(scope)
+        self.assertIs(type(expression), quickening.IntExpression)
+
+        scope.slots[0] = 0.5
+        self.assertEqual(expression.evaluate(scope), 0.0)
+        self.assertIs(type(expression), quickening.AdaptiveExpression)
+        self.assertEqual(expression.counter, quickening.BACKOFF)
+
+        scope.slots[0] = "text"
+        with self.assertRaises(TypeError):
+            expression.evaluate(scope)
+
+    def test_mixed_types_stay_generic(self):
+        expression, scope = quickened_expression("Number a; Number b; b = a + 1;")
+        scope.slots[0] = 1.5
+        for i in range(quickening.WARMUP):
+            self.assertEqual(expression.evaluate(scope), 2.5)
+        self.assertIs(type(expression), quickening.GenericExpression)
+
+    def test_conditions(self):
+        program = Resolver(Parser(Lexer(io.StringIO("while (1 < 2) { } if (1 == 2) { }"))).parse()).resolve()
+        quickening.Quickener(program).quicken()
+
+        self.assertIsInstance(program.instructions[0].condition, quickening.LessThanCondition)
+        self.assertIsInstance(program.instructions[1].condition, quickening.EqualsCondition)
+        self.assertFalse(program.instructions[1].condition.evaluate(None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,34 @@ class TestReaderMethods(unittest.TestCase):
         self.assertEqual(test_reader.position.line_no, 1)
         self.assertEqual(test_reader.position.char_no, 0)
 
+    def test_chunk_boundaries(self):
+        test_input = "line one\nsecond line\n\nlast"
+        test_reader = Reader(io.StringIO(test_input), chunk_size = 3)
+
+        test_string = ''
+        while test_reader.peek() != '':
+            test_string += test_reader.next_char()
+        self.assertEqual(test_string, test_input)
+        self.assertEqual(test_reader.next_char(), '')
+        self.assertEqual(test_reader.position.line_no, 4)
+        self.assertEqual(test_reader.position.char_no, 4)
+
+    def test_non_seekable_input(self):
+        class Pipe(io.StringIO):
+            def seekable(self):
+                return False
+            def seek(self, *args):
+                raise io.UnsupportedOperation("seek")
+            def tell(self):
+                raise io.UnsupportedOperation("tell")
+
+        test_reader = Reader(Pipe("ab"))
+        self.assertEqual(test_reader.peek(), 'a')
+        self.assertEqual(test_reader.next_char(), 'a')
+        self.assertEqual(test_reader.peek(), 'b')
+        self.assertEqual(test_reader.next_char(), 'b')
+        self.assertEqual(test_reader.peek(), '')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import io
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting.resolver import Resolver
+from interpreting.interpreter import Interpreter
+from interpreting.error_handling import MultipleNameError, UndeclaredVariableError
+
+def resolve(source: str):
+    return Resolver(Parser(Lexer(io.StringIO(source))).parse()).resolve()
+
+class TestResolver(unittest.TestCase):
+
+    def test_function_slots(self):
+        program = resolve("function f(a, b) { Number c; c = a + b; return c; }")
+
+        function = program.functions[0]
+        self.assertEqual(function.frame_size, 3)
+        self.assertEqual([parameter.slot for parameter in function.parameters], [0, 1])
+        self.assertEqual(function.block.instructions[0].var.slot, 2)
+        self.assertEqual(function.block.instructions[1].lhs.slot, 2)
+
+    def test_top_level_frame(self):
+        program = resolve("Number a; Number b; a = 1; b = a;")
+
+        self.assertEqual(program.frame_size, 2)
+        self.assertEqual(program.instructions[3].lhs.slot, 1)
+
+    def test_multiple_declaration(self):
+        with self.assertRaises(MultipleNameError):
+            resolve("Number a; if (1 == 1) { Number a; }")
+        with self.assertRaises(MultipleNameError):
+            resolve("function f(a, a) { return a; }")
+
+    def test_undeclared_variable(self):
+        with self.assertRaises(UndeclaredVariableError):
+            resolve("?a; Number a;")
+        with self.assertRaises(UndeclaredVariableError):
+            resolve("Number a; function f() { return a; }")
+
+    def test_flat_namespace(self):
+        # a declaration inside a block is visible after it
+        program = resolve("Number a; if (1 == 1) { Number b; b = 2; } a = b;")
+        self.assertEqual(program.frame_size, 2)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            Interpreter(io.StringIO("Number a; if (1 == 1) { Number b; b = 2; } a = b; ?a;")).execute()
+        self.assertEqual(output.getvalue(), "2\n")
+
+    def test_error_reported_before_execution(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            result = Interpreter(io.StringIO('?1;\nfunction f(n) {\n    ?m;\n}')).execute()
+
+        self.assertEqual(result, -1)
+        self.assertEqual(output.getvalue(), "UndeclaredVariableError: Variable 'm' is not declared, line 3\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import random
+import sys
+import numpy
+sys.path.append('D:\Projects\dndlang-python')
+from parsing import ast
+from interpreting import rolling
+from interpreting.probability import dice_probabilities, EXPLOSION_LIMIT
+
+class TestRolling(unittest.TestCase):
+
+    def test_bulk_roll(self):
+        # too many results for an alias table
+        dice = ast.Dice('%dd6' % rolling.ALIAS_TABLE_LIMIT)
+        for i in range(100):
+            self.assertTrue(dice.number <= dice.roll() <= dice.number * 6)
+        self.assertIs(type(dice.roll()), int)
+
+    def test_roll_sum(self):
+        rng = numpy.random.Generator(numpy.random.PCG64(3))
+        faces = numpy.bincount([rolling.roll_sum(rng, 1, 6) for i in range(60000)])[1:] / 60000
+        self.assertTrue(numpy.allclose(faces, 1 / 6, atol = 0.01))
+        # almost half of the words are past the last multiple of these faces and drawn again
+        faces = (1 << 63) + 1
+        for i in range(100):
+            self.assertTrue(4 <= rolling.roll_sum(rng, 4, faces) <= 4 * faces)
+
+    def test_seeded(self):
+        for dice in (ast.Dice('3d6'), ast.Dice('1000d20')):
+            with self.subTest(dice = str(dice)):
+                random.seed(7)
+                first = [dice.roll() for i in range(5)]
+                random.seed(7)
+                self.assertEqual([dice.roll() for i in range(5)], first)
+
+    def test_roll_many(self):
+        random.seed(1)
+        rolls = ast.Dice('2d6').roll_many(10000)
+
+        self.assertEqual(rolls.shape, (10000, ))
+        self.assertEqual((rolls.min(), rolls.max()), (2, 12))
+        self.assertAlmostEqual(rolls.mean(), 7, delta = 0.1)
+
+    def test_roll_many_chunks(self):
+        chunk_size = rolling.CHUNK_SIZE
+        rolling.CHUNK_SIZE = 10
+        try:
+            random.seed(2)
+            rolls = ast.Dice('4d4').roll_many(25)
+        finally:
+            rolling.CHUNK_SIZE = chunk_size
+
+        self.assertEqual(len(rolls), 25)
+        self.assertTrue(((rolls >= 4) & (rolls <= 16)).all())
+
+    def test_alias_table_exact(self):
+        for number, faces in ((1, 6), (3, 6), (5, 12), (40, 20)):
+            with self.subTest(number = number, faces = faces):
+                probabilities = dice_probabilities(number, faces)
+                table = rolling.AliasTable(number, probabilities)
+                # a column is drawn with probability 1 / size, then its result or its alias
+                implied = [0.0] * table.size
+                for column in range(table.size):
+                    implied[column] += table.thresholds[column] / table.size
+                    implied[table.aliases[column]] += (1 - table.thresholds[column]) / table.size
+                for expected, actual in zip(probabilities, implied):
+                    self.assertAlmostEqual(actual, expected, places = 12)
+
+    def test_alias_sampling(self):
+        random.seed(3)
+        table = rolling.AliasTable(2, dice_probabilities(2, 6))
+        counts = [0] * 13
+        for i in range(36000):
+            counts[table.sample()] += 1
+
+        self.assertEqual(counts[:2], [0, 0])
+        for total in range(2, 13):
+            self.assertAlmostEqual(counts[total] / 36000, (6 - abs(total - 7)) / 36, delta = 0.01)
+        self.assertTrue(((table.sample_many(1000) >= 2) & (table.sample_many(1000) <= 12)).all())
+
+    def test_alias_cache_eviction(self):
+        tables = rolling.AliasTables(size = 40)
+        first = tables.table(3, 6)
+        tables.table(2, 6)
+        tables.table(3, 6)
+        tables.table(4, 6)
+
+        self.assertEqual(list(tables.tables), [(3, 6, False, None, True), (4, 6, False, None, True)])
+        self.assertEqual(tables.results, 16 + 21)
+        self.assertIs(tables.table(3, 6), first)
+        self.assertIsNone(tables.table(10, 6))
+        self.assertIsNone(rolling.AliasTables().table(rolling.ALIAS_TABLE_LIMIT, 6))
+
+    def test_modifiers(self):
+        random.seed(9)
+        rolls = ast.Dice('4d6dl1').roll_many(20000)
+        self.assertEqual((rolls.min(), rolls.max()), (3, 18))
+        self.assertAlmostEqual(rolls.mean(), 12.24, delta = 0.1)
+        # too many results for an alias table, rolled and partitioned
+        for source, keep in (('%dd6dl1', rolling.ALIAS_TABLE_LIMIT - 1), ('%dd6dh2', rolling.ALIAS_TABLE_LIMIT - 2)):
+            with self.subTest(dice = source):
+                dice = ast.Dice(source % rolling.ALIAS_TABLE_LIMIT)
+                self.assertIsNone(rolling.alias_tables.table(*dice.pool))
+                self.assertEqual(dice.keep, keep)
+                self.assertTrue(keep <= dice.roll() <= keep * 6)
+        self.assertEqual(ast.Dice('2d6kh5').keep, None)
+        self.assertEqual(ast.Dice('2d6dl5').roll(), 0)
+
+    def test_select(self):
+        rolls = numpy.array([[3, 1, 6, 2], [5, 5, 1, 4]])
+
+        self.assertEqual(rolling.select(rolls, 2, True).tolist(), [9, 10])
+        self.assertEqual(rolling.select(rolls, 1, False).tolist(), [1, 1])
+        self.assertEqual(rolling.select(rolls, None, True).tolist(), [12, 15])
+        self.assertEqual(rolling.select(rolls, 0, True).tolist(), [0, 0])
+
+    def test_explode(self):
+        rng = numpy.random.Generator(numpy.random.PCG64(10))
+        rolls = rolling.explode(rng, rng.integers(1, 5, (20000, 1)), 4)
+        self.assertTrue(((rolls % 4) != 0).all())
+        # every face is 2.5 on average, 1 in 4 of them is followed by another
+        self.assertAlmostEqual(rolls.mean(), 2.5 * 4 / 3, delta = 0.05)
+        # a single face explodes every time, up to the limit
+        self.assertEqual(rolling.explode(rng, numpy.ones((3, 2), dtype = numpy.int64), 1).tolist(), [[EXPLOSION_LIMIT + 1] * 2] * 3)
+
+    def test_stdlib_rng(self):
+        # the same faces randint would have rolled
+        random.seed(4)
+        expected = [sum(random.randint(1, faces) for i in range(number)) for number, faces in ((1, 20), (3, 6), (2, 1), (5, 7))]
+        random.seed(4)
+        rng = rolling.StdlibRNG()
+        self.assertEqual([rng.roll(number, faces) for number, faces in ((1, 20), (3, 6), (2, 1), (5, 7))], expected)
+
+        first = rolling.StdlibRNG(5)
+        second = rolling.StdlibRNG(5)
+        self.assertEqual([first.roll(2, 6) for i in range(20)], [second.roll(2, 6) for i in range(20)])
+
+    def test_numpy_rng(self):
+        first = rolling.NumpyRNG(6)
+        second = rolling.NumpyRNG(6)
+        rolls = [first.roll(3, 6) for i in range(rolling.PREFETCH_SIZE)]
+        self.assertEqual([second.roll(3, 6) for i in range(rolling.PREFETCH_SIZE)], rolls)
+        self.assertEqual((min(rolls), max(rolls)), (3, 18))
+        self.assertAlmostEqual(sum(rolls) / len(rolls), 10.5, delta = 0.2)
+        # more faces than a prefetched block
+        self.assertTrue(2 * rolling.PREFETCH_SIZE <= first.roll(2 * rolling.PREFETCH_SIZE, 4) <= 8 * rolling.PREFETCH_SIZE)
+        self.assertTrue(0 <= first.random() < 1)
+
+        first.seed(6)
+        self.assertEqual(first.roll(3, 6), rolls[0])
+
+    def test_active_rng(self):
+        dice = ast.Dice('4d6')
+        try:
+            rolls = []
+            for i in range(2):
+                rolling.use(rolling.make_rng('numpy', 8))
+                rolls.append([dice.roll() for i in range(10)] + ast.Dice('100d6').roll_many(3).tolist())
+        finally:
+            rolling.use(rolling.StdlibRNG())
+
+        self.assertEqual(rolls[0], rolls[1])
+        with self.assertRaises(ValueError):
+            rolling.make_rng('dice')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+import traceback
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting import transpiler
+from interpreting.cache import ProgramCache
+from interpreting.resolver import Resolver
+from interpreting.interpreter import Interpreter
+
+def parse(source: str):
+    return Resolver(Parser(Lexer(io.StringIO(source))).parse()).resolve()
+
+class TestTranspiler(unittest.TestCase):
+
+    def test_functions(self):
+        source = transpiler.Transpiler(parse("function add(a, b) { return a + b; } ?add(1, 2);")).generate()
+
+        self.assertIn("def f_add(v_a, v_b):", source)
+        self.assertIn("_print(f_add(1, 2))", source)
+
+    def test_declarations(self):
+        source = transpiler.Transpiler(parse("Number a; a = 1; ?a;")).generate()
+
+        self.assertIn("global v_a", source)
+        self.assertIn("v_a = None", source)
+        self.assertIn("_print(v_a)", source)
+
+    def test_undeclared_variables(self):
+        # only uses the declaration may not have run before are checked
+        source = transpiler.Transpiler(parse("function f(n) { Number a; a = n; if (n > 1) { Number b; } return b; } ?f(1);")).generate()
+        self.assertIn("v_a = v_b = _UNDECLARED", source)
+        self.assertIn("v_a = v_n", source)
+        self.assertIn("_undeclared('b')", source)
+
+        for script in ("Number a; if (1 == 2) { Number b; } ?b;", "function f() { if (1 == 2) { Number b; } return b; } ?f();",
+                       "Number a; if (1 == 2) { Number b; } b = 3; ?b;"):
+            with self.subTest(script = script):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    Interpreter(io.StringIO(script), engine = 'python').execute()
+                self.assertEqual(output.getvalue(), "UndeclaredVariableError: Variable 'b' is not declared, line 1\n")
+
+    def test_dndlang_line_numbers(self):
+        code = transpiler.Transpiler(parse("String a;\na = \"a\";\n\n?a + 1;")).compile('script.adv')
+        runners = transpiler.load(code)
+        runners[0](None)
+        runners[1](None)
+
+        try:
+            runners[2](None)
+            self.fail("TypeError not raised")
+        except TypeError as e:
+            frames = [frame for frame in traceback.extract_tb(e.__traceback__) if frame.filename == 'script.adv']
+        frame = frames[-1]
+        self.assertEqual(frame.lineno, 4)
+
+    def test_code_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ProgramCache.for_script(os.path.join(directory, 'script.adv'))
+            source = "function f(n) { return n * 2; } ?f(21);"
+
+            Interpreter(io.StringIO(source), cache = cache, engine = 'python')
+            self.assertTrue(os.path.exists(cache.code_path()))
+            self.assertIsNotNone(cache.load_code(source))
+            self.assertIsNone(cache.load_code("?1;"))
+
+if __name__ == '__main__':
+    unittest.main()
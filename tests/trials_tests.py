@@ -0,0 +1,47 @@
+import unittest
+import io
+import pickle
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from interpreting.interpreter import Interpreter, ENGINES
+from interpreting.trials import run_trials, format_histograms, trial_seed
+
+SOURCE = 'function best(d) { Number a; Number b; a = ^d; b = ^d; if (a > b) { return a; } return b; } ?best(1d20); ?^2d6; ?"end";'
+
+class TestTrials(unittest.TestCase):
+
+    def test_pickled_interpreter(self):
+        for engine in ENGINES:
+            with self.subTest(engine = engine):
+                source = 'function f(n) { if (n <= 1) { return 1; } return n * f(n - 1); } ?f(10); ?f(10);'
+                interpreter = pickle.loads(pickle.dumps(Interpreter(io.StringIO(source), engine = engine, optimize = True)))
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    interpreter.execute()
+
+                self.assertEqual(output.getvalue(), "3628800\n3628800\n")
+
+    def test_split_doesnt_matter(self):
+        interpreter = Interpreter(io.StringIO(SOURCE))
+
+        single = run_trials(interpreter, 60, 1, 5)
+        self.assertEqual(run_trials(interpreter, 60, 3, 5), single)
+        self.assertEqual(run_trials(Interpreter(io.StringIO(SOURCE), engine = 'python'), 60, 2, 5), single)
+        self.assertNotEqual(run_trials(interpreter, 60, 1, 6), single)
+
+    def test_histograms(self):
+        histograms = run_trials(Interpreter(io.StringIO(SOURCE)), 100, 1, 0)
+
+        self.assertEqual(len(histograms), 3)
+        self.assertEqual([sum(histogram.values()) for histogram in histograms], [100, 100, 100])
+        self.assertTrue(set(histograms[1]) <= { str(total) for total in range(2, 13) })
+        self.assertEqual(histograms[2], { "end": 100 })
+        self.assertIn("output 3 (100 trials):\n  end: 100 (100.00%)", format_histograms(histograms, 100))
+
+    def test_trial_seeds(self):
+        self.assertEqual(trial_seed(1, 2), trial_seed(1, 2))
+        self.assertEqual(len({ trial_seed(seed, trial) for seed in range(10) for trial in range(10) }), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import io
+import sys
+from contextlib import redirect_stdout
+sys.path.append('D:\Projects\dndlang-python')
+from lexing.lexer import Lexer
+from parsing.parser import Parser
+from interpreting import bytecode
+from interpreting.vm import VirtualMachine, UNDECLARED
+from interpreting.interpreter import Interpreter
+
+def compile_source(source: str) -> VirtualMachine:
+    return VirtualMachine(Parser(Lexer(io.StringIO(source))).parse())
+
+def opcodes(code: bytecode.CodeObject) -> list:
+    return [code.code[i] for i in range(0, len(code.code), 2)]
+
+class TestVirtualMachine(unittest.TestCase):
+
+    def test_function_slots(self):
+        vm = compile_source("function add(a, b) { Number c; c = a + b; return c; }")
+
+        function = vm.functions[0]
+        self.assertEqual(function.names, ['a', 'b', 'c'])
+        self.assertEqual(function.parameter_count, 2)
+        self.assertEqual(opcodes(function), [bytecode.DECLARE, bytecode.LOAD_LOCAL, bytecode.CHECK_NUMERIC, bytecode.LOAD_LOCAL, \
+                                             bytecode.CHECK_NUMERIC, bytecode.BINARY_ADD, bytecode.STORE_LOCAL, bytecode.LOAD_LOCAL, \
+                                             bytecode.RETURN_VALUE, bytecode.RETURN_NONE])
+
+    def test_literals_skip_type_check(self):
+        vm = compile_source("?2 * 3 + ^1d6;")
+
+        self.assertNotIn(bytecode.CHECK_NUMERIC, opcodes(vm.instructions[0]))
+
+    def test_static_call_errors(self):
+        vm = compile_source("function f(a) { return a; } ?f(1, 2); ?g();")
+
+        self.assertEqual(opcodes(vm.instructions[0])[0], bytecode.RAISE_ARGUMENT_ERROR)
+        self.assertEqual(opcodes(vm.instructions[1])[0], bytecode.RAISE_NAME_ERROR)
+
+    def test_global_frame(self):
+        vm = compile_source("Number a; Number b; a = 2; b = a * 3;")
+
+        self.assertEqual(vm.global_frame, [UNDECLARED, UNDECLARED])
+        for run in vm.runners():
+            run(None)
+        self.assertEqual(vm.global_frame, [2, 6])
+
+    def test_disassemble(self):
+        vm = compile_source("function f(n) { while (n > 0) { n = n - 1; } return n; } ?f(3);")
+
+        listing = vm.disassemble()
+        self.assertIn("f (locals: 1, parameters: 1)", listing)
+        self.assertIn("COMPARE                1 (>)", listing)
+        self.assertIn("CALL                   0 (f)", listing)
+        self.assertIn(">>     0 LOAD_LOCAL             0 (n)", listing)
+
+    def test_tail_calls(self):
+        vm = compile_source("function f(n) { if (n > 0) { return f(n - 1); } return g(n); } function g(n) { return n; }")
+
+        self.assertEqual(opcodes(vm.functions[0]).count(bytecode.TAIL_CALL), 1)
+        self.assertEqual(opcodes(vm.functions[0]).count(bytecode.CALL), 1)
+
+    def test_deep_recursion(self):
+        source = "function count(n) { if (n == 0) { return \"done\"; } return count(n - 1); } ?count(100000);"
+        output = io.StringIO()
+        with redirect_stdout(output):
+            Interpreter(io.StringIO(source), engine = 'vm', memo_size = 0, max_depth = 10).execute()
+
+        self.assertEqual(output.getvalue(), "done\n")
+
+    def test_max_depth(self):
+        source = "function depth(n) { if (n == 0) { return 0; } return 1 + depth(n - 1); } ?depth(%d);"
+        for n, expected in ((5000, "5000\n"), (50000, "RecursionError")):
+            with self.subTest(n = n):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    Interpreter(io.StringIO(source % n), engine = 'vm', max_depth = 10000).execute()
+
+                self.assertIn(expected, output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()